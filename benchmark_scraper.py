@@ -0,0 +1,559 @@
+"""
+Micro-benchmarks do scraper_capilar (rodam offline).
+
+    python benchmark_scraper.py claims [--html pagina.html]
+    python benchmark_scraper.py urls [--html pagina.html]
+    python benchmark_scraper.py listing [--html pagina.html]
+    python benchmark_scraper.py rules [--html pagina.html]
+
+Suíte sobre páginas gravadas (benchmarks/fixtures), comparada com a
+linha de base em benchmarks/baseline.json:
+
+    python benchmark_scraper.py suite [--save-baseline] [--tolerance 0.25]
+    python benchmark_scraper.py record --cache http_cache.sqlite3 --url URL [--kind product]
+"""
+import argparse
+import gc
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import scraper_capilar as sc
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+# Variação tolerada em relação à linha de base antes de acusar regressão
+SUITE_TOLERANCE = 0.25
+# Diferenças menores que isso (ms) são ruído de medição, qualquer que seja a proporção
+SUITE_MIN_DELTA_MS = 0.5
+# Só as etapas de página inteira reprovam a suíte; as sub-etapas (html,
+# claims, cronograma...) levam frações de ms e oscilam mais que a tolerância
+SUITE_GATED_STAGES = ("parser", "links")
+# Quantas vezes remedir uma etapa acima da tolerância antes de acusar
+# regressão (vale a menor medida: um pico da máquina não se repete)
+SUITE_CONFIRM_RUNS = 3
+# Tipos de fixture: página de produto, primeira página de uma listagem
+# (ponto de partida da coleta de links) ou página só servida pelo cache
+FIXTURE_KINDS = ("product", "listing", "page")
+
+
+def synthetic_page_text(n_words: int = 8000, seed: int = 1) -> str:
+    """Texto de página de produto sintético e determinístico (minúsculo)."""
+    rng = random.Random(seed)
+    words = (
+        "cabelo cabelos fios hidratação nutrição reconstrução brilho maciez "
+        "fórmula ativos textura leve perfume suave proteção diário uso modo "
+        "aplique enxágue massageie comprimento pontas raiz couro cabeludo "
+        "óleo manteiga queratina glicerina pantenol frasco ml embalagem"
+    ).split()
+    return " ".join(rng.choice(words) for _ in range(n_words))
+
+
+def timeit(func: Callable[[], object], repeat: int = 20) -> float:
+    """Tempo médio por chamada, em milissegundos."""
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def claims_keywords(extra: int, seed: int = 7) -> List[Tuple[str, str]]:
+    """Palavras-chave de CLAIMS_CONFIG mais `extra` palavras sintéticas."""
+    keywords = [(kw, key) for key, conf in sc.CLAIMS_CONFIG.items() for kw in conf["keywords"]]
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    for i in range(extra):
+        word = "".join(rng.choice(letters) for _ in range(rng.randint(5, 12)))
+        keywords.append((f"{word} {i}", f"claim_sintetico_{i % 200}"))
+    return keywords
+
+
+def bench_claims(text: str) -> None:
+    """
+    Busca ingênua (um `in` por palavra) versus KeywordAutomaton: só a regex
+    em trie e o caminho de detect_claims (CLAIMS_AUTOMATON_MIN_KEYWORDS).
+    """
+    print(f"Texto: {len(text)} caracteres")
+    print(f"{'palavras':>9} {'ingênuo (ms)':>13} {'trie (ms)':>10} {'detect_claims (ms)':>19}")
+    for extra in (0, 100, 200, 1000, 4000):
+        keywords = claims_keywords(extra)
+        by_claim: Dict[str, List[str]] = {}
+        for kw, key in keywords:
+            by_claim.setdefault(key, []).append(kw)
+
+        def naive() -> set:
+            return {key for key, kws in by_claim.items() if any(kw in text for kw in kws)}
+
+        trie = sc.KeywordAutomaton(keywords)
+        claims = sc.KeywordAutomaton(keywords, min_keywords=sc.CLAIMS_AUTOMATON_MIN_KEYWORDS)
+        assert trie.find_values(text) == claims.find_values(text) == naive()
+        print(
+            f"{len(keywords):>9} {timeit(naive):>13.2f} "
+            f"{timeit(lambda: trie.find_values(text, stop_after=len(by_claim))):>10.2f} "
+            f"{timeit(lambda: claims.find_values(text, stop_after=len(by_claim))):>19.2f}"
+        )
+
+
+def synthetic_listing_html(n_anchors: int = 3000, seed: int = 3) -> str:
+    """Listagem sintética com links de produto, institucionais e externos."""
+    rng = random.Random(seed)
+    templates = [
+        "/produto/shampoo-{i}.html", "/products/mascara-{i}", "/leave-in-{i}/p",
+        "/carrinho?add={i}", "/minha-conta", "/blog/post-{i}", "/categoria/cabelos?page={i}",
+        "https://www.instagram.com/loja{i}", "/institucional/{i}", "#topo",
+    ]
+    links = "".join(
+        f'<a href="{rng.choice(templates).format(i=i)}">link {i}</a>' for i in range(n_anchors)
+    )
+    return f"<html><body>{links}</body></html>"
+
+
+def bench_urls(html: str, page_url: str = "https://loja.com.br/cabelos/") -> None:
+    """Regex por padrão (duas vezes por link, como antes) versus UrlClassifier."""
+    anchors = sc.make_soup(html).find_all("a", href=True)
+    base_domain = urlparse(page_url).netloc
+    print(f"Links na página: {len(anchors)}")
+
+    def naive() -> List[str]:
+        found = []
+        for a in anchors:
+            href_lower = a.get("href", "").lower()
+            if any(re.search(pat, href_lower) for pat in sc.IGNORE_URL_PATTERNS):
+                continue
+            if any(re.search(pat, href_lower) for pat in sc.PRODUCT_URL_PATTERNS):
+                found.append(a)
+        links = []
+        for a in found:
+            full_url = urljoin(page_url, a.get("href", ""))
+            if base_domain not in urlparse(full_url).netloc:
+                continue
+            if any(re.search(pat, full_url.lower()) for pat in sc.IGNORE_URL_PATTERNS):
+                continue
+            links.append(full_url)
+        return links
+
+    def compiled() -> List[str]:
+        return [
+            url for url, kind in sc.URL_CLASSIFIER.classify_anchors(page_url, anchors, base_domain)
+            if kind == sc.URL_PRODUCT
+        ]
+
+    def cold() -> List[str]:
+        sc.URL_CLASSIFIER.cache.clear()
+        return compiled()
+
+    print(f"{'ingênuo (ms)':>13} {'compilado, sem cache (ms)':>26} {'compilado, com cache (ms)':>26}")
+    print(f"{timeit(naive):>13.2f} {timeit(cold):>26.2f} {timeit(compiled):>26.2f}")
+    print(f"Produtos: ingênuo {len(naive())}, classificador {len(compiled())}")
+
+
+def synthetic_shop_listing_html(n_products: int = 48, seed: int = 5) -> str:
+    """
+    Listagem sintética com o peso de uma loja real: menu grande, JSON e
+    SVGs inline, cards com preço/avaliação/botões e rodapé.
+    """
+    rng = random.Random(seed)
+    icon = '<svg viewBox="0 0 24 24">' + '<path d="M12 2l3 7h7l-5.5 4 2 7-6.5-4.5L5.5 20l2-7L2 9h7z"/>' * 5 + "</svg>"
+    state = json.dumps({"products": [{"id": i, "name": f"Produto {i}", "price": i * 1.5} for i in range(400)]})
+    menu = "".join(
+        f'<li class="menu-item"><a href="/categoria/{i}/"><span>{icon}Categoria {i}</span></a></li>' for i in range(120)
+    )
+    cards = "".join(
+        f'<li class="product type-product post-{i} instock">'
+        f'<a href="/produto/shampoo-hidratante-{i}/" class="woocommerce-LoopProduct-link">'
+        f'<img src="/img/{i}.jpg" srcset="/img/{i}-300.jpg 300w, /img/{i}-600.jpg 600w" alt="Shampoo {i}">'
+        f'<h2 class="woocommerce-loop-product__title">Shampoo Hidratante {i}</h2></a>'
+        f'<div class="star-rating" role="img">{icon * 5}<span>Avaliação {rng.randint(1, 5)}</span></div>'
+        f'<span class="price"><del><bdi>R$ {rng.randint(50, 99)},90</bdi></del><ins><bdi>R$ {rng.randint(10, 49)},90</bdi></ins></span>'
+        f'<div class="installments"><span>ou 3x de R$ {rng.randint(5, 15)},30 sem juros</span></div>'
+        f'<a href="?add-to-cart={i}" class="button add_to_cart_button">{icon}Comprar</a>'
+        f'<button class="wishlist">{icon}</button></li>'
+        for i in range(n_products)
+    )
+    footer = "".join(f'<div class="col"><h4>Bloco {i}</h4><p>{"Texto institucional. " * 20}</p></div>' for i in range(30))
+    return (
+        '<!DOCTYPE html><html><head><title>Loja</title>'
+        '<link rel="next" href="/loja/page/2/">'
+        f'<script type="application/json" id="state">{state}</script>'
+        f'<style>{".x{color:red}" * 500}</style></head>'
+        f'<body class="woocommerce"><header><nav><ul>{menu}</ul></nav></header>'
+        f'<main><ul class="products columns-4">{cards}</ul>'
+        '<nav class="woocommerce-pagination"><a class="next page-numbers" href="/loja/page/2/">Próxima</a></nav>'
+        f'</main><footer>{footer}</footer></body></html>'
+    )
+
+
+# Trechos em que a redução já divergiu da página inteira: <a> dentro de
+# conteúdo que o backend pode tratar como texto
+LISTING_EDGE_CASES = [
+    '<html><head><title>x <a href="/t">t</a></title></head><body><a href="/p/1">p</a></body></html>',
+    '<html><body><textarea><a href="/fake">f</a></textarea><a href="/p/1">p</a></body></html>',
+    '<html><body><noscript><a href="/ns">n</a></noscript><div class="product"><a href="/p/1">p</a></div></body></html>',
+    '<html><body><template><a href="/tp">t</a></template><a href="/p/1">p</a></body></html>',
+    '<html><body><TEXTAREA><a href="/fake">f</a></TEXTAREA ><script>"<a href=/s>"</script><a href="/p/1">p</a></body></html>',
+]
+
+
+def bench_listing(html: str) -> None:
+    """Árvore da página inteira versus make_listing_soup, por backend HTML."""
+    for backend in sc.available_html_backends():
+        sc.set_html_backend(backend)
+        for case in LISTING_EDGE_CASES:
+            full = [a.get("href") for a in sc.make_soup(case).find_all("a")]
+            reduced = [a.get("href") for a in sc.make_listing_soup(case).find_all("a")]
+            assert full == reduced, (backend, case, full, reduced)
+    print(f"Página: {len(html)} caracteres, reduzida: {len(sc.listing_markup(html))}")
+    selectors = ["ul.products li.product a", "li.product a.woocommerce-LoopProduct-link", ".product a", ".products a"]
+
+    def links(soup) -> List[str]:
+        found = [a.get("href") for sel in selectors for a in soup.select(sel)]
+        next_link = soup.select_one("a.page-numbers.next")
+        return found + [next_link.get("href") if next_link else None]
+
+    print(f"{'backend':>12} {'inteira (ms)':>13} {'parcial (ms)':>13} {'só parse inteira/parcial (ms)':>30}")
+    for backend in sc.available_html_backends():
+        sc.set_html_backend(backend)
+        assert links(sc.make_soup(html)) == links(sc.make_listing_soup(html))
+        full = timeit(lambda: links(sc.make_soup(html)), repeat=5)
+        partial = timeit(lambda: links(sc.make_listing_soup(html)), repeat=5)
+        parse_full = timeit(lambda: sc.make_soup(html), repeat=5)
+        parse_partial = timeit(lambda: sc.make_listing_soup(html), repeat=5)
+        print(f"{backend:>12} {full:>13.2f} {partial:>13.2f} {parse_full:>17.2f} / {parse_partial:.2f}")
+
+
+# Versões anteriores ao registro TEXT_RULES (regex como string a cada
+# chamada e tabelas montadas dentro da função), para comparação
+def normalize_space_before(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def extract_ph_before(full_text: str) -> Optional[str]:
+    match = re.search(r"pH\s*([\d]{1,2}(?:[.,]\d)?)", full_text, flags=re.IGNORECASE)
+    return match.group(1) if match else None
+
+
+def extract_audience_before(lower: str) -> str:
+    if any(w in lower for w in ["bebê", "bebe", "recém-nascido", "0+", "baby"]):
+        return "Infantil (0-3)"
+    if any(w in lower for w in ["infantil", "criança", "crianca", "kid", "kids"]):
+        return "Infantil (3-12)"
+    if "teen" in lower or "adolescente" in lower:
+        return "Teen"
+    return "Adulto"
+
+
+def extract_hair_type_before(lower: str) -> str:
+    mapping = [(kw, label) for kw, label in sc.TEXT_RULES_CONFIG["hair_types"]]
+    for keyword, label in mapping:
+        if keyword in lower:
+            return label
+    return ""
+
+
+def bench_rules(text: str) -> None:
+    """Regras de texto de um produto: antes (re.* com strings, laços) versus TEXT_RULES."""
+    lower = text.lower()
+    raw_ingredients = "Ingredientes: " + ", ".join(["aqua", "glycerin", "cetearyl alcohol"] * 10)
+    fields = [text[i:i + 120] for i in range(0, 1200, 120)]  # nome, marca, descrição...
+    before = {
+        "normalize_space x10": lambda: [normalize_space_before(f) for f in fields],
+        "pH": lambda: extract_ph_before(text),
+        "público": lambda: extract_audience_before(lower),
+        "tipo de cabelo": lambda: extract_hair_type_before(lower),
+        "marca": lambda: re.search(r"(?:Marca|Brand)[:\s]+([^\n\r,]+)", text, re.IGNORECASE),
+        "prefixo ingredientes": lambda: re.sub(
+            r"^(ingredientes|composição|inci|ingredients|composition)[:\s]*", "", raw_ingredients, flags=re.IGNORECASE
+        ),
+    }
+    after = {
+        "normalize_space x10": lambda: [sc.normalize_space(f) for f in fields],
+        "pH": lambda: sc.TEXT_RULES.ph.search(text),
+        "público": lambda: sc.extract_audience(text, lower),
+        "tipo de cabelo": lambda: sc.extract_hair_type_from_text(text, lower),
+        "marca": lambda: sc.TEXT_RULES.brand_label_any.search(text),
+        "prefixo ingredientes": lambda: sc.TEXT_RULES.section_prefix.sub("", raw_ingredients),
+    }
+    assert extract_audience_before(lower) == sc.extract_audience(text, lower)
+    assert extract_hair_type_before(lower) == sc.extract_hair_type_from_text(text, lower)
+    print(f"Texto: {len(text)} caracteres")
+    print(f"{'regra':>22} {'antes (µs)':>11} {'agora (µs)':>11}")
+    total_before = total_after = 0.0
+    for name in before:
+        t_before = timeit(before[name], repeat=500) * 1000
+        t_after = timeit(after[name], repeat=500) * 1000
+        total_before += t_before
+        total_after += t_after
+        print(f"{name:>22} {t_before:>11.1f} {t_after:>11.1f}")
+    print(f"{'por produto':>22} {total_before:>11.1f} {total_after:>11.1f}")
+
+
+def load_fixtures(fixtures_dir: str = FIXTURES_DIR) -> List[Dict[str, str]]:
+    """Lê index.json (file, url, kind) e carrega o HTML de cada fixture."""
+    with open(os.path.join(fixtures_dir, "index.json"), "r", encoding="utf-8") as f:
+        fixtures = json.load(f)
+    for fixture in fixtures:
+        with open(os.path.join(fixtures_dir, fixture["file"]), "r", encoding="utf-8") as f:
+            fixture["html"] = f.read()
+    return fixtures
+
+
+def fixture_parser(url: str) -> sc.BrandParser:
+    """Como select_parser, mas sem detectar a plataforma pela rede."""
+    return sc.BRAND_PARSERS.get(sc.get_domain(url), sc.GENERIC_PARSER)
+
+
+def output_digest(value: object) -> str:
+    """Hash curto da saída, para notar mudanças de resultado além do tempo."""
+    dumped = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(dumped.encode("utf-8")).hexdigest()[:12]
+
+
+def best_of(func: Callable[[], object], repeat: int, rounds: int = 5) -> float:
+    """
+    Menor média entre `rounds` rodadas de timeit, com o coletor de lixo
+    desligado (menos sensível a ruído). Etapas rápidas repetem mais, até
+    cada rodada durar uns 50 ms.
+    """
+    single = timeit(func, repeat=1)
+    repeat = max(repeat, min(20000, int(50 / max(single, 0.001))))
+    gc.collect()
+    gc.disable()
+    try:
+        return min(timeit(func, repeat) for _ in range(rounds))
+    finally:
+        gc.enable()
+
+
+def fixture_stages(fixture: Dict[str, str], session) -> Dict[str, Callable[[], object]]:
+    """Etapas medidas de uma fixture; cada função devolve a saída da etapa."""
+    html, url = fixture["html"], fixture["url"]
+    parser = fixture_parser(url)
+    if fixture["kind"] == "listing":
+        return {"links": lambda: parser.get_product_links(session, url)}
+
+    ctx = sc.PageContext(html, url)
+    record = parser.parse_html(html, url) or {}
+    ingredients = sc.parse_ingredients_list(str(record.get("ingredients_raw", "")))
+    product_type = str(record.get("product_type", ""))
+    return {
+        "html": lambda: sc.PageContext(html, url).full_text,
+        "parser": lambda: parser.parse_html(html, url),
+        "claims": lambda: sc.detect_claims(ctx, str(record.get("ingredients_raw", ""))),
+        "cronograma": lambda: sc.classify_cronograma(ingredients),
+        "cabelos_finos": lambda: sc.score_fine_hair(ingredients, product_type),
+    }
+
+
+def slower_than(now: float, before: Optional[float], tolerance: float, min_delta: float = 0.0) -> bool:
+    """True se `now` passou da base pela tolerância e por mais de min_delta."""
+    return bool(before) and now > before * (1 + tolerance) and now - before > min_delta
+
+
+def run_suite(
+    fixtures: List[Dict[str, str]],
+    repeat: int = 5,
+    baseline: Optional[Dict[str, object]] = None,
+    tolerance: float = SUITE_TOLERANCE,
+) -> Dict[str, object]:
+    """
+    Mede cada etapa de cada fixture (ms por página, melhor de 5 rodadas),
+    registros/s do parser completo e o pico de memória de uma passada.
+    As listagens são servidas pelo cache HTTP em modo offline. Com uma
+    linha de base, etapas de SUITE_GATED_STAGES acima da tolerância são
+    remedidas até SUITE_CONFIRM_RUNS vezes antes de valer o resultado.
+    """
+    base_timings = (baseline or {}).get("timings_ms", {})
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = sc.configure_response_cache(os.path.join(tmp, "fixtures.sqlite3"), offline=True)
+        for fixture in fixtures:
+            cache.put(fixture["url"], fixture["html"], None, None)
+        session = sc.new_session()
+        try:
+            stages = {
+                fixture["file"]: fixture_stages(fixture, session)
+                for fixture in fixtures if fixture["kind"] != "page"
+            }
+            timings = {
+                name: {stage: round(best_of(func, repeat), 3) for stage, func in funcs.items()}
+                for name, funcs in stages.items()
+            }
+            for name, funcs in stages.items():
+                for stage in SUITE_GATED_STAGES:
+                    before = base_timings.get(name, {}).get(stage)
+                    for _ in range(SUITE_CONFIRM_RUNS):
+                        if stage not in funcs or not slower_than(timings[name][stage], before, tolerance, SUITE_MIN_DELTA_MS):
+                            break
+                        timings[name][stage] = min(timings[name][stage], round(best_of(funcs[stage], repeat), 3))
+            outputs = {name: {stage: output_digest(func()) for stage, func in funcs.items()} for name, funcs in stages.items()}
+
+            tracemalloc.start()
+            for funcs in stages.values():
+                (funcs.get("parser") or funcs["links"])()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        finally:
+            sc.configure_response_cache(None)
+
+    parse_ms = sum(stage["parser"] for stage in timings.values() if "parser" in stage)
+    products = sum(1 for stage in timings.values() if "parser" in stage)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "html_backend": sc.HTML_PARSER_BACKEND,
+            "date": time.strftime("%Y-%m-%d"),
+        },
+        "timings_ms": timings,
+        "outputs": outputs,
+        "records_per_second": round(products / (parse_ms / 1000), 1) if parse_ms else 0.0,
+        "peak_memory_kb": round(peak / 1024),
+    }
+
+
+def compare_suite(result: Dict[str, object], baseline: Optional[Dict[str, object]], tolerance: float) -> int:
+    """Imprime a suíte lado a lado com a linha de base; retorna o nº de regressões."""
+    base_timings = (baseline or {}).get("timings_ms", {})
+    base_outputs = (baseline or {}).get("outputs", {})
+    if baseline and baseline.get("meta", {}).get("html_backend") != result["meta"]["html_backend"]:
+        print(f"Aviso: linha de base gravada com o backend {baseline['meta'].get('html_backend')}")
+    regressions = 0
+
+    def verdict(now: float, before: Optional[float], min_delta: float = 0.0) -> str:
+        nonlocal regressions
+        if before is None:
+            return "novo"
+        if slower_than(now, before, tolerance, min_delta):
+            regressions += 1
+            return "REGRESSÃO"
+        return "ok"
+
+    print(f"{'fixture':>28} {'etapa':>14} {'ms':>9} {'base ms':>9} {'variação':>9}")
+    for name, stages in result["timings_ms"].items():
+        for stage, ms in stages.items():
+            before = base_timings.get(name, {}).get(stage)
+            change = f"{(ms / before - 1) * 100:+.0f}%" if before else "-"
+            if stage in SUITE_GATED_STAGES:
+                status = verdict(ms, before, SUITE_MIN_DELTA_MS)
+            else:
+                status = "informativo"
+            if before is not None and base_outputs.get(name, {}).get(stage) != result["outputs"][name][stage]:
+                status += ", saída diferente"
+            print(f"{name:>28} {stage:>14} {ms:>9.3f} {before if before is not None else '-':>9} {change:>9}  {status}")
+
+    rps, base_rps = result["records_per_second"], (baseline or {}).get("records_per_second")
+    # Vazão menor que a base é regressão (a comparação é pelo inverso)
+    rps_status = verdict(1 / rps if rps else 0.0, 1 / base_rps if base_rps else None)
+    print(f"Registros/s (parser completo): {rps} (base {base_rps if base_rps else '-'})  {rps_status}")
+    peak, base_peak = result["peak_memory_kb"], (baseline or {}).get("peak_memory_kb")
+    print(f"Pico de memória: {peak} KB (base {base_peak if base_peak else '-'})  {verdict(peak, base_peak)}")
+    return regressions
+
+
+def bench_suite(args: argparse.Namespace) -> None:
+    """Roda a suíte offline; sai com código 1 se houver regressão."""
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    result = run_suite(load_fixtures(args.fixtures), repeat=args.repeat, baseline=baseline, tolerance=args.tolerance)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"Linha de base gravada em {args.baseline}")
+        compare_suite(result, None, args.tolerance)
+        return
+    if baseline is None:
+        print(f"Sem linha de base em {args.baseline} (use --save-baseline)")
+    regressions = compare_suite(result, baseline, args.tolerance)
+    if regressions:
+        print(f"{regressions} regressões acima de {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+def fixture_filename(url: str) -> str:
+    """Nome de arquivo da fixture a partir do domínio e do caminho da URL."""
+    parsed = urlparse(url)
+    slug = re.sub(r"[^a-z0-9]+", "_", f"{sc.get_domain(url)}{parsed.path}?{parsed.query}".lower()).strip("_")
+    return f"{slug[:80]}.html"
+
+
+def record_fixtures(args: argparse.Namespace) -> None:
+    """Copia páginas do cache HTTP de uma coleta real para as fixtures."""
+    index_path = os.path.join(args.fixtures, "index.json")
+    with open(index_path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    cache = sc.ResponseCache(args.cache, offline=True)
+    try:
+        for url in args.url:
+            entry = cache.get(url)
+            if entry is None:
+                print(f"{url} não está em {args.cache}")
+                continue
+            name = fixture_filename(url)
+            with open(os.path.join(args.fixtures, name), "w", encoding="utf-8") as f:
+                f.write(entry.body)
+            index = [fixture for fixture in index if fixture["url"] != url]
+            index.append({"file": name, "url": url, "kind": args.kind})
+            print(f"{url} -> {name}")
+    finally:
+        cache.close()
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("bench", choices=("claims", "urls", "listing", "rules", "suite", "record"))
+    parser.add_argument("--html", help="página HTML usada como texto (padrão: texto sintético)")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="diretório das fixtures (suite/record)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="linha de base da suíte")
+    parser.add_argument("--save-baseline", action="store_true", help="grava o resultado como nova linha de base")
+    parser.add_argument("--tolerance", type=float, default=SUITE_TOLERANCE, help="variação tolerada (0.25 = 25%%)")
+    parser.add_argument("--repeat", type=int, default=5, help="chamadas por rodada na suíte")
+    parser.add_argument(
+        "--html-backend", choices=sc.available_html_backends(), default=sc.HTML_PARSER_BACKEND,
+        help="parser HTML usado pela suíte",
+    )
+    parser.add_argument("--cache", default=sc.RESPONSE_CACHE_PATH, help="cache HTTP de onde gravar (record)")
+    parser.add_argument("--url", action="append", default=[], help="URL a gravar como fixture (record, repetível)")
+    parser.add_argument("--kind", choices=FIXTURE_KINDS, default="product", help="tipo da fixture gravada")
+    args = parser.parse_args()
+
+    if args.bench == "suite":
+        sc.set_html_backend(args.html_backend)
+        bench_suite(args)
+        return
+    if args.bench == "record":
+        record_fixtures(args)
+        return
+
+    html = None
+    if args.html:
+        with open(args.html, "r", encoding="utf-8") as f:
+            html = f.read()
+
+    if args.bench == "claims":
+        bench_claims(sc.PageContext(html, args.html).text_lower if html else synthetic_page_text())
+    elif args.bench == "urls":
+        bench_urls(html or synthetic_listing_html())
+    elif args.bench == "listing":
+        bench_listing(html or synthetic_shop_listing_html())
+    elif args.bench == "rules":
+        bench_rules(sc.PageContext(html, args.html).full_text if html else synthetic_page_text(1500))
+
+
+if __name__ == "__main__":
+    main()
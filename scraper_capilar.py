@@ -1,14 +1,63 @@
+import asyncio
+import bisect
+import hashlib
+import html as html_lib
+import inspect
+import itertools
+import json
 import logging
+import multiprocessing
+import os
 import random
 import re
+import shutil
+import sqlite3
+import threading
 import time
-from dataclasses import dataclass
-from typing import Callable, Dict, List, Optional, Tuple, Set
-from urllib.parse import urljoin, urlparse
-
+import unicodedata
+import xml.etree.ElementTree as ET
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Set
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+from urllib.robotparser import RobotFileParser
+
+import numpy as np
 import pandas as pd
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+from urllib3.util.retry import Retry
+from openpyxl import Workbook
+
+try:  # Backends de parsing opcionais
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:  # pragma: no cover
+    HAS_LXML = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # pragma: no cover
+    LexborHTMLParser = None
+
+try:  # Aho-Corasick em C, se disponível (senão usamos a versão em Python)
+    import ahocorasick
+except ImportError:  # pragma: no cover
+    ahocorasick = None
+
+try:  # Parquet é opcional
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
 
 
 # ==========================
@@ -23,8 +72,111 @@ DEFAULT_HEADERS = {
     )
 }
 
-# Delay aleatório entre requisições para respeitar os sites
-REQUEST_DELAY_SECONDS: Tuple[float, float] = (1.0, 3.0)
+# Limite de requisições por domínio: (requisições por segundo, rajada máxima)
+DEFAULT_RATE_LIMIT: Tuple[float, int] = (0.5, 2)
+
+# Limites específicos por domínio (sobrescrevem DEFAULT_RATE_LIMIT)
+DOMAIN_RATE_LIMITS: Dict[str, Tuple[float, int]] = {}
+
+# Pequeno atraso aleatório somado a cada espera, para não soar robótico
+RATE_LIMIT_JITTER_SECONDS: Tuple[float, float] = (0.0, 0.5)
+
+# Ao receber 429/503 a taxa do domínio é multiplicada por este fator;
+# a cada resposta bem-sucedida ela volta a subir até o limite configurado
+RATE_LIMIT_BACKOFF_FACTOR = 0.5
+RATE_LIMIT_RECOVERY_FACTOR = 1.1
+RATE_LIMIT_MIN_RATE = 0.02
+
+# Transporte HTTP: quantos hosts mantêm pool de conexões abertas na mesma
+# sessão e quantas conexões keep-alive cada host guarda
+HTTP_POOL_HOSTS = 128
+HTTP_POOL_MAXSIZE_PER_HOST = 4
+
+# Timeouts separados por fase, em segundos: (conexão, leitura). A leitura
+# conta o tempo sem receber bytes, não o download inteiro.
+HTTP_CONNECT_TIMEOUT = 5.0
+HTTP_READ_TIMEOUT = 20.0
+HTTP_TIMEOUT: Tuple[float, float] = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+# Repetições por classe de erro. connect/read/server_error (500/502/504) são
+# repetidas no transporte, com backoff exponencial + jitter; rate_limited
+# (429/503) em fetch_page, depois da espera imposta pelo limitador de taxa.
+HTTP_RETRY_POLICY: Dict[str, int] = {
+    "connect": 1,
+    "read": 1,
+    "server_error": 2,
+    "rate_limited": 1,
+}
+HTTP_RETRY_STATUSES = (500, 502, 504)
+HTTP_BACKOFF_FACTOR = 0.5
+HTTP_BACKOFF_JITTER = 0.5
+
+# Disjuntor por domínio: depois de tantas falhas seguidas (classes abaixo)
+# o domínio para de receber requisições e o resto da marca é descartado.
+# Passado o intervalo, uma requisição de teste decide se ele volta.
+CIRCUIT_BREAKER_THRESHOLD = 5
+CIRCUIT_BREAKER_COOLDOWN_SECONDS = 600.0
+CIRCUIT_BREAKER_ERRORS = ("connect", "read", "server_error")
+
+# Corpo das respostas: lido em blocos, com limite de tamanho e de tempo total
+# de download; tipos fora da lista não são baixados (PDFs, imagens...).
+# Sem Content-Type a resposta é aceita.
+HTTP_MAX_BODY_BYTES = 5 * 1024 * 1024
+HTTP_MAX_DOWNLOAD_SECONDS = 60.0
+HTTP_CHUNK_SIZE = 64 * 1024
+HTTP_ALLOWED_CONTENT_TYPES = (
+    "text/html",
+    "application/xhtml+xml",
+    "application/json",
+    "application/ld+json",
+    "text/plain",
+)
+
+# Cache HTTP em disco (SQLite). Só é usado depois de configure_response_cache().
+RESPONSE_CACHE_PATH = "http_cache.sqlite3"
+# Respostas mais novas que isso são reutilizadas sem nenhuma requisição;
+# as mais antigas são revalidadas com If-None-Match/If-Modified-Since
+RESPONSE_CACHE_TTL_SECONDS = 24 * 3600
+# Limites para despejo: idade máxima e tamanho total (corpos comprimidos)
+RESPONSE_CACHE_MAX_AGE_SECONDS = 30 * 24 * 3600
+RESPONSE_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Modo incremental: incremente ao mudar a lógica de extração para forçar o
+# reprocessamento de todos os produtos já presentes no manifesto
+MANIFEST_VERSION = 2
+
+# Saída Parquet: registros por row group
+PARQUET_ROW_GROUP_SIZE = 5000
+
+# Backend de parsing HTML usado por todos os parsers (ver HTML_BACKENDS):
+# "html.parser" (puro Python, padrão), "lxml" (bem mais rápido, mesmo
+# BeautifulSoup), "html5lib" ou "selectolax" (adaptador com a mesma API)
+HTML_PARSER_BACKEND = "html.parser"
+
+# Descoberta por sitemap: limites de arquivos lidos e de URLs por marca
+SITEMAP_MAX_FILES = 50
+SITEMAP_MAX_URLS = 20000
+SITEMAP_CHUNK_SIZE = 64 * 1024
+
+# APIs de catálogo (VTEX, Shopify, WooCommerce): limite de produtos por
+# marca e plataforma forçada por domínio (None desativa a detecção)
+CATALOG_MAX_PRODUCTS = 5000
+PLATFORM_BY_DOMAIN: Dict[str, Optional[str]] = {}
+
+# Engine assíncrono: quantos domínios são raspados ao mesmo tempo.
+# Cada domínio continua recebendo uma requisição por vez.
+ASYNC_MAX_CONCURRENT_DOMAINS = 8
+
+# Engine "process": downloads em threads (um domínio por thread) e parsing
+# num pool de processos. A fila limita quantas páginas baixadas podem
+# esperar pelo parse antes de os fetchers pararem.
+PARSE_WORKERS = os.cpu_count() or 2
+PARSE_QUEUE_SIZE = 64
+
+# Métricas da execução: limites (segundos) dos histogramas de tempo por
+# etapa e quantos domínios mais lentos aparecem no resumo do log
+RUN_METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RUN_METRICS_TOP_DOMAINS = 10
 
 
 # Claims configurados: coluna -> {label para humanos, lista de palavras-chave}
@@ -95,6 +247,54 @@ CLAIMS_CONFIG: Dict[str, Dict[str, List[str]]] = {
     },
 }
 
+# Detecção de claims: exigir fronteira de palavra (evita "peta" em
+# "tapete") e ignorar acentos ("protecao" casa com "proteção")
+CLAIMS_MATCH_WORD_BOUNDARY = False
+CLAIMS_MATCH_FOLD_ACCENTS = False
+# Sem o pyahocorasick, abaixo de tantas palavras-chave um `in` por palavra
+# é mais rápido que a regex em trie (benchmark_scraper.py claims: empate
+# por volta de 150 palavras; as 51 de CLAIMS_CONFIG ficam no `in`)
+CLAIMS_AUTOMATON_MIN_KEYWORDS = 150
+
+# Regras de texto dos extratores (compiladas em TEXT_RULES; um JSON passado
+# em --text-rules sobrescreve qualquer chave). ph, brand_label_any e
+# section_prefix ignoram maiúsculas/minúsculas; as tabelas são ordenadas:
+# vale a primeira entrada presente no texto (minúsculo).
+TEXT_RULES_CONFIG: Dict[str, object] = {
+    "ph": r"pH\s*([\d]{1,2}(?:[.,]\d)?)",
+    "brand_label": r"Marca:\s*([^\n\r]+)",
+    "brand_label_any": r"(?:Marca|Brand)[:\s]+([^\n\r,]+)",
+    "ingredients_prefix": r"^(ingredientes|composição|composition)[:\s]*",
+    "section_prefix": r"^(ingredientes|composição|inci|ingredients|composition)[:\s]*",
+    "audience": [
+        ["Infantil (0-3)", ["bebê", "bebe", "recém-nascido", "0+", "baby"]],
+        ["Infantil (3-12)", ["infantil", "criança", "crianca", "kid", "kids"]],
+        ["Teen", ["teen", "adolescente"]],
+    ],
+    "audience_default": "Adulto",
+    "hair_types": [
+        ["cabelos cacheados", "Cacheado/Crespo"],
+        ["cabelos crespos", "Cacheado/Crespo"],
+        ["cabelos ondulados", "Ondulado"],
+        ["cabelos lisos", "Liso"],
+        ["cabelos oleosos", "Oleoso/Fino"],
+        ["couro cabeludo oleoso", "Oleoso/Fino"],
+        ["cabelos mistos", "Misto"],
+        ["cabelos secos", "Seco/Ressecado"],
+        ["cabelos ressecados", "Seco/Ressecado"],
+        ["cabelos danificados", "Danificado/Quimicamente tratado"],
+        ["cabelos quimicamente tratados", "Danificado/Quimicamente tratado"],
+        ["cabelos coloridos", "Colorido/Quimicamente tratado"],
+        ["cabelos tingidos", "Colorido/Quimicamente tratado"],
+        ["cabelos loiros", "Loiro"],
+    ],
+}
+
+# Uma tabela de palavras-chave vira uma única regex em trie quando suas
+# palavras começam com no máximo tantas letras distintas; com mais, cada
+# posição do texto testaria várias alternativas e `in` por palavra é mais barato
+KEYWORD_TABLE_MAX_INITIALS = 3
+
 # Grupos de ingredientes para inferência
 HUMECTANTS = {
     "glycerin", "glicerina",
@@ -151,6 +351,33 @@ SILICONES_VOLATILE = {
     "cyclopentasiloxane", "cyclohexasiloxane",
 }
 
+# Categorias de ingrediente como bits: um ingrediente pode ter várias
+ING_HUMECTANT = 1 << 0
+ING_OIL_LIGHT = 1 << 1
+ING_OIL_HEAVY = 1 << 2
+ING_PROTEIN = 1 << 3
+ING_AMINOACID = 1 << 4
+ING_SILICONE_HEAVY = 1 << 5
+ING_SILICONE_VOLATILE = 1 << 6
+
+INGREDIENT_GROUPS: List[Tuple[Set[str], int]] = [
+    (HUMECTANTS, ING_HUMECTANT),
+    (OILS_LIGHT, ING_OIL_LIGHT),
+    (OILS_HEAVY, ING_OIL_HEAVY),
+    (PROTEINS, ING_PROTEIN),
+    (AMINOACIDS, ING_AMINOACID),
+    (SILICONES_HEAVY, ING_SILICONE_HEAVY),
+    (SILICONES_VOLATILE, ING_SILICONE_VOLATILE),
+]
+
+# Máscaras compostas usadas pelos scores
+ING_NUTRITION = ING_OIL_LIGHT | ING_OIL_HEAVY
+ING_RECONSTRUCTION = ING_PROTEIN | ING_AMINOACID
+ING_HEAVY = ING_OIL_HEAVY | ING_SILICONE_HEAVY
+
+# Quantos nomes INCI distintos manter no cache de classificação
+INGREDIENT_CACHE_SIZE = 65536
+
 PRODUCT_TYPES = [
     ("shampoo", "Shampoo"),
     ("condicionador", "Condicionador"),
@@ -170,386 +397,2348 @@ PRODUCT_TYPES = [
 
 
 # ==========================
-# Utilitários
+# Controle de taxa por domínio
 # ==========================
 
-def polite_sleep() -> None:
-    """Espera um tempo aleatório entre as requisições."""
-    time.sleep(random.uniform(*REQUEST_DELAY_SECONDS))
-
-
-def normalize_space(text: str) -> str:
-    """Normaliza espaços em um texto."""
-    return re.sub(r"\s+", " ", text).strip()
+class TokenBucket:
+    """
+    Balde de fichas de um domínio: `rate` fichas por segundo até `capacity`.
+    Cada requisição consome uma ficha; se não houver, a chamada reserva a
+    próxima ficha e devolve quanto tempo precisa esperar.
+    """
 
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        self.tokens = min(float(self.capacity), self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Consome uma ficha e retorna os segundos de espera necessários."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1.0
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.blocked_until - now)
+
+    def slow_down(self, retry_after: Optional[float]) -> None:
+        """Reduz a taxa e, se informado, bloqueia até o Retry-After."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(RATE_LIMIT_MIN_RATE, self.rate * RATE_LIMIT_BACKOFF_FACTOR)
+            pause = retry_after if retry_after is not None else 1.0 / self.rate
+            self.blocked_until = max(self.blocked_until, now + pause)
+            self.tokens = min(self.tokens, 0.0)
+
+    def speed_up(self) -> None:
+        """Recupera gradualmente a taxa configurada após respostas normais."""
+        with self.lock:
+            if self.rate < self.base_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.base_rate, self.rate * RATE_LIMIT_RECOVERY_FACTOR)
+
+    def cap_rate(self, max_rate: float) -> None:
+        """Limita a taxa (ex.: Crawl-delay) e elimina rajadas."""
+        with self.lock:
+            self.base_rate = min(self.base_rate, max_rate)
+            self.rate = min(self.rate, max_rate)
+            self.capacity = 1
+            self.tokens = min(self.tokens, 1.0)
+
+
+class DomainRateLimiter:
+    """Mantém um TokenBucket por domínio (chaveado por get_domain)."""
+
+    def __init__(self) -> None:
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        domain = get_domain(url)
+        with self.lock:
+            bucket = self.buckets.get(domain)
+            if bucket is None:
+                rate, burst = DOMAIN_RATE_LIMITS.get(domain, DEFAULT_RATE_LIMIT)
+                bucket = TokenBucket(rate, burst)
+                self.buckets[domain] = bucket
+            return bucket
+
+    def acquire(self, url: str) -> None:
+        """Bloqueia até que o domínio da URL possa receber outra requisição."""
+        wait = self.bucket(url).reserve()
+        if wait > 0:
+            wait += random.uniform(*RATE_LIMIT_JITTER_SECONDS)
+            time.sleep(wait)
+
+    def penalize(self, url: str, retry_after: Optional[float] = None) -> None:
+        self.bucket(url).slow_down(retry_after)
+
+    def record_success(self, url: str) -> None:
+        self.bucket(url).speed_up()
+
+    def set_crawl_delay(self, url: str, delay: float) -> None:
+        if delay > 0:
+            self.bucket(url).cap_rate(1.0 / delay)
+
+
+RATE_LIMITER = DomainRateLimiter()
+
+# robots.txt já lidos, por domínio (None quando indisponível)
+ROBOTS_CACHE: Dict[str, Optional[RobotFileParser]] = {}
+ROBOTS_LOCK = threading.Lock()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Converte o header Retry-After (segundos ou data HTTP) em segundos."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
 
-def get_domain(url: str) -> str:
-    """Extrai o domínio de uma URL, sem 'www.'."""
-    netloc = urlparse(url).netloc
-    if netloc.startswith("www."):
-        netloc = netloc[4:]
-    return netloc
 
+def get_robots(session: requests.Session, url: str) -> Optional[RobotFileParser]:
+    """
+    Baixa (uma vez por domínio) e interpreta o robots.txt do site. No modo
+    offline não há rede; com o disjuntor aberto, fica para a próxima chamada.
+    """
+    domain = get_domain(url)
+    with ROBOTS_LOCK:
+        if domain in ROBOTS_CACHE:
+            return ROBOTS_CACHE[domain]
+        # Marca como em andamento para não buscar duas vezes em paralelo
+        ROBOTS_CACHE[domain] = None
+    if RESPONSE_CACHE is not None and RESPONSE_CACHE.offline:
+        return None
+    if not CIRCUIT_BREAKER.allow(url):
+        with ROBOTS_LOCK:
+            ROBOTS_CACHE.pop(domain, None)
+        return None
 
-def fetch_html(session: requests.Session, url: str) -> str:
-    """Faz uma requisição HTTP segura e retorna o HTML como string."""
+    parsed = urlparse(url)
+    robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+    robots: Optional[RobotFileParser] = None
+    RATE_LIMITER.acquire(url)
     try:
-        resp = session.get(url, timeout=30)
+        resp = session.get(robots_url, timeout=HTTP_TIMEOUT)
+        status = resp.status_code
+        CIRCUIT_BREAKER.record(url, "" if 200 <= status < 300 else classify_status(status))
+        if status == 200:
+            robots = RobotFileParser(robots_url)
+            robots.parse(resp.text.splitlines())
     except Exception as exc:
-        logging.warning("Erro ao acessar %s: %s", url, exc)
-        return ""
-    if resp.status_code != 200:
-        logging.warning("Status %s ao acessar %s", resp.status_code, url)
-        return ""
-    return resp.text
+        CIRCUIT_BREAKER.record(url, classify_request_error(exc))
+        logging.debug("robots.txt indisponível em %s: %s", robots_url, exc)
 
+    with ROBOTS_LOCK:
+        ROBOTS_CACHE[domain] = robots
+    return robots
 
-def extract_section_by_label(
-    full_text: str,
-    labels: List[str],
-    stop_markers: Optional[List[str]] = None,
-    max_chars: int = 2000,
-) -> str:
+
+def apply_crawl_delay(session: requests.Session, url: str) -> None:
+    """Aplica o Crawl-delay do robots.txt ao limitador do domínio."""
+    if get_domain(url) in ROBOTS_CACHE:
+        return
+    robots = get_robots(session, url)
+    if robots is None:
+        return
+    delay = robots.crawl_delay(DEFAULT_HEADERS["User-Agent"])
+    if delay:
+        logging.info("Crawl-delay de %ss para %s", delay, get_domain(url))
+        RATE_LIMITER.set_crawl_delay(url, float(delay))
+
+
+# ==========================
+# Disjuntor por domínio
+# ==========================
+
+class CircuitBreaker:
     """
-    Extrai um trecho do texto a partir de um label (ex.: 'Modo de usar')
-    até encontrar um dos stop_markers ou atingir max_chars.
+    Conta falhas seguidas por domínio (get_domain). Ao chegar a
+    CIRCUIT_BREAKER_THRESHOLD o circuito abre e allow() passa a negar
+    requisições; depois de CIRCUIT_BREAKER_COOLDOWN_SECONDS uma única
+    requisição de teste é liberada e o resultado dela fecha ou reabre.
     """
-    if not full_text:
-        return ""
-    text = full_text
-    lower_text = text.lower()
 
-    start_idx = -1
-    for label in labels:
-        idx = lower_text.find(label.lower())
-        if idx != -1 and (start_idx == -1 or idx < start_idx):
-            start_idx = idx
-
-    if start_idx == -1:
-        return ""
+    def __init__(self) -> None:
+        self.failures: Dict[str, int] = {}
+        self.opened_at: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def allow(self, url: str) -> bool:
+        domain = get_domain(url)
+        with self.lock:
+            opened = self.opened_at.get(domain)
+            if opened is None:
+                return True
+            now = time.monotonic()
+            if now - opened < CIRCUIT_BREAKER_COOLDOWN_SECONDS:
+                return False
+            # Meio aberto: esta requisição testa o domínio, as demais esperam
+            self.opened_at[domain] = now
+            return True
+
+    def is_open(self, url: str) -> bool:
+        with self.lock:
+            opened = self.opened_at.get(get_domain(url))
+        return opened is not None and time.monotonic() - opened < CIRCUIT_BREAKER_COOLDOWN_SECONDS
+
+    def record(self, url: str, error: str) -> None:
+        """Registra o resultado de uma requisição ("" = sucesso)."""
+        domain = get_domain(url)
+        with self.lock:
+            if error not in CIRCUIT_BREAKER_ERRORS:
+                # Qualquer resposta do servidor (mesmo 404) mostra que ele está vivo
+                self.failures.pop(domain, None)
+                self.opened_at.pop(domain, None)
+                return
+            failures = self.failures.get(domain, 0) + 1
+            self.failures[domain] = failures
+            if failures < CIRCUIT_BREAKER_THRESHOLD:
+                return
+            reopened = domain in self.opened_at
+            self.opened_at[domain] = time.monotonic()
+        if not reopened:
+            logging.warning(
+                "Domínio %s desativado após %d falhas seguidas (última: %s)",
+                domain, failures, error,
+            )
+
+
+CIRCUIT_BREAKER = CircuitBreaker()
 
-    section = text[start_idx:]
-    if stop_markers:
-        lower_section = section.lower()
-        stop_positions: List[int] = []
-        for stop in stop_markers:
-            pos = lower_section.find(stop.lower(), len(labels[0]))
-            if pos != -1:
-                stop_positions.append(pos)
-        if stop_positions:
-            section = section[: min(stop_positions)]
 
-    if len(section) > max_chars:
-        section = section[:max_chars]
+# ==========================
+# Transporte HTTP
+# ==========================
 
-    return section.strip()
+class TransportStats:
+    """
+    Contadores do transporte por host: requisições, conexões novas (com
+    handshake TLS, no caso de https) e repetições. Conexões novas abaixo
+    do número de requisições = keep-alive funcionando.
+    """
 
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.hosts: Dict[str, Dict[str, int]] = {}
+
+    def _bump(self, host: str, key: str) -> None:
+        with self.lock:
+            counters = self.hosts.setdefault(host, {"requests": 0, "connections": 0, "tls_handshakes": 0, "retries": 0})
+            counters[key] += 1
+
+    def record_request(self, host: str) -> None:
+        self._bump(host, "requests")
+
+    def record_connection(self, host: str, tls: bool) -> None:
+        self._bump(host, "connections")
+        if tls:
+            self._bump(host, "tls_handshakes")
+
+    def record_retry(self, host: str) -> None:
+        self._bump(host, "retries")
+
+    def totals(self) -> Dict[str, float]:
+        with self.lock:
+            totals = {"requests": 0, "connections": 0, "tls_handshakes": 0, "retries": 0}
+            for counters in self.hosts.values():
+                for key, value in counters.items():
+                    totals[key] += value
+        requests_count = totals["requests"]
+        totals["hosts"] = len(self.hosts)
+        totals["connection_reuse"] = (
+            round(1 - totals["connections"] / requests_count, 3) if requests_count else 0.0
+        )
+        return totals
 
-def extract_ph(full_text: str) -> Optional[float]:
-    """Extrai o valor de pH, se estiver presente no texto."""
-    if not full_text:
-        return None
-    match = re.search(r"pH\s*([\d]{1,2}(?:[.,]\d)?)", full_text, flags=re.IGNORECASE)
-    if match:
-        val = match.group(1).replace(",", ".")
-        try:
-            return float(val)
-        except ValueError:
-            return None
-    return None
+    def log_summary(self) -> None:
+        totals = self.totals()
+        if totals["requests"]:
+            logging.info(
+                "Transporte: %d requisições em %d hosts, %d conexões novas "
+                "(%d handshakes TLS), %.0f%% reaproveitadas, %d repetições",
+                totals["requests"], totals["hosts"], totals["connections"],
+                totals["tls_handshakes"], totals["connection_reuse"] * 100, totals["retries"],
+            )
 
 
-def extract_audience(full_text: str) -> str:
-    """Define o público/idade alvo com base em palavras-chave no texto."""
-    if not full_text:
-        return ""
-    lower = full_text.lower()
-    if any(w in lower for w in ["bebê", "bebe", "recém-nascido", "0+", "baby"]):
-        return "Infantil (0-3)"
-    if any(w in lower for w in ["infantil", "criança", "crianca", "kid", "kids"]):
-        return "Infantil (3-12)"
-    if "teen" in lower or "adolescente" in lower:
-        return "Teen"
-    # Se nada for encontrado, consideramos adulto / geral
-    return "Adulto"
+TRANSPORT_STATS = TransportStats()
 
 
-def extract_hair_type_from_text(text: str) -> str:
-    """Extrai tipo de cabelo declarado diretamente na descrição."""
-    if not text:
-        return ""
-    lower = text.lower()
-    mapping = [
-        ("cabelos cacheados", "Cacheado/Crespo"),
-        ("cabelos crespos", "Cacheado/Crespo"),
-        ("cabelos ondulados", "Ondulado"),
-        ("cabelos lisos", "Liso"),
-        ("cabelos oleosos", "Oleoso/Fino"),
-        ("couro cabeludo oleoso", "Oleoso/Fino"),
-        ("cabelos mistos", "Misto"),
-        ("cabelos secos", "Seco/Ressecado"),
-        ("cabelos ressecados", "Seco/Ressecado"),
-        ("cabelos danificados", "Danificado/Quimicamente tratado"),
-        ("cabelos quimicamente tratados", "Danificado/Quimicamente tratado"),
-        ("cabelos coloridos", "Colorido/Quimicamente tratado"),
-        ("cabelos tingidos", "Colorido/Quimicamente tratado"),
-        ("cabelos loiros", "Loiro"),
-    ]
-    for keyword, label in mapping:
-        if keyword in lower:
-            return label
-    return ""
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        TRANSPORT_STATS.record_connection(self.host, tls=False)
+        return super()._new_conn()
 
-def parse_ingredients_list(raw_ingredients: str) -> List[str]:
-    """Normaliza e separa a lista de ingredientes."""
-    if not raw_ingredients:
-        return []
-    text = raw_ingredients.lower()
-    text = text.replace(";", ",")
-    # Remove prefixos comuns como "ingredientes:" ou "composição:"
-    text = re.sub(r'^(ingredientes|composição|composition)[:\s]*', '', text)
-    parts = [p.strip() for p in text.split(",") if p.strip()]
-    return parts
 
-def ingredient_weight(position: int) -> float:
-    """Calcula o peso do ingrediente baseado na posição (0-indexed)."""
-    # 0 = mais importante, 9 = menos
-    return max(1.0 - position * 0.1, 0)
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        TRANSPORT_STATS.record_connection(self.host, tls=True)
+        return super()._new_conn()
 
-def classify_cronograma(ingredients: List[str]) -> Dict[str, object]:
-    """Classifica o produto em H, N, R com scores."""
-    h_score = n_score = r_score = 0.0
 
-    # Considerar apenas os top 10 ingredientes para pontuação principal
-    top_ingredients = ingredients[:10]
+RETRY_SUPPORTS_JITTER = "backoff_jitter" in inspect.signature(Retry.__init__).parameters
 
-    for i, ing in enumerate(top_ingredients):
-        w = ingredient_weight(i)
-        
-        # Check partial matches for flexibility
-        if any(term in ing for term in HUMECTANTS):
-            h_score += 1.0 * w
-        
-        if any(term in ing for term in OILS_LIGHT) or any(term in ing for term in OILS_HEAVY):
-            n_score += 1.0 * w
-            
-        if any(term in ing for term in PROTEINS) or any(term in ing for term in AMINOACIDS):
-            r_score += 1.0 * w
 
-    total = h_score + n_score + r_score
-    if total == 0:
-        return {"fase": "Indefinido", "scores": {"H": 0.0, "N": 0.0, "R": 0.0}}
+class CountingRetry(Retry):
+    """Retry do urllib3 que registra cada repetição em TRANSPORT_STATS."""
 
-    h = round(h_score / total, 2)
-    n = round(n_score / total, 2)
-    r = round(r_score / total, 2)
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        TRANSPORT_STATS.record_retry(_pool.host if _pool is not None else "")
+        return super().increment(method, url, response, error, _pool, _stacktrace)
 
-    scores = {"H": h, "N": n, "R": r}
-    fase = max(scores, key=scores.get)
 
-    # Verifica empate ou proximidade para Mix
-    ordered = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-    if len(ordered) > 1 and (ordered[0][1] - ordered[1][1] < 0.15):
-        fase = f"{ordered[0][0]}+{ordered[1][0]}"
+class TunedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter com pools maiores, repetições com jitter e contadores de conexões."""
 
-    return {"fase": fase, "scores": scores}
+    def __init__(self) -> None:
+        # backoff_jitter só existe no urllib3 >= 2; no 1.26 o backoff fica sem jitter
+        jitter = {"backoff_jitter": HTTP_BACKOFF_JITTER} if RETRY_SUPPORTS_JITTER else {}
+        retry = CountingRetry(
+            total=HTTP_RETRY_POLICY["connect"] + HTTP_RETRY_POLICY["read"] + HTTP_RETRY_POLICY["server_error"],
+            connect=HTTP_RETRY_POLICY["connect"],
+            read=HTTP_RETRY_POLICY["read"],
+            status=HTTP_RETRY_POLICY["server_error"],
+            status_forcelist=HTTP_RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            backoff_factor=HTTP_BACKOFF_FACTOR,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+            **jitter,
+        )
+        super().__init__(
+            pool_connections=HTTP_POOL_HOSTS,
+            pool_maxsize=HTTP_POOL_MAXSIZE_PER_HOST,
+            max_retries=retry,
+        )
 
-def score_fine_hair(ingredients: List[str], product_category: str) -> Dict[str, object]:
-    """Calcula score de adequação para cabelos finos."""
-    top_ingredients = ingredients[:10]
-    
-    heavy_count = 0
-    light_count = 0
-    humectant_count = 0
-    protein_count = 0
-    volatile_silicone_count = 0
-    
-    product_category_lower = product_category.lower()
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
 
-    for ing in top_ingredients:
-        if any(term in ing for term in OILS_HEAVY) or any(term in ing for term in SILICONES_HEAVY):
-            heavy_count += 1
-        if any(term in ing for term in OILS_LIGHT):
-            light_count += 1
-        if any(term in ing for term in HUMECTANTS):
-            humectant_count += 1
-        if any(term in ing for term in PROTEINS) or any(term in ing for term in AMINOACIDS):
-            protein_count += 1
-        if any(term in ing for term in SILICONES_VOLATILE):
-            volatile_silicone_count += 1
+    def send(self, request, *args, **kwargs):
+        TRANSPORT_STATS.record_request(urlparse(request.url).hostname or "")
+        return super().send(request, *args, **kwargs)
 
-    score = 0.0
-    score += light_count * 0.8
-    score += humectant_count * 0.6
-    score += protein_count * 0.7
-    score += volatile_silicone_count * 0.5
-    score -= heavy_count * 1.2
 
-    if "máscara" in product_category_lower or "mascara" in product_category_lower:
-        score -= 0.5
-    if "spray" in product_category_lower:
-        score += 0.5
-    if "leave-in" in product_category_lower:
-        score += 0.2
+# ==========================
+# Métricas de execução
+# ==========================
 
-    if score >= 2.0:
-        label = "Sim"
-    elif score >= 0.5:
-        label = "Talvez"
-    else:
-        label = "Não"
-        
-    return {"score_fine": round(score, 2), "adequacao_cabelos_finos": label}
+@dataclass
+class StageSeries:
+    """Contagem, soma, máximo e histograma (não cumulativo) de uma etapa."""
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(RUN_METRICS_BUCKETS) + 1))
 
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(RUN_METRICS_BUCKETS, seconds)] += 1
 
-def infer_product_type_from_name_and_breadcrumbs(name: str, soup: BeautifulSoup) -> str:
-    """Infere o tipo de produto usando nome e possíveis breadcrumbs."""
-    sources = [name.lower()]
-    for selector in ("nav.breadcrumb", "div.breadcrumb", "ol.breadcrumb"):
-        bc = soup.select_one(selector)
-        if bc:
-            sources.append(bc.get_text(" ", strip=True).lower())
-    full = " ".join(sources)
-    for kw, label in PRODUCT_TYPES:
-        if kw in full:
-            return label
-    return "Outros"
+    def merge(self, other: "StageSeries") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
 
+    def cumulative(self) -> List[int]:
+        return list(itertools.accumulate(self.buckets))
 
-def extract_image_urls_generic(soup: BeautifulSoup, base_url: str) -> Tuple[str, str]:
-    """Tenta extrair URLs de imagem frontal e verso de forma genérica."""
-    candidates = []
-    selectors = [
-        "div.product-images img",
-        "div.product-image img",
-        "div.images img",
-        "figure.woocommerce-product-gallery__wrapper img",
-        "img#image-main",
-        "img.wp-post-image",
-        ".product-gallery__image img"
-    ]
-    for sel in selectors:
-        candidates.extend(soup.select(sel))
-    if not candidates:
-        candidates = soup.find_all("img")
 
-    urls: List[str] = []
-    for img in candidates:
-        src = img.get("src") or img.get("data-src") or img.get("data-large_image")
-        if src:
-            full_url = urljoin(base_url, src)
-            # Filtra imagens muito pequenas ou ícones comuns
-            if "icon" not in full_url.lower() and "logo" not in full_url.lower():
-                urls.append(full_url)
+# Série: (etapa, domínio, parser)
+SeriesKey = Tuple[str, str, str]
 
-    if not urls:
-        return "", ""
 
-    # Remove duplicatas mantendo ordem
-    unique_urls = []
-    seen = set()
-    for u in urls:
-        if u not in seen:
-            unique_urls.append(u)
-            seen.add(u)
-    
-    urls = unique_urls
+def prometheus_label(value: str) -> str:
+    """Escapa um valor de label do formato texto do Prometheus."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
 
-    front = urls[0] if urls else ""
-    back = ""
-    if len(urls) > 1:
-        for u in urls[1:]:
-            lower = u.lower()
-            if any(tag in lower for tag in ("back", "verso", "traseira", "tabela", "ingredientes", "rotulo")):
-                back = u
-                break
-        if not back:
-            back = urls[1]
 
-    return front, back
+class RunMetrics:
+    """
+    Tempos das etapas de uma execução, por domínio e parser (o `_parser`
+    dos registros): brand (marca inteira), links, fetch/cache, parse e,
+    dentro dele, parse.html, parse.structured, extract.* e score.*, além
+    de export.*. Quem não informa domínio/parser herda os do contexto da
+    thread (context()), o que mantém os extratores sem parâmetros extras.
+    Nos processos de parsing as séries são esvaziadas (drain) a cada
+    página e somadas no processo principal (merge).
+    """
 
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.series: Dict[SeriesKey, StageSeries] = {}
+        self.errors: Dict[Tuple[str, str], int] = {}
 
-def detect_claims(soup: BeautifulSoup, full_text: str) -> Dict[str, object]:
-    """Marca os claims (booleans) com base em texto e metadados de imagens."""
-    text = (full_text or "").lower()
-
-    img_bits: List[str] = []
-    for img in soup.find_all("img"):
-        for attr in ("alt", "title"):
-            val = img.get(attr)
-            if val:
-                img_bits.append(val.lower())
-        src = img.get("src") or ""
-        if src:
-            img_bits.append(src.lower())
-    text = text + "\n" + "\n".join(img_bits)
+    @contextmanager
+    def context(self, domain: str, parser: str) -> Iterator[None]:
+        previous = (getattr(self.local, "domain", ""), getattr(self.local, "parser", ""))
+        self.local.domain, self.local.parser = domain, parser
+        try:
+            yield
+        finally:
+            self.local.domain, self.local.parser = previous
+
+    def observe(self, stage: str, seconds: float, domain: Optional[str] = None, parser: Optional[str] = None) -> None:
+        if domain is None:
+            domain = getattr(self.local, "domain", "")
+        if parser is None:
+            parser = getattr(self.local, "parser", "")
+        with self.lock:
+            series = self.series.get((stage, domain, parser))
+            if series is None:
+                series = self.series[(stage, domain, parser)] = StageSeries()
+            series.add(seconds)
+
+    @contextmanager
+    def timer(
+        self, stage: str, domain: Optional[str] = None, parser: Optional[str] = None
+    ) -> Iterator[Dict[str, Optional[str]]]:
+        """Mede o bloco; o chamador pode ajustar labels["parser"] antes do fim."""
+        labels: Dict[str, Optional[str]] = {"domain": domain, "parser": parser}
+        start = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(stage, time.perf_counter() - start, labels["domain"], labels["parser"])
+
+    def record_error(self, domain: str, error: str) -> None:
+        with self.lock:
+            self.errors[(domain, error)] = self.errors.get((domain, error), 0) + 1
+
+    def drain(self) -> Tuple[Dict[SeriesKey, StageSeries], Dict[Tuple[str, str], int]]:
+        """Devolve e zera as séries e os erros acumulados."""
+        with self.lock:
+            drained = (self.series, self.errors)
+            self.series, self.errors = {}, {}
+        return drained
+
+    def merge(self, drained: Tuple[Dict[SeriesKey, StageSeries], Dict[Tuple[str, str], int]]) -> None:
+        series, errors = drained
+        with self.lock:
+            for key, other in series.items():
+                self.series.setdefault(key, StageSeries()).merge(other)
+            for key, count in errors.items():
+                self.errors[key] = self.errors.get(key, 0) + count
+
+    def reset(self) -> None:
+        self.drain()
+
+    def stage_totals(self) -> Dict[str, Dict[str, float]]:
+        """Contagem e tempo total por etapa, somando domínios e parsers."""
+        totals: Dict[str, Dict[str, float]] = {}
+        with self.lock:
+            for (stage, _, _), series in sorted(self.series.items()):
+                entry = totals.setdefault(stage, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+                entry["count"] += series.count
+                entry["total_seconds"] += series.total
+                entry["max_seconds"] = max(entry["max_seconds"], series.max)
+        for entry in totals.values():
+            entry["total_seconds"] = round(entry["total_seconds"], 6)
+            entry["max_seconds"] = round(entry["max_seconds"], 6)
+        return totals
+
+    def domain_totals(self) -> List[Dict[str, object]]:
+        """Domínios pelo tempo das marcas (etapa brand), do mais lento ao mais rápido."""
+        domains: Dict[str, Dict[str, object]] = {}
+        with self.lock:
+            for (stage, domain, parser), series in self.series.items():
+                entry = domains.setdefault(
+                    domain, {"domain": domain, "parser": "", "brand_seconds": 0.0, "pages_parsed": 0}
+                )
+                if stage == "brand":
+                    entry["brand_seconds"] += series.total
+                    entry["parser"] = entry["parser"] or parser
+                elif stage == "parse":
+                    entry["pages_parsed"] += series.count
+        for entry in domains.values():
+            entry["brand_seconds"] = round(entry["brand_seconds"], 6)
+        return sorted(
+            (entry for entry in domains.values() if entry["domain"]),
+            key=lambda entry: entry["brand_seconds"], reverse=True,
+        )
 
-    result: Dict[str, object] = {}
-    active_labels: List[str] = []
+    def to_dict(self, run_info: Dict[str, object]) -> Dict[str, object]:
+        with self.lock:
+            series = [
+                {
+                    "stage": stage, "domain": domain, "parser": parser,
+                    "count": data.count, "total_seconds": round(data.total, 6),
+                    "max_seconds": round(data.max, 6), "buckets": data.cumulative(),
+                }
+                for (stage, domain, parser), data in sorted(self.series.items())
+            ]
+            errors = [
+                {"domain": domain, "error": error, "count": count}
+                for (domain, error), count in sorted(self.errors.items())
+            ]
+        return {
+            "run": run_info,
+            "buckets_seconds": list(RUN_METRICS_BUCKETS),
+            "stages": self.stage_totals(),
+            "domains": self.domain_totals(),
+            "fetch_errors": errors,
+            "series": series,
+        }
+
+    def write_json(self, path: str, run_info: Dict[str, object]) -> None:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(run_info), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def write_prometheus(self, path: str, run_info: Dict[str, object]) -> None:
+        """
+        Grava no formato textfile do Prometheus (node_exporter), trocando o
+        arquivo de uma vez para o coletor nunca ler um arquivo pela metade.
+        """
+        def labels(**values: str) -> str:
+            return "{" + ",".join(f'{key}="{prometheus_label(value)}"' for key, value in values.items()) + "}"
+
+        lines = [
+            "# HELP scraper_capilar_stage_duration_seconds Tempo por etapa, domínio e parser.",
+            "# TYPE scraper_capilar_stage_duration_seconds histogram",
+        ]
+        with self.lock:
+            items = sorted(self.series.items())
+            errors = sorted(self.errors.items())
+        for (stage, domain, parser), data in items:
+            base = {"stage": stage, "domain": domain, "parser": parser}
+            for le, count in zip(list(RUN_METRICS_BUCKETS) + ["+Inf"], data.cumulative()):
+                lines.append(f"scraper_capilar_stage_duration_seconds_bucket{labels(**base, le=str(le))} {count}")
+            lines.append(f"scraper_capilar_stage_duration_seconds_sum{labels(**base)} {data.total:.6f}")
+            lines.append(f"scraper_capilar_stage_duration_seconds_count{labels(**base)} {data.count}")
+        lines += [
+            "# HELP scraper_capilar_fetch_errors_total Downloads que falharam, por domínio e tipo de erro.",
+            "# TYPE scraper_capilar_fetch_errors_total counter",
+        ]
+        lines += [
+            f"scraper_capilar_fetch_errors_total{labels(domain=domain, error=error)} {count}"
+            for (domain, error), count in errors
+        ]
+        for name, help_text in (
+            ("products", "Produtos exportados na última execução."),
+            ("wall_seconds", "Duração da última execução."),
+            ("finished_timestamp_seconds", "Fim da última execução (epoch)."),
+        ):
+            lines.append(f"# HELP scraper_capilar_run_{name} {help_text}")
+            lines.append(f"# TYPE scraper_capilar_run_{name} gauge")
+            lines.append(f"scraper_capilar_run_{name} {run_info.get(name, 0)}")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+    def log_summary(self, top: int = RUN_METRICS_TOP_DOMAINS) -> None:
+        stages = self.stage_totals()
+        if not stages:
+            return
+        logging.info(
+            "Etapas: %s",
+            ", ".join(
+                f"{stage} {data['total_seconds']:.1f}s/{int(data['count'])}"
+                for stage, data in sorted(stages.items(), key=lambda item: -item[1]["total_seconds"])
+                if "." not in stage
+            ),
+        )
+        for entry in self.domain_totals()[:top]:
+            logging.info(
+                "Domínio %s (%s): %.1fs, %d páginas processadas",
+                entry["domain"], entry["parser"] or "-", entry["brand_seconds"], entry["pages_parsed"],
+            )
 
-    for key, conf in CLAIMS_CONFIG.items():
-        found = False
-        for kw in conf["keywords"]:
-            if kw.lower() in text:
-                found = True
-                break
-        result[key] = found
-        if found:
-            active_labels.append(conf["label"])
 
-    result["claims_list"] = ", ".join(sorted(active_labels)) if active_labels else ""
-    return result
+RUN_METRICS = RunMetrics()
 
 
 # ==========================
-# Estrutura de parsers
+# Cache HTTP em disco
 # ==========================
 
 @dataclass
-class BrandParser:
-    domain: str
-    get_product_links: Callable[[requests.Session, str], List[str]]
-    parse_product: Callable[[requests.Session, str], Optional[Dict[str, object]]]
-
-
-BRAND_PARSERS: Dict[str, BrandParser] = {}
+class CachedResponse:
+    url: str
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+
+def normalize_cache_url(url: str) -> str:
+    """Normaliza a URL para uso como chave de cache."""
+    parsed = urlparse(url.strip())
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((
+        parsed.scheme.lower(),
+        parsed.netloc.lower(),
+        parsed.path or "/",
+        parsed.params,
+        query,
+        "",
+    ))
+
+
+class ResponseCache:
+    """
+    Cache persistente de respostas HTML em SQLite, chaveado pela URL
+    normalizada. Guarda o corpo (comprimido) e os validadores ETag /
+    Last-Modified para requisições condicionais.
 
+    Em modo offline nenhuma requisição é feita: só o que está no cache é
+    devolvido, o que permite rodar os parsers sobre uma coleta anterior.
+    """
 
-def register_brand_parser(parser: BrandParser) -> None:
-    BRAND_PARSERS[parser.domain] = parser
+    def __init__(
+        self,
+        path: str = RESPONSE_CACHE_PATH,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+        offline: bool = False,
+    ) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_fetched_at ON responses (fetched_at)"
+        )
+        self.conn.commit()
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT url, body, etag, last_modified, fetched_at FROM responses WHERE key = ?",
+                (normalize_cache_url(url),),
+            ).fetchone()
+        if not row:
+            return None
+        body = zlib.decompress(row[1]).decode("utf-8")
+        return CachedResponse(row[0], body, row[2], row[3], row[4])
+
+    def put(self, url: str, body: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        blob = zlib.compress(body.encode("utf-8"))
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, url, body, size, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (normalize_cache_url(url), url, blob, len(blob), etag, last_modified, time.time()),
+            )
+            self.conn.commit()
+
+    def touch(self, url: str) -> None:
+        """Marca a entrada como revalidada agora (resposta 304)."""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE responses SET fetched_at = ? WHERE key = ?",
+                (time.time(), normalize_cache_url(url)),
+            )
+            self.conn.commit()
+
+    def iter_entries(self, limit: Optional[int] = None) -> Iterator[Tuple[str, str]]:
+        """Percorre (url, corpo) das respostas guardadas, mais recentes primeiro."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url, body FROM responses ORDER BY fetched_at DESC LIMIT ?",
+                (limit if limit is not None else -1,),
+            ).fetchall()
+        for url, blob in rows:
+            yield url, zlib.decompress(blob).decode("utf-8")
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return time.time() - entry.fetched_at < self.ttl_seconds
+
+    def conditional_headers(self, entry: Optional[CachedResponse]) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if entry and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def evict(
+        self,
+        max_age_seconds: float = RESPONSE_CACHE_MAX_AGE_SECONDS,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+    ) -> int:
+        """Remove entradas antigas e, se preciso, as menos recentes até caber em max_bytes."""
+        with self.lock:
+            cur = self.conn.execute(
+                "DELETE FROM responses WHERE fetched_at < ?", (time.time() - max_age_seconds,)
+            )
+            removed = cur.rowcount
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > max_bytes:
+                rows = self.conn.execute(
+                    "SELECT key, size FROM responses ORDER BY fetched_at"
+                ).fetchall()
+                stale_keys = []
+                for key, size in rows:
+                    if total <= max_bytes:
+                        break
+                    stale_keys.append((key,))
+                    total -= size
+                self.conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+                removed += len(stale_keys)
+            self.conn.commit()
+        if removed:
+            logging.info("Cache HTTP: %d respostas removidas", removed)
+        return removed
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+RESPONSE_CACHE: Optional[ResponseCache] = None
+
+
+def configure_response_cache(
+    path: Optional[str] = RESPONSE_CACHE_PATH,
+    ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+    offline: bool = False,
+) -> Optional[ResponseCache]:
+    """Ativa (ou, com path=None, desativa) o cache usado por fetch_html."""
+    global RESPONSE_CACHE
+    if RESPONSE_CACHE is not None:
+        RESPONSE_CACHE.close()
+    RESPONSE_CACHE = ResponseCache(path, ttl_seconds, offline) if path else None
+    return RESPONSE_CACHE
 
 
 # ==========================
-# Parser StiloHair
+# Backends de parsing HTML
 # ==========================
 
-def get_all_product_links_stilohair(session: requests.Session, brand_page_url: str) -> List[str]:
+# Textos dentro destas tags não entram em get_text(), como no BeautifulSoup
+NON_TEXT_TAGS = {"script", "style", "template"}
+# Atributos multivalorados (o BeautifulSoup os devolve como lista)
+MULTI_VALUED_ATTRS = {"class", "rel", "rev", "headers", "accept-charset", "accesskey"}
+
+
+class SelectolaxNode:
     """
-    Coleta links de produtos na página da marca no site StiloHair, incluindo paginação.
+    Adaptador que expõe um nó do selectolax com o subconjunto da API do
+    BeautifulSoup usado pelos parsers (select, find, get, get_text...),
+    para que os mesmos seletores CSS continuem funcionando.
     """
-    product_links: List[str] = []
-    page_url: Optional[str] = brand_page_url
-    visited: set = set()
 
-    while page_url and page_url not in visited:
-        visited.add(page_url)
-        html = fetch_html(session, page_url)
-        if not html:
-            break
+    __slots__ = ("node",)
+
+    def __init__(self, node) -> None:
+        self.node = node
+
+    @property
+    def name(self) -> str:
+        return self.node.tag
+
+    @property
+    def attrs(self) -> Dict[str, object]:
+        attrs: Dict[str, object] = {}
+        for key, value in self.node.attributes.items():
+            if key in MULTI_VALUED_ATTRS:
+                attrs[key] = (value or "").split()
+            else:
+                attrs[key] = value if value is not None else ""
+        return attrs
+
+    def get(self, key: str, default=None):
+        return self.attrs.get(key, default)
+
+    def __getitem__(self, key: str):
+        return self.attrs[key]
+
+    def __bool__(self) -> bool:
+        return True
+
+    def select(self, selector: str) -> List["SelectolaxNode"]:
+        return [SelectolaxNode(n) for n in self.node.css(selector)]
+
+    def select_one(self, selector: str) -> Optional["SelectolaxNode"]:
+        node = self.node.css_first(selector)
+        return SelectolaxNode(node) if node is not None else None
+
+    @staticmethod
+    def _css_for(name: Optional[str], attrs: Dict[str, object]) -> str:
+        selector = name or "*"
+        for key, value in attrs.items():
+            key = key.rstrip("_")
+            if value is True:
+                selector += f"[{key}]"
+            elif key in MULTI_VALUED_ATTRS:
+                selector += f'[{key}~="{value}"]'
+            else:
+                selector += f'[{key}="{value}"]'
+        return selector
+
+    def find_all(self, name: Optional[str] = None, **attrs) -> List["SelectolaxNode"]:
+        return self.select(self._css_for(name, attrs))
+
+    def find(self, name: Optional[str] = None, **attrs) -> Optional["SelectolaxNode"]:
+        return self.select_one(self._css_for(name, attrs))
+
+    def _strings(self) -> Iterator[str]:
+        own_tag = self.node.tag
+        for child in self.node.traverse(include_text=True):
+            if child.tag != "-text":
+                continue
+            parent = child.parent
+            if parent is not None and parent.tag in NON_TEXT_TAGS and parent.tag != own_tag:
+                continue
+            yield child.text_content or ""
 
-        soup = BeautifulSoup(html, "html.parser")
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        strings = self._strings()
+        if strip:
+            strings = (t.strip() for t in strings)
+            return separator.join(t for t in strings if t)
+        return separator.join(strings)
 
-        anchors: List[BeautifulSoup] = []
-        selectors = [
-            "a.product-name",
-            "a.nome_produto",
-            "a.nome-produto",
-            "div.product-name a",
-            "h2.product-name a",
-            "h2.nome-produto a",
-            "div.product-item a",
-        ]
-        for sel in selectors:
+    @property
+    def string(self) -> Optional[str]:
+        return self.get_text()
+
+
+def _soup_html_parser(html: str, parse_only=None) -> BeautifulSoup:
+    return BeautifulSoup(html, "html.parser", parse_only=parse_only)
+
+
+def _soup_lxml(html: str, parse_only=None) -> BeautifulSoup:
+    return BeautifulSoup(html, "lxml", parse_only=parse_only)
+
+
+def _soup_html5lib(html: str, parse_only=None) -> BeautifulSoup:
+    return BeautifulSoup(html, "html5lib", parse_only=parse_only)
+
+
+def _soup_selectolax(html: str, parse_only=None) -> SelectolaxNode:
+    # parse_only (SoupStrainer) não se aplica: o lexbor já é rápido o bastante
+    return SelectolaxNode(LexborHTMLParser(html).root)
+
+
+HTML_BACKENDS: Dict[str, Callable[..., object]] = {
+    "html.parser": _soup_html_parser,
+    "lxml": _soup_lxml,
+    "html5lib": _soup_html5lib,
+    "selectolax": _soup_selectolax,
+}
+
+
+def available_html_backends() -> List[str]:
+    """Backends cujas dependências estão instaladas."""
+    names = ["html.parser"]
+    if HAS_LXML:
+        names.append("lxml")
+    try:
+        import html5lib  # noqa: F401
+        names.append("html5lib")
+    except ImportError:
+        pass
+    if LexborHTMLParser is not None:
+        names.append("selectolax")
+    return names
+
+
+def set_html_backend(name: str) -> None:
+    """Escolhe, em tempo de execução, o backend usado por make_soup."""
+    global HTML_PARSER_BACKEND
+    if name not in HTML_BACKENDS:
+        raise ValueError(f"Backend HTML desconhecido: {name}")
+    if name not in available_html_backends():
+        raise RuntimeError(f"Backend HTML {name} não está instalado")
+    HTML_PARSER_BACKEND = name
+
+
+def make_soup(html: str, parse_only=None):
+    """Constrói a árvore da página com o backend configurado."""
+    return HTML_BACKENDS[HTML_PARSER_BACKEND](html, parse_only=parse_only)
+
+
+# ==========================
+# Listagens: parsing parcial
+# ==========================
+
+# As listagens só precisam de <a>, <link> e dos containers citados nos
+# seletores (classes/atributos com estes trechos); o resto não vira árvore
+LISTING_CONTAINER_HINTS = ("product", "produto", "shelf", "prateleira", "pagina")
+LISTING_HINT_RE = re.compile("|".join(LISTING_CONTAINER_HINTS), re.IGNORECASE)
+
+_TAG_RE = re.compile(
+    r"<(?:!--.*?(?:-->|$)|(/?)([a-zA-Z][^\s/>]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>)",
+    re.DOTALL,
+)
+_RAW_TEXT_TAGS = {"script": re.compile(r"</script", re.I), "style": re.compile(r"</style", re.I)}
+# Conteúdo que cada backend trata do seu jeito (texto no lxml, tags no
+# html.parser): o elemento inteiro é copiado e o backend decide, como na
+# página inteira
+_VERBATIM_TAGS = {
+    name: re.compile(rf"</{name}\s*>", re.I) for name in ("title", "textarea", "noscript", "template")
+}
+_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+# Células fora de <table> são descartadas pelos parsers: a estrutura fica
+_TABLE_TAGS = {"table", "thead", "tbody", "tfoot", "tr", "td", "th"}
+
+
+def listing_markup(html: str) -> str:
+    """
+    Reduz uma página de listagem, numa passada de tokenização, aos <a>
+    (com o texto), aos <link>, às tabelas e aos elementos cujos
+    atributos contêm LISTING_CONTAINER_HINTS, preservando o aninhamento
+    entre eles. <script>/<style> somem; <title>, <textarea>, <noscript>
+    e <template> são copiados inteiros. Os seletores das listagens dão os mesmos links no HTML
+    reduzido e na página inteira.
+    """
+    out: List[str] = []
+    stack: List[Tuple[str, bool]] = []  # (tag, emitida no HTML reduzido)
+    in_anchor = False                   # dentro de <a>: o texto também entra
+    pos = 0
+    while True:
+        m = _TAG_RE.search(html, pos)
+        if m is None:
+            break
+        if in_anchor:
+            out.append(html[pos:m.start()])
+        pos = m.end()
+        name = m.group(2)
+        if name is None:
+            continue  # comentário
+        name = name.lower()
+
+        if m.group(1):
+            depth = len(stack) - 1
+            while depth >= 0 and stack[depth][0] != name:
+                depth -= 1
+            if depth < 0:
+                continue  # fechamento sem abertura: ignorado, como no parser
+            popped = stack[depth:]
+            del stack[depth:]
+            out.extend(f"</{tag}>" for tag, kept in reversed(popped) if kept)
+            in_anchor = any(tag == "a" for tag, _ in stack)
+            continue
+
+        closer = _RAW_TEXT_TAGS.get(name)
+        if closer is not None:
+            end = closer.search(html, pos)
+            pos = end.start() if end else len(html)
+        elif name in _VERBATIM_TAGS:
+            end = _VERBATIM_TAGS[name].search(html, pos)
+            stop = end.end() if end else len(html)
+            out.append(html[m.start():stop])
+            pos = stop
+        elif name == "a":
+            out.append(m.group(0))
+            stack.append(("a", True))
+            in_anchor = True
+        elif name in _VOID_TAGS:
+            if name == "link":
+                out.append(m.group(0))
+        else:
+            kept = name in _TABLE_TAGS or LISTING_HINT_RE.search(m.group(3)) is not None
+            if kept:
+                out.append(m.group(0))
+            stack.append((name, kept))
+
+    if in_anchor:
+        out.append(html[pos:])
+    out.extend(f"</{tag}>" for tag, kept in reversed(stack) if kept)
+    return "<html><body>" + "".join(out) + "</body></html>"
+
+
+def make_listing_soup(html: str):
+    """
+    make_soup do HTML reduzido por listing_markup. No selectolax a página
+    inteira já é analisada em C mais rápido que a redução em Python.
+    """
+    if HTML_PARSER_BACKEND == "selectolax":
+        return make_soup(html)
+    return make_soup(listing_markup(html))
+
+
+# ==========================
+# Contexto da página
+# ==========================
+
+class PageContext:
+    """
+    Dados derivados de uma página de produto, calculados uma única vez e
+    compartilhados por todos os extratores: árvore, texto completo e sua
+    versão minúscula, metadados das imagens e resultados de seletores.
+    """
+
+    def __init__(self, html: str, url: str) -> None:
+        self.url = url
+        with RUN_METRICS.timer("parse.html"):
+            self.soup = make_soup(html)
+            self.full_text = self.soup.get_text("\n", strip=True)
+            self.text_lower = self.full_text.lower()
+        self._select_one: Dict[str, Optional[object]] = {}
+        self._select: Dict[str, List[object]] = {}
+        self._images: Optional[List[object]] = None
+        self._image_text_lower: Optional[str] = None
+        self._breadcrumb_text_lower: Optional[str] = None
+        self._structured: Optional[Dict[str, str]] = None
+        self._sections: Optional["SectionIndex"] = None
+
+    def select_one(self, selector: str):
+        if selector not in self._select_one:
+            self._select_one[selector] = self.soup.select_one(selector)
+        return self._select_one[selector]
+
+    def select(self, selector: str) -> List[object]:
+        if selector not in self._select:
+            self._select[selector] = self.soup.select(selector)
+        return self._select[selector]
+
+    @property
+    def images(self) -> List[object]:
+        if self._images is None:
+            self._images = self.soup.find_all("img")
+        return self._images
+
+    @property
+    def image_text_lower(self) -> str:
+        """alt, title e src de todas as imagens, em minúsculas."""
+        if self._image_text_lower is None:
+            img_bits: List[str] = []
+            for img in self.images:
+                for attr in ("alt", "title"):
+                    val = img.get(attr)
+                    if val:
+                        img_bits.append(val.lower())
+                src = img.get("src") or ""
+                if src:
+                    img_bits.append(src.lower())
+            self._image_text_lower = "\n".join(img_bits)
+        return self._image_text_lower
+
+    @property
+    def breadcrumb_text_lower(self) -> str:
+        if self._breadcrumb_text_lower is None:
+            parts = []
+            for selector in ("nav.breadcrumb", "div.breadcrumb", "ol.breadcrumb"):
+                bc = self.select_one(selector)
+                if bc:
+                    parts.append(bc.get_text(" ", strip=True).lower())
+            self._breadcrumb_text_lower = " ".join(parts)
+        return self._breadcrumb_text_lower
+
+    @property
+    def sections(self) -> "SectionIndex":
+        """Índice dos títulos de seção do texto, compartilhado pelos extratores."""
+        if self._sections is None:
+            self._sections = SectionIndex(self.full_text, self.text_lower)
+        return self._sections
+
+    @property
+    def structured(self) -> Dict[str, str]:
+        """Campos do produto declarados em JSON-LD, microdata ou OpenGraph."""
+        if self._structured is None:
+            with RUN_METRICS.timer("parse.structured"):
+                self._structured = extract_structured_product(self)
+        return self._structured
+
+
+# ==========================
+# Dados estruturados (JSON-LD, microdata, OpenGraph)
+# ==========================
+
+STRUCTURED_FIELDS = ("name", "brand", "description", "image", "sku")
+
+# Tags OpenGraph/Facebook -> campo
+OPENGRAPH_FIELDS: Dict[str, str] = {
+    "og:title": "name",
+    "og:description": "description",
+    "og:image": "image",
+    "product:brand": "brand",
+    "og:brand": "brand",
+    "product:retailer_item_id": "sku",
+}
+
+
+def clean_structured_text(value: object) -> str:
+    """Texto de um campo estruturado: sem tags HTML, entidades nem espaços extras."""
+    if value is None:
+        return ""
+    text = html_lib.unescape(str(value))
+    if "<" in text:
+        text = re.sub(r"<[^>]+>", " ", text)
+    return normalize_space(text)
+
+
+def _jsonld_value(value: object, key: str = "name") -> str:
+    """Campos do schema.org podem ser texto, lista ou objeto (ex.: Brand, ImageObject)."""
+    if isinstance(value, list):
+        value = value[0] if value else ""
+    if isinstance(value, dict):
+        value = value.get(key) or value.get("url") or value.get("@id") or ""
+    return clean_structured_text(value)
+
+
+def _iter_jsonld_nodes(data: object) -> Iterator[Dict[str, object]]:
+    """Percorre listas e @graph de um bloco JSON-LD."""
+    if isinstance(data, list):
+        for item in data:
+            yield from _iter_jsonld_nodes(item)
+    elif isinstance(data, dict):
+        yield data
+        if "@graph" in data:
+            yield from _iter_jsonld_nodes(data["@graph"])
+
+
+def _is_product_type(value: object) -> bool:
+    types = value if isinstance(value, list) else [value]
+    return any(str(t).split("/")[-1] in ("Product", "ProductGroup") for t in types)
+
+
+def extract_jsonld_product(ctx: "PageContext") -> Dict[str, str]:
+    """Primeiro objeto Product encontrado nos blocos application/ld+json."""
+    for script in ctx.select('script[type="application/ld+json"]'):
+        try:
+            data = json.loads(script.get_text())
+        except ValueError:
+            continue
+        for node in _iter_jsonld_nodes(data):
+            if not _is_product_type(node.get("@type")):
+                continue
+            return {
+                "name": _jsonld_value(node.get("name")),
+                "brand": _jsonld_value(node.get("brand") or node.get("manufacturer")),
+                "description": _jsonld_value(node.get("description")),
+                "image": _jsonld_value(node.get("image"), key="url"),
+                "sku": _jsonld_value(node.get("sku") or node.get("mpn")),
+            }
+    return {}
+
+
+def _microdata_value(tag) -> str:
+    if tag is None:
+        return ""
+    if tag.get("itemscope") is not None:
+        inner = tag.select_one("[itemprop='name']")
+        if inner is not None:
+            tag = inner
+    for attr in ("content", "src", "href"):
+        value = tag.get(attr)
+        if value:
+            return clean_structured_text(value)
+    return clean_structured_text(tag.get_text(" "))
+
+
+def extract_microdata_product(ctx: "PageContext") -> Dict[str, str]:
+    """Propriedades itemprop do primeiro escopo schema.org/Product."""
+    scope = ctx.select_one("[itemscope][itemtype*='schema.org/Product']")
+    if scope is None:
+        return {}
+    return {
+        field_name: _microdata_value(scope.select_one(f"[itemprop='{field_name}']"))
+        for field_name in STRUCTURED_FIELDS
+    }
+
+
+def extract_opengraph_product(ctx: "PageContext") -> Dict[str, str]:
+    """Meta tags og:* / product:* (a primeira ocorrência de cada uma vale)."""
+    result: Dict[str, str] = {}
+    for meta in ctx.select("meta[property]"):
+        field_name = OPENGRAPH_FIELDS.get((meta.get("property") or "").lower())
+        if field_name and not result.get(field_name):
+            result[field_name] = clean_structured_text(meta.get("content"))
+    if result.get("name"):
+        # og:title costuma vir com o nome da loja: "Produto | Loja"
+        result["name"] = normalize_space(result["name"].split("|")[0])
+    return result
+
+
+def extract_structured_product(ctx: "PageContext") -> Dict[str, str]:
+    """
+    Nome, marca, descrição, imagem e SKU declarados pela própria loja, numa
+    passada só. Para cada campo vale a primeira fonte que o preencher:
+    JSON-LD, depois microdata, depois OpenGraph. Campos ausentes ficam de
+    fora do dicionário.
+    """
+    result: Dict[str, str] = {}
+    for extractor in (extract_jsonld_product, extract_microdata_product, extract_opengraph_product):
+        for field_name, value in extractor(ctx).items():
+            if value and not result.get(field_name):
+                result[field_name] = value
+        if len(result) == len(STRUCTURED_FIELDS):
+            break
+    if result.get("image"):
+        result["image"] = urljoin(ctx.url, result["image"])
+    return result
+
+
+# ==========================
+# Busca de múltiplas palavras-chave
+# ==========================
+
+def fold_accents(text: str) -> str:
+    """Remove acentos ("proteção" -> "protecao") mantendo o restante do texto."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+class KeywordAutomaton:
+    """
+    Autômato sobre um conjunto de palavras-chave, cada uma associada a um
+    valor (ex.: a coluna do claim). Encontra todas as ocorrências numa única
+    passada pelo texto, com custo praticamente independente da quantidade
+    de palavras-chave.
+
+    Usa o Aho-Corasick do pacote pyahocorasick quando instalado. Sem ele, as
+    palavras viram uma trie compilada numa única regex (lookahead em cada
+    posição), executada em C pelo módulo re: em cada posição ela devolve a
+    palavra mais longa, e as palavras que são prefixo dela são deduzidas
+    de uma tabela pré-calculada. Com menos de min_keywords palavras, a
+    regex perde para um `in` por palavra, e a busca fica sendo essa.
+    """
+
+    def __init__(
+        self,
+        keywords: Iterable[Tuple[str, object]],
+        word_boundary: bool = False,
+        fold: bool = False,
+        min_keywords: int = 0,
+    ) -> None:
+        self.word_boundary = word_boundary
+        self.fold = fold
+        # Palavra normalizada -> valores associados
+        entries: Dict[str, List[object]] = {}
+        for keyword, value in keywords:
+            key = self.normalize(keyword)
+            if key:
+                entries.setdefault(key, []).append(value)
+        self.size = len(entries)
+        self.native = None
+        self.pattern: Optional[re.Pattern] = None
+        self.scan: Optional[List[Tuple[str, Tuple[object, ...]]]] = None
+        if not entries:
+            return
+
+        if ahocorasick is not None:
+            self.native = ahocorasick.Automaton()
+            for key, values in entries.items():
+                self.native.add_word(key, (len(key), tuple(values)))
+            self.native.make_automaton()
+            return
+        if self.size < min_keywords:
+            self.scan = [(key, tuple(values)) for key, values in entries.items()]
+            return
+
+        # Para cada palavra, (tamanho, valores) dela e de todas as palavras
+        # que são seu prefixo: casam na mesma posição e a regex só devolve
+        # a mais longa
+        self.prefix_hits: Dict[str, List[Tuple[int, Tuple[object, ...]]]] = {}
+        for key in entries:
+            self.prefix_hits[key] = [
+                (n, tuple(entries[key[:n]]))
+                for n in range(1, len(key) + 1)
+                if key[:n] in entries
+            ]
+        trie: Dict[str, dict] = {}
+        for key in entries:
+            node = trie
+            for ch in key:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+        self.pattern = re.compile("(?=(" + self._trie_regex(trie) + "))")
+
+    @classmethod
+    def _trie_regex(cls, node: Dict[str, dict]) -> str:
+        alternatives = [re.escape(ch) + cls._trie_regex(child) for ch, child in sorted(node.items()) if ch]
+        if not alternatives:
+            return ""
+        group = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        if "" in node:
+            # Fim de palavra aqui: o restante é opcional (guloso = mais longa)
+            return "(?:" + group + ")?"
+        return group
+
+    def normalize(self, text: str) -> str:
+        text = text.lower()
+        return fold_accents(text) if self.fold else text
+
+    def _is_boundary(self, text: str, start: int, end: int) -> bool:
+        before = text[start - 1] if start > 0 else " "
+        after = text[end] if end < len(text) else " "
+        return not before.isalnum() and not after.isalnum()
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, object]]:
+        """
+        Gera (início, fim, valor) de cada ocorrência. O texto já deve estar
+        em minúsculas; acentos são removidos aqui se fold=True.
+        """
+        if self.fold:
+            text = fold_accents(text)
+        if self.native is not None:
+            for end_idx, (length, values) in self.native.iter(text):
+                start, end = end_idx - length + 1, end_idx + 1
+                if self.word_boundary and not self._is_boundary(text, start, end):
+                    continue
+                for value in values:
+                    yield start, end, value
+            return
+        if self.scan is not None:
+            for key, values in self.scan:
+                start = text.find(key)
+                while start >= 0:
+                    end = start + len(key)
+                    if not self.word_boundary or self._is_boundary(text, start, end):
+                        for value in values:
+                            yield start, end, value
+                    start = text.find(key, start + 1)
+            return
+        if self.pattern is None:
+            return
+
+        for match in self.pattern.finditer(text):
+            start = match.start()
+            for length, values in self.prefix_hits[match.group(1)]:
+                end = start + length
+                if self.word_boundary and not self._is_boundary(text, start, end):
+                    continue
+                for value in values:
+                    yield start, end, value
+
+    def find_values(self, text: str, stop_after: Optional[int] = None) -> Set[object]:
+        """Valores com ao menos uma ocorrência; para cedo se achar stop_after valores."""
+        found: Set[object] = set()
+        if self.scan is not None and not self.word_boundary:
+            if self.fold:
+                text = fold_accents(text)
+            for key, values in self.scan:
+                # Palavras de um valor já encontrado não precisam ser testadas
+                if not found.issuperset(values) and key in text:
+                    found.update(values)
+                    if stop_after is not None and len(found) >= stop_after:
+                        break
+            return found
+        for _, _, value in self.iter_matches(text):
+            found.add(value)
+            if stop_after is not None and len(found) >= stop_after:
+                break
+        return found
+
+
+_CLAIMS_AUTOMATON: Optional[KeywordAutomaton] = None
+
+
+def build_claims_automaton() -> KeywordAutomaton:
+    """Compila as palavras-chave de CLAIMS_CONFIG num único autômato."""
+    keywords = [
+        (kw, key)
+        for key, conf in CLAIMS_CONFIG.items()
+        for kw in conf["keywords"]
+    ]
+    return KeywordAutomaton(
+        keywords,
+        word_boundary=CLAIMS_MATCH_WORD_BOUNDARY,
+        fold=CLAIMS_MATCH_FOLD_ACCENTS,
+        min_keywords=CLAIMS_AUTOMATON_MIN_KEYWORDS,
+    )
+
+
+def get_claims_automaton() -> KeywordAutomaton:
+    """Autômato dos claims, construído na primeira utilização."""
+    global _CLAIMS_AUTOMATON
+    if _CLAIMS_AUTOMATON is None:
+        _CLAIMS_AUTOMATON = build_claims_automaton()
+    return _CLAIMS_AUTOMATON
+
+
+def reset_claims_automaton() -> None:
+    """Descarta o autômato após alterar CLAIMS_CONFIG ou as opções de busca."""
+    global _CLAIMS_AUTOMATON
+    _CLAIMS_AUTOMATON = None
+
+
+# ==========================
+# Regras de texto
+# ==========================
+
+class KeywordTable:
+    """
+    Tabela ordenada (palavra-chave, rótulo). first_label devolve o rótulo
+    da primeira entrada, na ordem da tabela, cuja palavra aparece no texto.
+    Quando as palavras têm poucas iniciais (KEYWORD_TABLE_MAX_INITIALS) e
+    nenhuma pode ficar escondida dentro de outra ocorrência, a busca é uma
+    regex em trie só (uma passada em C); senão, um `in` por palavra.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str]]) -> None:
+        self.entries = [(keyword.lower(), label) for keyword, label in entries if keyword]
+        rank: Dict[str, int] = {}
+        for i, (keyword, _) in enumerate(self.entries):
+            rank.setdefault(keyword, i)
+        # A regex devolve a palavra mais longa numa posição; as que são
+        # prefixo dela casam ali também
+        self.best_rank = {
+            word: min(r for keyword, r in rank.items() if word.startswith(keyword)) for word in rank
+        }
+        self.pattern: Optional[re.Pattern] = None
+        if rank and len({word[0] for word in rank}) <= KEYWORD_TABLE_MAX_INITIALS and not self._overlapping(rank):
+            trie: Dict[str, dict] = {}
+            for word in rank:
+                node = trie
+                for ch in word:
+                    node = node.setdefault(ch, {})
+                node[""] = {}
+            self.pattern = re.compile(KeywordAutomaton._trie_regex(trie))
+
+    @staticmethod
+    def _overlapping(words: Iterable[str]) -> bool:
+        """Alguma palavra pode começar no meio de outra (e a regex pulá-la)?"""
+        words = list(words)
+        for a in words:
+            for offset in range(1, len(a)):
+                tail = a[offset:]
+                if any(b.startswith(tail) or tail.startswith(b) for b in words):
+                    return True
+        return False
+
+    def first_label(self, lower: str, default: str = "") -> str:
+        if self.pattern is None:
+            for keyword, label in self.entries:
+                if keyword in lower:
+                    return label
+            return default
+        best: Optional[int] = None
+        for match in self.pattern.finditer(lower):
+            r = self.best_rank[match.group()]
+            if best is None or r < best:
+                best = r
+                if r == 0:
+                    break
+        return self.entries[best][1] if best is not None else default
+
+
+class TextRules:
+    """Regexes e tabelas de TEXT_RULES_CONFIG, compiladas uma única vez."""
+
+    def __init__(self, overrides: Optional[Dict[str, object]] = None) -> None:
+        overrides = dict(overrides or {})
+        unknown = set(overrides) - set(TEXT_RULES_CONFIG)
+        if unknown:
+            raise ValueError(f"Regras de texto desconhecidas: {', '.join(sorted(unknown))}")
+        self.overrides = overrides
+        config = {**TEXT_RULES_CONFIG, **overrides}
+        self.ph = re.compile(config["ph"], re.IGNORECASE)
+        self.brand_label = re.compile(config["brand_label"])
+        self.brand_label_any = re.compile(config["brand_label_any"], re.IGNORECASE)
+        self.ingredients_prefix = re.compile(config["ingredients_prefix"])
+        self.section_prefix = re.compile(config["section_prefix"], re.IGNORECASE)
+        self.audience = KeywordTable(
+            (keyword, label) for label, keywords in config["audience"] for keyword in keywords
+        )
+        self.audience_default = config["audience_default"]
+        self.hair_types = KeywordTable((keyword, label) for keyword, label in config["hair_types"])
+
+
+TEXT_RULES = TextRules()
+
+
+def set_text_rules(overrides: Optional[Dict[str, object]]) -> None:
+    """Recompila TEXT_RULES com as chaves informadas sobre TEXT_RULES_CONFIG."""
+    global TEXT_RULES
+    TEXT_RULES = TextRules(overrides)
+
+
+def load_text_rules(path: str) -> None:
+    """Carrega regras de texto de um arquivo JSON (ver TEXT_RULES_CONFIG)."""
+    with open(path, "r", encoding="utf-8") as f:
+        set_text_rules(json.load(f))
+    logging.info("Regras de texto carregadas de %s", path)
+
+
+# ==========================
+# Utilitários
+# ==========================
+
+def normalize_space(text: str) -> str:
+    """Normaliza espaços em um texto."""
+    return " ".join(text.split())
+
+
+def get_domain(url: str) -> str:
+    """Extrai o domínio de uma URL, sem 'www.'."""
+    netloc = urlparse(url).netloc
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    return netloc
+
+
+def site_root(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+# Parâmetros de rastreamento que não mudam a página (utm_* por prefixo)
+TRACKING_PARAMS = {
+    "srsltid", "gclid", "gbraid", "wbraid", "fbclid", "msclkid", "yclid",
+    "mc_cid", "mc_eid", "igshid", "_ga", "_gl", "gad_source", "ref", "ref_src",
+}
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name.startswith("utm_") or name in TRACKING_PARAMS
+
+
+@lru_cache(maxsize=65536)
+def clean_url(url: str) -> str:
+    """URL sem fragmento e sem parâmetros de rastreamento (continua baixável)."""
+    parsed = urlparse(url.strip())
+    if not parsed.fragment and not parsed.query:
+        return url.strip()
+    query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if not _is_tracking_param(k)]
+    return urlunparse(parsed._replace(query=urlencode(query), fragment=""))
+
+
+@lru_cache(maxsize=65536)
+def canonical_url(url: str) -> str:
+    """
+    Chave de deduplicação: clean_url com esquema e host em minúsculas,
+    sem porta padrão, sem barra final e com a query ordenada. Não é usada
+    para baixar (tirar a barra pode custar um redirect).
+    """
+    parsed = urlparse(clean_url(url))
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme, netloc.rsplit(":", 1)[-1]) in (("http", "80"), ("https", "443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parsed.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, netloc, path, parsed.params, query, ""))
+
+
+class UrlFrontier:
+    """
+    Conjunto ordenado de URLs deduplicado pela forma canônica: add() e
+    `in` são O(1) e a iteração segue a ordem de descoberta, devolvendo a
+    primeira versão limpa (clean_url) vista de cada URL.
+    """
+
+    def __init__(self, urls: Iterable[str] = ()) -> None:
+        self._keys: Set[str] = set()
+        self._urls: List[str] = []
+        self.lock = threading.Lock()
+        for url in urls:
+            self.add(url)
+
+    def add(self, url: str) -> bool:
+        """Adiciona a URL; retorna False se ela (ou uma equivalente) já estava."""
+        key = canonical_url(url)
+        with self.lock:
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+            self._urls.append(clean_url(url))
+            return True
+
+    def __contains__(self, url: str) -> bool:
+        return canonical_url(url) in self._keys
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def __iter__(self) -> Iterator[str]:
+        """Em ordem; URLs adicionadas durante a iteração também são visitadas."""
+        i = 0
+        while i < len(self._urls):
+            yield self._urls[i]
+            i += 1
+
+    def urls(self) -> List[str]:
+        return list(self._urls)
+
+
+@dataclass
+class FetchResult:
+    """Resultado de fetch_page: o corpo só vem preenchido quando ok."""
+    url: str
+    status: int = 0          # 0 quando não houve resposta HTTP
+    text: str = ""
+    size: int = 0            # bytes recebidos (corpo descomprimido)
+    elapsed: float = 0.0     # segundos de rede, somando as tentativas
+    error: str = ""          # classe do erro (ver HTTP_RETRY_POLICY); "" = ok
+    from_cache: bool = False
+    truncated: bool = False  # leitura encerrada em stop_at (corpo pode estar incompleto)
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+def classify_request_error(exc: Exception) -> str:
+    """Classe (chave de HTTP_RETRY_POLICY ou "other") de uma exceção do requests."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return "connect"
+    if isinstance(exc, (requests.exceptions.ReadTimeout, requests.exceptions.ChunkedEncodingError)):
+        return "read"
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        # Com repetições no transporte, timeouts de leitura chegam embrulhados
+        reason = getattr(exc.args[0], "reason", None) if exc.args else None
+        if isinstance(reason, (ReadTimeoutError, ProtocolError)):
+            return "read"
+        return "connect"
+    return "other"
+
+
+def classify_status(status: int) -> str:
+    """Classe de erro de uma resposta HTTP fora de 2xx/304."""
+    if status in (429, 503):
+        return "rate_limited"
+    if status >= 500:
+        return "server_error"
+    if status >= 400:
+        return "client_error"
+    return "status"
+
+
+def content_type_allowed(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return True
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type in HTTP_ALLOWED_CONTENT_TYPES
+
+
+def decode_body(body: bytes, encoding: Optional[str]) -> str:
+    """Decodifica como Response.text: charset do header ou detectado no conteúdo."""
+    if not encoding:
+        encoding = requests.compat.chardet.detect(body)["encoding"] or "utf-8"
+    try:
+        return str(body, encoding, errors="replace")
+    except (LookupError, TypeError):
+        return str(body, "utf-8", errors="replace")
+
+
+def read_body(
+    resp: requests.Response, stop_at: Optional["re.Pattern[bytes]"] = None
+) -> Tuple[bytes, str, bool]:
+    """
+    Lê o corpo em blocos de HTTP_CHUNK_SIZE. Retorna (bytes, erro, truncado):
+    erro "too_large" ao passar de HTTP_MAX_BODY_BYTES, "read" ao estourar
+    HTTP_MAX_DOWNLOAD_SECONDS; com stop_at, para assim que o padrão aparece.
+    """
+    declared = resp.headers.get("Content-Length", "")
+    if declared.isdigit() and int(declared) > HTTP_MAX_BODY_BYTES:
+        return b"", "too_large", False
+    body = bytearray()
+    deadline = time.monotonic() + HTTP_MAX_DOWNLOAD_SECONDS
+    for chunk in resp.iter_content(HTTP_CHUNK_SIZE):
+        # Revisita um pedaço do bloco anterior: o padrão pode cruzar a fronteira
+        searched = max(0, len(body) - 256)
+        body += chunk
+        if len(body) > HTTP_MAX_BODY_BYTES:
+            return bytes(body), "too_large", False
+        if stop_at is not None and stop_at.search(body, searched):
+            return bytes(body), "", True
+        if time.monotonic() > deadline:
+            return bytes(body), "read", False
+    return bytes(body), "", False
+
+
+def fetch_page(
+    session: requests.Session, url: str, stop_at: Optional["re.Pattern[bytes]"] = None
+) -> FetchResult:
+    """
+    _fetch_page com métricas: etapa "fetch" (rede, inclusive 304) ou
+    "cache" (servido do disco) e erros por domínio em RUN_METRICS.
+    """
+    start = time.perf_counter()
+    result = _fetch_page(session, url, stop_at)
+    domain = get_domain(url)
+    stage = "cache" if result.from_cache and result.status == 200 else "fetch"
+    RUN_METRICS.observe(stage, time.perf_counter() - start, domain)
+    if result.error:
+        RUN_METRICS.record_error(domain, result.error)
+    return result
+
+
+def _fetch_page(
+    session: requests.Session, url: str, stop_at: Optional["re.Pattern[bytes]"] = None
+) -> FetchResult:
+    """
+    Faz uma requisição HTTP segura e retorna um FetchResult (nunca levanta).
+    Com RESPONSE_CACHE ativo, respostas recentes vêm do disco e as demais
+    são revalidadas com uma requisição condicional. Domínios com o
+    disjuntor aberto nem são consultados (error="circuit_open").
+
+    O corpo é baixado em streaming e descartado se o Content-Type não estiver
+    em HTTP_ALLOWED_CONTENT_TYPES ou se passar de HTTP_MAX_BODY_BYTES.
+    stop_at (regex de bytes) encerra a leitura quando o trecho necessário já
+    chegou; sem cache, já que uma página parcial não pode ser guardada.
+    """
+    cache = RESPONSE_CACHE
+    entry = cache.get(url) if cache else None
+    if cache and entry and (cache.offline or cache.is_fresh(entry)):
+        return FetchResult(url, 200, entry.body, len(entry.body.encode("utf-8")), from_cache=True)
+    if cache and cache.offline:
+        logging.warning("Modo offline: %s não está no cache", url)
+        return FetchResult(url, error="offline")
+    if not CIRCUIT_BREAKER.allow(url):
+        logging.debug("Disjuntor aberto para %s, pulando %s", get_domain(url), url)
+        return FetchResult(url, error="circuit_open")
+
+    headers = cache.conditional_headers(entry) if cache else {}
+    if cache:
+        stop_at = None
+    apply_crawl_delay(session, url)
+    elapsed = 0.0
+    for attempt in range(HTTP_RETRY_POLICY["rate_limited"] + 1):
+        RATE_LIMITER.acquire(url)
+        start = time.monotonic()
+        try:
+            resp = session.get(url, timeout=HTTP_TIMEOUT, headers=headers, stream=True)
+        except Exception as exc:
+            elapsed += time.monotonic() - start
+            error = classify_request_error(exc)
+            logging.warning("Erro (%s) ao acessar %s: %s", error, url, exc)
+            CIRCUIT_BREAKER.record(url, error)
+            return FetchResult(url, elapsed=elapsed, error=error)
+        elapsed += time.monotonic() - start
+        if resp.status_code not in (429, 503):
+            break
+        resp.close()
+        retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+        RATE_LIMITER.penalize(url, retry_after)
+        logging.warning(
+            "Status %s ao acessar %s (tentativa %d), reduzindo ritmo do domínio",
+            resp.status_code, url, attempt + 1,
+        )
+    status = resp.status_code
+    if status == 304 and cache and entry:
+        resp.close()
+        RATE_LIMITER.record_success(url)
+        CIRCUIT_BREAKER.record(url, "")
+        cache.touch(url)
+        return FetchResult(url, 304, entry.body, len(entry.body.encode("utf-8")), elapsed, from_cache=True)
+    # 2xx inteiro: a busca paginada do VTEX responde 206 Partial Content
+    if not 200 <= status < 300:
+        resp.close()
+        error = classify_status(status)
+        logging.warning("Status %s ao acessar %s", status, url)
+        CIRCUIT_BREAKER.record(url, error)
+        return FetchResult(url, status, elapsed=elapsed, error=error)
+    content_type = resp.headers.get("Content-Type")
+    if not content_type_allowed(content_type):
+        resp.close()
+        CIRCUIT_BREAKER.record(url, "")
+        logging.info("Ignorando %s: Content-Type %s", url, content_type)
+        return FetchResult(url, status, elapsed=elapsed, error="content_type")
+
+    start = time.monotonic()
+    try:
+        body, error, truncated = read_body(resp, stop_at)
+    except Exception as exc:
+        error = classify_request_error(exc)
+        logging.warning("Erro (%s) ao ler %s: %s", error, url, exc)
+        CIRCUIT_BREAKER.record(url, error)
+        return FetchResult(url, status, elapsed=elapsed + time.monotonic() - start, error=error)
+    finally:
+        resp.close()
+    elapsed += time.monotonic() - start
+    CIRCUIT_BREAKER.record(url, error)
+    if error:
+        logging.warning("Download de %s interrompido (%s) com %d bytes", url, error, len(body))
+        return FetchResult(url, status, size=len(body), elapsed=elapsed, error=error)
+    RATE_LIMITER.record_success(url)
+    text = decode_body(body, resp.encoding)
+    if cache:
+        cache.put(url, text, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+    return FetchResult(url, status, text, len(body), elapsed, truncated=truncated)
+
+
+def fetch_html(session: requests.Session, url: str) -> str:
+    """fetch_page reduzido ao HTML ("" em qualquer falha), para os parsers."""
+    return fetch_page(session, url).text
+
+
+# Títulos de seção conhecidos, por seção. Um título pode ser prefixo de
+# outro ("Ingredientes" / "Ingredientes:"): ele é buscado uma vez só.
+SECTION_HEADINGS: Dict[str, Tuple[str, ...]] = {
+    "usage": (
+        "Modo de usar", "Modo de uso", "Como usar", "Modo de aplicação",
+        "Instruções de uso", "How to use", "Aplicação",
+    ),
+    "ingredients": (
+        "Ingredientes:", "Ingredientes", "Composição:", "Composição",
+        "INCI:", "INCI", "Ingredients:", "Composition:",
+    ),
+    "precautions": ("Precauções", "Advertências", "Cuidados"),
+    "info": ("Informações",),
+    "reviews": ("Avaliações",),
+    "related": ("Produtos relacionados",),
+}
+SECTION_BY_HEADING: Dict[str, str] = {
+    heading.lower(): name for name, headings in SECTION_HEADINGS.items() for heading in headings
+}
+
+
+def _heading_prefix(heading: str) -> Optional[str]:
+    """Título conhecido mais longo que é prefixo (próprio) de heading."""
+    prefixes = [h for h in SECTION_BY_HEADING if h != heading and heading.startswith(h)]
+    return max(prefixes, key=len) if prefixes else None
+
+
+SECTION_PREFIX: Dict[str, Optional[str]] = {h: _heading_prefix(h) for h in SECTION_BY_HEADING}
+
+
+@dataclass
+class PageSection:
+    """Trecho rotulado do texto: título em [start, body_start), corpo até end."""
+    name: str
+    heading: str
+    start: int
+    body_start: int
+    end: int
+
+
+class SectionIndex:
+    """
+    Posições de todos os títulos no texto minúsculo de uma página. Cada
+    título é procurado uma única vez (títulos que começam com outro título
+    reaproveitam as posições dele) e as buscas seguintes, de qualquer
+    extrator, só consultam o índice.
+    """
+
+    def __init__(self, full_text: str, text_lower: Optional[str] = None) -> None:
+        self.text = full_text
+        self.lower = text_lower if text_lower is not None else full_text.lower()
+        self._positions: Dict[str, List[int]] = {}
+
+    def positions(self, heading: str) -> List[int]:
+        """Todas as ocorrências (com sobreposição) do título, em ordem."""
+        heading = heading.lower()
+        found = self._positions.get(heading)
+        if found is not None:
+            return found
+        prefix = SECTION_PREFIX[heading] if heading in SECTION_PREFIX else _heading_prefix(heading)
+        if prefix is not None:
+            found = [pos for pos in self.positions(prefix) if self.lower.startswith(heading, pos)]
+        else:
+            found = []
+            pos = self.lower.find(heading)
+            while pos != -1:
+                found.append(pos)
+                pos = self.lower.find(heading, pos + 1)
+        self._positions[heading] = found
+        return found
+
+    def find(self, headings: Iterable[str], start: int = 0) -> Tuple[int, str]:
+        """
+        Primeira ocorrência a partir de start de qualquer dos títulos:
+        (posição, título). Empate fica com o primeiro da lista; (-1, "") se nenhum.
+        """
+        best, best_heading = -1, ""
+        for heading in headings:
+            found = self.positions(heading)
+            i = bisect.bisect_left(found, start)
+            if i < len(found) and (best == -1 or found[i] < best):
+                best, best_heading = found[i], heading
+        return best, best_heading
+
+    def extract(
+        self,
+        labels: List[str],
+        stop_markers: Optional[List[str]] = None,
+        max_chars: int = 2000,
+    ) -> str:
+        """Trecho do primeiro label até o primeiro stop_marker depois dele."""
+        start, label = self.find(labels)
+        if start == -1:
+            return ""
+        end = start + max_chars
+        if stop_markers:
+            stop, _ = self.find(stop_markers, start + len(label))
+            if stop != -1:
+                end = min(end, stop)
+        return self.text[start:end].strip()
+
+    def sections(self) -> List[PageSection]:
+        """
+        Todas as seções de SECTION_HEADINGS na ordem do texto, numa passada
+        pelo índice; cada uma vai até o próximo título. Na mesma posição vale
+        o título mais longo.
+        """
+        marks: Dict[int, str] = {}
+        for heading in SECTION_BY_HEADING:
+            for pos in self.positions(heading):
+                if len(heading) > len(marks.get(pos, "")):
+                    marks[pos] = heading
+        # Títulos dentro de outro ("aplicação" em "modo de aplicação") não contam
+        ordered: List[Tuple[int, str]] = []
+        for pos, heading in sorted(marks.items()):
+            if not ordered or pos >= ordered[-1][0] + len(ordered[-1][1]):
+                ordered.append((pos, heading))
+        result: List[PageSection] = []
+        for i, (pos, heading) in enumerate(ordered):
+            end = ordered[i + 1][0] if i + 1 < len(ordered) else len(self.text)
+            result.append(PageSection(SECTION_BY_HEADING[heading], heading, pos, pos + len(heading), end))
+        return result
+
+
+def extract_section_by_label(
+    full_text: str,
+    labels: List[str],
+    stop_markers: Optional[List[str]] = None,
+    max_chars: int = 2000,
+    lower_text: Optional[str] = None,
+    sections: Optional[SectionIndex] = None,
+) -> str:
+    """
+    Extrai um trecho do texto a partir de um label (ex.: 'Modo de usar')
+    até encontrar um dos stop_markers ou atingir max_chars.
+    sections (ver PageContext.sections) reaproveita as buscas já feitas
+    na página; lower_text evita recalcular full_text.lower().
+    """
+    if not full_text:
+        return ""
+    if sections is None:
+        sections = SectionIndex(full_text, lower_text)
+    return sections.extract(labels, stop_markers, max_chars)
+
+
+def extract_ph(full_text: str) -> Optional[float]:
+    """Extrai o valor de pH, se estiver presente no texto."""
+    if not full_text:
+        return None
+    match = TEXT_RULES.ph.search(full_text)
+    if match:
+        val = match.group(1).replace(",", ".")
+        try:
+            return float(val)
+        except ValueError:
+            return None
+    return None
+
+
+def extract_audience(full_text: str, lower: Optional[str] = None) -> str:
+    """Define o público/idade alvo com base em palavras-chave no texto."""
+    if not full_text:
+        return ""
+    if lower is None:
+        lower = full_text.lower()
+    # Se nada for encontrado, consideramos adulto / geral
+    return TEXT_RULES.audience.first_label(lower, TEXT_RULES.audience_default)
+
+
+def extract_hair_type_from_text(text: str, lower: Optional[str] = None) -> str:
+    """Extrai tipo de cabelo declarado diretamente na descrição."""
+    if not text:
+        return ""
+    if lower is None:
+        lower = text.lower()
+    return TEXT_RULES.hair_types.first_label(lower)
+
+
+def parse_ingredients_list(raw_ingredients: str) -> List[str]:
+    """Normaliza e separa a lista de ingredientes."""
+    if not raw_ingredients:
+        return []
+    text = raw_ingredients.lower()
+    text = text.replace(";", ",")
+    # Remove prefixos comuns como "ingredientes:" ou "composição:"
+    text = TEXT_RULES.ingredients_prefix.sub("", text)
+    parts = [p.strip() for p in text.split(",") if p.strip()]
+    return parts
+
+_INGREDIENT_AUTOMATON: Optional[KeywordAutomaton] = None
+
+
+def get_ingredient_automaton() -> KeywordAutomaton:
+    """Autômato único sobre todos os termos de INGREDIENT_GROUPS (valor = bit)."""
+    global _INGREDIENT_AUTOMATON
+    if _INGREDIENT_AUTOMATON is None:
+        _INGREDIENT_AUTOMATON = KeywordAutomaton(
+            (term, bit) for terms, bit in INGREDIENT_GROUPS for term in terms
+        )
+    return _INGREDIENT_AUTOMATON
+
+
+@lru_cache(maxsize=INGREDIENT_CACHE_SIZE)
+def _classify_normalized_ingredient(ingredient: str) -> int:
+    mask = 0
+    for bit in get_ingredient_automaton().find_values(ingredient):
+        mask |= bit
+    return mask
+
+
+def classify_ingredient(ingredient: str) -> int:
+    """
+    Máscara de categorias (ING_*) de um ingrediente, por correspondência
+    parcial com os termos de cada grupo. Os mesmos nomes INCI se repetem em
+    milhares de produtos, então o resultado fica em cache.
+    """
+    return _classify_normalized_ingredient(ingredient.strip().lower())
+
+
+def classify_ingredients(ingredients: List[str]) -> List[int]:
+    """Classifica uma lista de ingredientes (uma máscara por posição)."""
+    return [classify_ingredient(ing) for ing in ingredients]
+
+
+def reset_ingredient_classifier() -> None:
+    """Descarta autômato e cache após editar os grupos de ingredientes."""
+    global _INGREDIENT_AUTOMATON
+    _INGREDIENT_AUTOMATON = None
+    _classify_normalized_ingredient.cache_clear()
+
+
+def ingredient_weight(position: int) -> float:
+    """Calcula o peso do ingrediente baseado na posição (0-indexed)."""
+    # 0 = mais importante, 9 = menos
+    return max(1.0 - position * 0.1, 0)
+
+def classify_cronograma(ingredients: List[str], masks: Optional[List[int]] = None) -> Dict[str, object]:
+    """
+    Classifica o produto em H, N, R com scores.
+    masks (de classify_ingredients) evita reclassificar os ingredientes.
+    """
+    h_score = n_score = r_score = 0.0
+
+    # Considerar apenas os top 10 ingredientes para pontuação principal
+    if masks is None:
+        masks = classify_ingredients(ingredients[:10])
+
+    for i, mask in enumerate(masks[:10]):
+        w = ingredient_weight(i)
+        
+        # Check partial matches for flexibility
+        if mask & ING_HUMECTANT:
+            h_score += 1.0 * w
+        
+        if mask & ING_NUTRITION:
+            n_score += 1.0 * w
+            
+        if mask & ING_RECONSTRUCTION:
+            r_score += 1.0 * w
+
+    total = h_score + n_score + r_score
+    if total == 0:
+        return {"fase": "Indefinido", "scores": {"H": 0.0, "N": 0.0, "R": 0.0}}
+
+    h = round(h_score / total, 2)
+    n = round(n_score / total, 2)
+    r = round(r_score / total, 2)
+
+    scores = {"H": h, "N": n, "R": r}
+    fase = max(scores, key=scores.get)
+
+    # Verifica empate ou proximidade para Mix
+    ordered = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+    if len(ordered) > 1 and (ordered[0][1] - ordered[1][1] < 0.15):
+        fase = f"{ordered[0][0]}+{ordered[1][0]}"
+
+    return {"fase": fase, "scores": scores}
+
+def score_fine_hair(
+    ingredients: List[str], product_category: str, masks: Optional[List[int]] = None
+) -> Dict[str, object]:
+    """
+    Calcula score de adequação para cabelos finos.
+    masks (de classify_ingredients) evita reclassificar os ingredientes.
+    """
+    if masks is None:
+        masks = classify_ingredients(ingredients[:10])
+    
+    heavy_count = 0
+    light_count = 0
+    humectant_count = 0
+    protein_count = 0
+    volatile_silicone_count = 0
+    
+    product_category_lower = product_category.lower()
+
+    for mask in masks[:10]:
+        if mask & ING_HEAVY:
+            heavy_count += 1
+        if mask & ING_OIL_LIGHT:
+            light_count += 1
+        if mask & ING_HUMECTANT:
+            humectant_count += 1
+        if mask & ING_RECONSTRUCTION:
+            protein_count += 1
+        if mask & ING_SILICONE_VOLATILE:
+            volatile_silicone_count += 1
+
+    score = 0.0
+    score += light_count * 0.8
+    score += humectant_count * 0.6
+    score += protein_count * 0.7
+    score += volatile_silicone_count * 0.5
+    score -= heavy_count * 1.2
+
+    if "máscara" in product_category_lower or "mascara" in product_category_lower:
+        score -= 0.5
+    if "spray" in product_category_lower:
+        score += 0.5
+    if "leave-in" in product_category_lower:
+        score += 0.2
+
+    if score >= 2.0:
+        label = "Sim"
+    elif score >= 0.5:
+        label = "Talvez"
+    else:
+        label = "Não"
+        
+    return {"score_fine": round(score, 2), "adequacao_cabelos_finos": label}
+
+
+def infer_product_type_from_name_and_breadcrumbs(name: str, ctx: "PageContext") -> str:
+    """Infere o tipo de produto usando nome e possíveis breadcrumbs."""
+    sources = [name.lower()]
+    if ctx.breadcrumb_text_lower:
+        sources.append(ctx.breadcrumb_text_lower)
+    full = " ".join(sources)
+    for kw, label in PRODUCT_TYPES:
+        if kw in full:
+            return label
+    return "Outros"
+
+
+def extract_image_urls_generic(
+    ctx: "PageContext", base_url: str, preferred_front: str = ""
+) -> Tuple[str, str]:
+    """
+    Tenta extrair URLs de imagem frontal e verso de forma genérica.
+    preferred_front (ex.: imagem do JSON-LD) vira a frente quando informada.
+    """
+    candidates = []
+    selectors = [
+        "div.product-images img",
+        "div.product-image img",
+        "div.images img",
+        "figure.woocommerce-product-gallery__wrapper img",
+        "img#image-main",
+        "img.wp-post-image",
+        ".product-gallery__image img"
+    ]
+    for sel in selectors:
+        candidates.extend(ctx.select(sel))
+    if not candidates:
+        candidates = ctx.images
+
+    urls: List[str] = [preferred_front] if preferred_front else []
+    for img in candidates:
+        src = img.get("src") or img.get("data-src") or img.get("data-large_image")
+        if src:
+            full_url = urljoin(base_url, src)
+            # Filtra imagens muito pequenas ou ícones comuns
+            if "icon" not in full_url.lower() and "logo" not in full_url.lower():
+                urls.append(full_url)
+
+    if not urls:
+        return "", ""
+
+    # Remove duplicatas mantendo ordem
+    unique_urls = []
+    seen = set()
+    for u in urls:
+        if u not in seen:
+            unique_urls.append(u)
+            seen.add(u)
+    
+    urls = unique_urls
+
+    front = urls[0] if urls else ""
+    back = ""
+    if len(urls) > 1:
+        for u in urls[1:]:
+            lower = u.lower()
+            if any(tag in lower for tag in ("back", "verso", "traseira", "tabela", "ingredientes", "rotulo")):
+                back = u
+                break
+        if not back:
+            back = urls[1]
+
+    return front, back
+
+
+def detect_claims(ctx: "PageContext", extra_text: str = "") -> Dict[str, object]:
+    """Marca os claims (booleans) com base em texto e metadados de imagens."""
+    text = ctx.text_lower + "\n" + extra_text.lower() + "\n" + ctx.image_text_lower
+    found_keys = get_claims_automaton().find_values(text, stop_after=len(CLAIMS_CONFIG))
+
+    result: Dict[str, object] = {}
+    active_labels: List[str] = []
+
+    for key, conf in CLAIMS_CONFIG.items():
+        found = key in found_keys
+        result[key] = found
+        if found:
+            active_labels.append(conf["label"])
+
+    result["claims_list"] = ", ".join(sorted(active_labels)) if active_labels else ""
+    return result
+
+
+def build_product_record(
+    ctx: PageContext,
+    brand: str,
+    product_name: str,
+    description: str,
+    usage: str,
+    ingredients_raw: str,
+    parser_name: Optional[str] = None,
+    image_url: str = "",
+) -> Dict[str, object]:
+    """
+    Completa o registro a partir dos campos específicos de cada parser:
+    tipo de cabelo, imagens, pH, público, tipo, cronograma, cabelos finos
+    e claims, todos calculados sobre o mesmo PageContext. O SKU vem dos
+    dados estruturados da página; image_url, se houver, é a imagem frontal.
+    """
+    with RUN_METRICS.timer("extract.ingredients"):
+        ingredients_list = parse_ingredients_list(ingredients_raw)
+
+    with RUN_METRICS.timer("extract.hair_type"):
+        if description:
+            hair_type_declared = extract_hair_type_from_text(description)
+        else:
+            hair_type_declared = extract_hair_type_from_text(ctx.full_text, ctx.text_lower)
+
+    with RUN_METRICS.timer("extract.images"):
+        image_front_url, image_back_url = extract_image_urls_generic(ctx, ctx.url, image_url)
+    with RUN_METRICS.timer("extract.ph"):
+        ph_value = extract_ph(ctx.full_text)
+    with RUN_METRICS.timer("extract.audience"):
+        audience = extract_audience(ctx.full_text, ctx.text_lower)
+    with RUN_METRICS.timer("extract.product_type"):
+        product_type = infer_product_type_from_name_and_breadcrumbs(product_name, ctx)
+
+    # Uma única classificação dos top 10 ingredientes para os dois scores
+    with RUN_METRICS.timer("score.cronograma"):
+        masks = classify_ingredients(ingredients_list[:10])
+        cronograma_info = classify_cronograma(ingredients_list, masks)
+    with RUN_METRICS.timer("score.cabelos_finos"):
+        fine_hair_info = score_fine_hair(ingredients_list, product_type, masks)
+
+    with RUN_METRICS.timer("extract.claims"):
+        claims = detect_claims(ctx, ingredients_raw)
+
+    record: Dict[str, object] = {
+        "source_url": ctx.url,
+        "brand": brand,
+        "product_name": product_name,
+        "sku": ctx.structured.get("sku", ""),
+        "product_type": product_type,
+        "description": description,
+        "function_objective": description,
+        "hair_type_declared": hair_type_declared,
+        "usage_instructions": usage,
+        "ingredients_raw": ingredients_raw,
+        "ingredients_list": ", ".join(ingredients_list),
+        "image_front_url": image_front_url,
+        "image_back_url": image_back_url,
+        "ph": ph_value,
+        "target_audience": audience,
+        "cronograma_fase": cronograma_info["fase"],
+        "cronograma_scores": str(cronograma_info["scores"]),
+        "adequacao_cabelos_finos": fine_hair_info["adequacao_cabelos_finos"],
+        "score_cabelos_finos": fine_hair_info["score_fine"],
+    }
+    if parser_name:
+        record["_parser"] = parser_name
+    record.update(claims)
+    return record
+
+
+# ==========================
+# Estrutura de parsers
+# ==========================
+
+@dataclass
+class BrandParser:
+    domain: str
+    get_product_links: Callable[[requests.Session, str], List[str]]
+    parse_product: Callable[[requests.Session, str], Optional[Dict[str, object]]]
+    # Mesmo parser a partir do HTML já baixado: (html, product_url) -> registro
+    parse_html: Optional[Callable[[str, str], Optional[Dict[str, object]]]] = None
+    # Catálogo via API da plataforma: (session, base_url) -> (product_url, html)
+    # já montados, sem baixar a página de cada produto
+    get_product_pages: Optional[Callable[[requests.Session, str], Iterator[Tuple[str, str]]]] = None
+    # Rótulo nas métricas da execução (o mesmo `_parser` dos registros, quando houver)
+    name: str = ""
+
+
+BRAND_PARSERS: Dict[str, BrandParser] = {}
+
+
+def register_brand_parser(parser: BrandParser) -> None:
+    BRAND_PARSERS[parser.domain] = parser
+
+
+# ==========================
+# Parser StiloHair
+# ==========================
+
+def get_all_product_links_stilohair(session: requests.Session, brand_page_url: str) -> List[str]:
+    """
+    Coleta links de produtos na página da marca no site StiloHair, incluindo paginação.
+    """
+    product_links = UrlFrontier()
+    page_url: Optional[str] = brand_page_url
+    visited = UrlFrontier()
+
+    while page_url and visited.add(page_url):
+        html = fetch_html(session, page_url)
+        if not html:
+            break
+
+        soup = make_listing_soup(html)
+
+        anchors: List[BeautifulSoup] = []
+        selectors = [
+            "a.product-name",
+            "a.nome_produto",
+            "a.nome-produto",
+            "div.product-name a",
+            "h2.product-name a",
+            "h2.nome-produto a",
+            "div.product-item a",
+        ]
+        for sel in selectors:
             anchors.extend(soup.select(sel))
 
         # Fallback: âncoras que parecem produto
@@ -566,9 +2755,7 @@ def get_all_product_links_stilohair(session: requests.Session, brand_page_url: s
         for a in anchors:
             href = a.get("href")
             if href:
-                full_url = urljoin(page_url, href)
-                if full_url not in product_links:
-                    product_links.append(full_url)
+                product_links.add(urljoin(page_url, href))
 
         # Paginação
         next_url: Optional[str] = None
@@ -584,20 +2771,23 @@ def get_all_product_links_stilohair(session: requests.Session, brand_page_url: s
                     break
 
         page_url = next_url
-        polite_sleep()
 
-    return product_links
+    return product_links.urls()
 
 
 def parse_product_stilohair(session: requests.Session, product_url: str) -> Optional[Dict[str, object]]:
-    """Extrai todos os campos relevantes de um produto no site StiloHair."""
+    """Baixa a página do produto e aplica parse_product_stilohair_html."""
     html = fetch_html(session, product_url)
     if not html:
         return None
+    return parse_product_stilohair_html(html, product_url)
 
-    soup = BeautifulSoup(html, "html.parser")
-    full_text = soup.get_text("\n", strip=True)
-    full_text_lower = full_text.lower()
+
+def parse_product_stilohair_html(html: str, product_url: str) -> Optional[Dict[str, object]]:
+    """Extrai todos os campos relevantes de um produto no site StiloHair."""
+    ctx = PageContext(html, product_url)
+    soup = ctx.soup
+    full_text = ctx.full_text
 
     # Nome do produto
     title_tag = soup.find("h1") or soup.find("h2")
@@ -605,20 +2795,20 @@ def parse_product_stilohair(session: requests.Session, product_url: str) -> Opti
 
     # Marca
     brand = ""
-    match_marca = re.search(r"Marca:\s*([^\n\r]+)", full_text)
+    match_marca = TEXT_RULES.brand_label.search(full_text)
     if match_marca:
         brand = match_marca.group(1).strip()
     else:
-        if "1ka" in full_text_lower:
+        if "1ka" in ctx.text_lower:
             brand = "1Ka Hair"
         else:
             brand = "StiloHair"
 
     # Descrição
     desc_tag = (
-        soup.select_one("div.product-description")
-        or soup.select_one("div.descricao")
-        or soup.select_one("div#descricao")
+        ctx.select_one("div.product-description")
+        or ctx.select_one("div.descricao")
+        or ctx.select_one("div#descricao")
     )
     description = ""
     if desc_tag:
@@ -635,6 +2825,7 @@ def parse_product_stilohair(session: requests.Session, product_url: str) -> Opti
         full_text,
         ["Modo de usar", "Modo de uso", "Como usar"],
         stop_markers=["Ingredientes", "Composição", "Produtos relacionados"],
+        sections=ctx.sections,
     )
 
     # Ingredientes
@@ -642,52 +2833,11 @@ def parse_product_stilohair(session: requests.Session, product_url: str) -> Opti
         full_text,
         ["Ingredientes", "Composição"],
         stop_markers=["Modo de usar", "Modo de uso", "Como usar", "Produtos relacionados"],
+        sections=ctx.sections,
     )
     ingredients_raw = ingredients_raw.replace("\n", " ").strip()
-    ingredients_list = parse_ingredients_list(ingredients_raw)
 
-    # Tipo de cabelo
-    hair_type_declared = extract_hair_type_from_text(description or full_text)
-
-    # Imagens
-    image_front_url, image_back_url = extract_image_urls_generic(soup, product_url)
-
-    # pH e público
-    ph_value = extract_ph(full_text)
-    audience = extract_audience(full_text)
-
-    # Tipo de produto
-    product_type = infer_product_type_from_name_and_breadcrumbs(product_name, soup)
-
-    # Cronograma e Fine Hair
-    cronograma_info = classify_cronograma(ingredients_list)
-    fine_hair_info = score_fine_hair(ingredients_list, product_type)
-
-    # Claims
-    claims = detect_claims(soup, full_text + "\n" + ingredients_raw)
-
-    record: Dict[str, object] = {
-        "source_url": product_url,
-        "brand": brand,
-        "product_name": product_name,
-        "product_type": product_type,
-        "description": description,
-        "function_objective": description,
-        "hair_type_declared": hair_type_declared,
-        "usage_instructions": usage,
-        "ingredients_raw": ingredients_raw,
-        "ingredients_list": ", ".join(ingredients_list),
-        "image_front_url": image_front_url,
-        "image_back_url": image_back_url,
-        "ph": ph_value,
-        "target_audience": audience,
-        "cronograma_fase": cronograma_info["fase"],
-        "cronograma_scores": str(cronograma_info["scores"]),
-        "adequacao_cabelos_finos": fine_hair_info["adequacao_cabelos_finos"],
-        "score_cabelos_finos": fine_hair_info["score_fine"]
-    }
-    record.update(claims)
-    return record
+    return build_product_record(ctx, brand, product_name, description, usage, ingredients_raw)
 
 
 register_brand_parser(
@@ -695,6 +2845,8 @@ register_brand_parser(
         domain="stilohair.com.br",
         get_product_links=get_all_product_links_stilohair,
         parse_product=parse_product_stilohair,
+        parse_html=parse_product_stilohair_html,
+        name="stilohair",
     )
 )
 
@@ -707,17 +2859,16 @@ def get_all_product_links_aline(session: requests.Session, brand_page_url: str)
     """
     Coleta links de produtos na loja da Aline Brasil (WooCommerce-like).
     """
-    product_links: List[str] = []
+    product_links = UrlFrontier()
     page_url: Optional[str] = brand_page_url
-    visited: set = set()
+    visited = UrlFrontier()
 
-    while page_url and page_url not in visited:
-        visited.add(page_url)
+    while page_url and visited.add(page_url):
         html = fetch_html(session, page_url)
         if not html:
             break
 
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_listing_soup(html)
 
         anchors: List[BeautifulSoup] = []
         selectors = [
@@ -743,9 +2894,7 @@ def get_all_product_links_aline(session: requests.Session, brand_page_url: str)
         for a in anchors:
             href = a.get("href")
             if href:
-                full_url = urljoin(page_url, href)
-                if full_url not in product_links:
-                    product_links.append(full_url)
+                product_links.add(urljoin(page_url, href))
 
         # Paginação
         next_url: Optional[str] = None
@@ -754,24 +2903,28 @@ def get_all_product_links_aline(session: requests.Session, brand_page_url: str)
             next_url = urljoin(page_url, a_next["href"])
 
         page_url = next_url
-        polite_sleep()
 
-    return product_links
+    return product_links.urls()
 
 
 def parse_product_aline(session: requests.Session, product_url: str) -> Optional[Dict[str, object]]:
-    """
-    Parser de produto pensado para um site WooCommerce típico.
-    """
+    """Baixa a página do produto e aplica parse_product_aline_html."""
     html = fetch_html(session, product_url)
     if not html:
         return None
+    return parse_product_aline_html(html, product_url)
+
 
-    soup = BeautifulSoup(html, "html.parser")
-    full_text = soup.get_text("\n", strip=True)
+def parse_product_aline_html(html: str, product_url: str) -> Optional[Dict[str, object]]:
+    """
+    Parser de produto pensado para um site WooCommerce típico.
+    """
+    ctx = PageContext(html, product_url)
+    soup = ctx.soup
+    full_text = ctx.full_text
 
     # Nome do produto
-    title_tag = soup.select_one("h1.product_title") or soup.find("h1")
+    title_tag = ctx.select_one("h1.product_title") or soup.find("h1")
     product_name = normalize_space(title_tag.get_text()) if title_tag else ""
 
     # Marca
@@ -779,9 +2932,9 @@ def parse_product_aline(session: requests.Session, product_url: str) -> Optional
 
     # Descrição
     desc_tag = (
-        soup.select_one("div.woocommerce-product-details__short-description")
-        or soup.select_one("div#tab-description")
-        or soup.select_one("div.product-description")
+        ctx.select_one("div.woocommerce-product-details__short-description")
+        or ctx.select_one("div#tab-description")
+        or ctx.select_one("div.product-description")
     )
     description = ""
     if desc_tag:
@@ -798,68 +2951,272 @@ def parse_product_aline(session: requests.Session, product_url: str) -> Optional
         full_text,
         ["Ingredientes", "Composição"],
         stop_markers=["Modo de usar", "Modo de uso", "Como usar"],
+        sections=ctx.sections,
     )
     ingredients_raw = ingredients_raw.replace("\n", " ").strip()
-    ingredients_list = parse_ingredients_list(ingredients_raw)
 
     # Modo de uso
     usage = extract_section_by_label(
         full_text,
         ["Modo de usar", "Modo de uso", "Como usar"],
         stop_markers=["Ingredientes", "Composição"],
+        sections=ctx.sections,
     )
 
-    # Tipo de cabelo
-    hair_type_declared = extract_hair_type_from_text(description or full_text)
+    return build_product_record(ctx, brand, product_name, description, usage, ingredients_raw)
 
-    # Imagens
-    image_front_url, image_back_url = extract_image_urls_generic(soup, product_url)
 
-    # Extras
-    ph_value = extract_ph(full_text)
-    audience = extract_audience(full_text)
-    
-    # Tipo de produto
-    product_type = infer_product_type_from_name_and_breadcrumbs(product_name, soup)
+register_brand_parser(
+    BrandParser(
+        domain="alinebrasilcosmetics.com.br",
+        get_product_links=get_all_product_links_aline,
+        parse_product=parse_product_aline,
+        parse_html=parse_product_aline_html,
+        name="aline",
+    )
+)
 
-    # Cronograma e Fine Hair
-    cronograma_info = classify_cronograma(ingredients_list)
-    fine_hair_info = score_fine_hair(ingredients_list, product_type)
 
-    # Claims
-    claims = detect_claims(soup, full_text + "\n" + ingredients_raw)
+# ==========================
+# Classificação de URLs
+# ==========================
 
-    record: Dict[str, object] = {
-        "source_url": product_url,
-        "brand": brand,
-        "product_name": product_name,
-        "product_type": product_type,
-        "description": description,
-        "function_objective": description,
-        "hair_type_declared": hair_type_declared,
-        "usage_instructions": usage,
-        "ingredients_raw": ingredients_raw,
-        "ingredients_list": ", ".join(ingredients_list),
-        "image_front_url": image_front_url,
-        "image_back_url": image_back_url,
-        "ph": ph_value,
-        "target_audience": audience,
-        "cronograma_fase": cronograma_info["fase"],
-        "cronograma_scores": str(cronograma_info["scores"]),
-        "adequacao_cabelos_finos": fine_hair_info["adequacao_cabelos_finos"],
-        "score_cabelos_finos": fine_hair_info["score_fine"]
-    }
-    record.update(claims)
-    return record
+# Padrões comuns de URLs de produtos
+PRODUCT_URL_PATTERNS = [
+    r'/produto/', r'/product/', r'/produtos/', r'/products/',
+    r'/item/', r'/p/', r'/loja/', r'/shop/',
+    r'-p-\d+', r'/dp/', r'\.html$',
+]
+
+# Padrões para ignorar (não são produtos)
+IGNORE_URL_PATTERNS = [
+    r'/carrinho', r'/cart', r'/login', r'/cadastro', r'/register',
+    r'/contato', r'/contact', r'/sobre', r'/about', r'/politica',
+    r'/termos', r'/faq', r'/ajuda', r'/help', r'facebook\.com',
+    r'instagram\.com', r'twitter\.com', r'youtube\.com', r'whatsapp',
+    r'/checkout', r'/minha-conta', r'/account', r'/wishlist',
+    r'/blog/', r'/categoria/', r'/category/', r'/brand/', r'/marca/',
+]
+
+# Quantas URLs classificadas manter em cache e quantas vezes um formato de
+# URL precisa aparecer como produto confirmado para entrar na allowlist
+URL_CLASSIFIER_CACHE_SIZE = 50000
+URL_LEARN_MIN_HITS = 3
+
+URL_PRODUCT = "product"
+URL_IGNORE = "ignore"
+URL_OTHER = "other"
+
+
+def url_shape(path: str) -> Tuple[str, ...]:
+    """
+    Formato do caminho com os trechos variáveis trocados por "*":
+    /produto/shampoo-x.html -> ("produto", "*"); /shampoo-x/p -> ("*", "p").
+    """
+    return tuple(
+        "*" if ("-" in seg or "." in seg or any(c.isdigit() for c in seg) or len(seg) > 24) else seg
+        for seg in path.lower().split("/") if seg
+    )
+
+
+class UrlClassifier:
+    """
+    Classifica URLs em produto / ignorar / outro com uma única regex por
+    classe (alternação dos padrões), cache das URLs já vistas e uma
+    allowlist aprendida por domínio: formatos de URL confirmados como
+    produto (ex.: pelos seletores de vitrine) passam a valer mesmo sem
+    casar com PRODUCT_URL_PATTERNS, como o /p final do VTEX.
+    """
+
+    def __init__(self, product_patterns: List[str], ignore_patterns: List[str]) -> None:
+        self.product_re = re.compile("|".join(f"(?:{p})" for p in product_patterns))
+        self.ignore_re = re.compile("|".join(f"(?:{p})" for p in ignore_patterns))
+        self.cache: Dict[str, str] = {}
+        # Protege cache e shape_hits: os fetchers de vários domínios
+        # classificam ao mesmo tempo nos motores async e process
+        self.lock = threading.Lock()
+        self.shape_hits: Dict[str, Dict[Tuple[str, ...], int]] = {}
+
+    def classify(self, url: str) -> str:
+        """URL_PRODUCT, URL_IGNORE ou URL_OTHER para uma URL absoluta."""
+        verdict = self.cache.get(url)
+        if verdict is not None:
+            return verdict
+        lower = url.lower()
+        if self.ignore_re.search(lower):
+            verdict = URL_IGNORE
+        elif self.product_re.search(lower) or self.is_learned(url):
+            verdict = URL_PRODUCT
+        else:
+            verdict = URL_OTHER
+        with self.lock:
+            if len(self.cache) >= URL_CLASSIFIER_CACHE_SIZE:
+                self.cache.clear()
+            self.cache[url] = verdict
+        return verdict
+
+    def is_learned(self, url: str) -> bool:
+        parsed = urlparse(url)
+        hits = self.shape_hits.get(parsed.netloc)
+        return bool(hits) and hits.get(url_shape(parsed.path), 0) >= URL_LEARN_MIN_HITS
+
+    def learn(self, url: str) -> None:
+        """Registra uma URL confirmada como produto na allowlist do domínio."""
+        parsed = urlparse(url)
+        shape = url_shape(parsed.path)
+        if not shape:
+            return
+        with self.lock:
+            hits = self.shape_hits.setdefault(parsed.netloc, {})
+            hits[shape] = hits.get(shape, 0) + 1
+            if hits[shape] == URL_LEARN_MIN_HITS:
+                # URLs já classificadas como "outro" podem ter mudado
+                self.cache = {u: v for u, v in self.cache.items() if v != URL_OTHER}
+
+    def classify_anchors(
+        self, page_url: str, anchors: Iterable[object], base_domain: str
+    ) -> List[Tuple[str, str]]:
+        """
+        Uma passada pelos links da página: (URL absoluta, classe) de cada
+        href do mesmo domínio, na ordem do documento.
+        """
+        result: List[Tuple[str, str]] = []
+        for a in anchors:
+            href = a.get("href", "")
+            if not href:
+                continue
+            full_url = urljoin(page_url, href)
+            if base_domain in urlparse(full_url).netloc:
+                result.append((full_url, self.classify(full_url)))
+        return result
+
+
+URL_CLASSIFIER = UrlClassifier(PRODUCT_URL_PATTERNS, IGNORE_URL_PATTERNS)
+
+
+# ==========================
+# Descoberta por sitemap
+# ==========================
+
+# Caminhos de página de marca que representam a loja inteira. O sitemap
+# lista o site todo, então só substitui o crawl das listagens nesses casos
+# (uma página de categoria ou de marca num multimarcas continua no crawl).
+SITEMAP_STORE_PATHS = {"", "/loja", "/shop", "/store", "/produtos", "/products"}
+
+# lastmod declarado no sitemap para cada URL de produto descoberta; o modo
+# incremental reaproveita o registro sem baixar a página se não mudou
+SITEMAP_LASTMOD: Dict[str, str] = {}
+
+
+def sitemap_locations(session: requests.Session, url: str) -> List[str]:
+    """Sitemaps anunciados no robots.txt, ou /sitemap.xml."""
+    robots = get_robots(session, url)
+    sitemaps = robots.site_maps() if robots else None
+    return list(sitemaps) if sitemaps else [f"{site_root(url)}/sitemap.xml"]
+
+
+def _sitemap_entry(elem) -> Optional[Tuple[str, str, Optional[str]]]:
+    kind = elem.tag.rsplit("}", 1)[-1]
+    if kind not in ("url", "sitemap"):
+        return None
+    loc = lastmod = None
+    for child in elem:
+        name = child.tag.rsplit("}", 1)[-1]
+        if name == "loc":
+            loc = (child.text or "").strip()
+        elif name == "lastmod":
+            lastmod = (child.text or "").strip() or None
+    elem.clear()
+    return (kind, loc, lastmod) if loc else None
+
+
+def iter_sitemap_entries(
+    session: requests.Session, sitemap_url: str
+) -> Iterator[Tuple[str, str, Optional[str]]]:
+    """
+    Lê um sitemap (ou índice) em streaming, descompactando .gz, e devolve
+    (tipo, loc, lastmod) com tipo "url" ou "sitemap". Não guarda o XML
+    inteiro em memória nem no cache HTTP.
+    """
+    if not CIRCUIT_BREAKER.allow(sitemap_url):
+        logging.debug("Disjuntor aberto para %s, pulando %s", get_domain(sitemap_url), sitemap_url)
+        return
+    apply_crawl_delay(session, sitemap_url)
+    RATE_LIMITER.acquire(sitemap_url)
+    try:
+        resp = session.get(sitemap_url, timeout=HTTP_TIMEOUT, stream=True)
+    except Exception as exc:
+        CIRCUIT_BREAKER.record(sitemap_url, classify_request_error(exc))
+        logging.warning("Erro ao acessar %s: %s", sitemap_url, exc)
+        return
+    with resp:
+        status = resp.status_code
+        CIRCUIT_BREAKER.record(sitemap_url, "" if 200 <= status < 300 else classify_status(status))
+        if resp.status_code != 200:
+            logging.debug("Sitemap %s indisponível (status %s)", sitemap_url, resp.status_code)
+            return
+        RATE_LIMITER.record_success(sitemap_url)
+        parser = ET.XMLPullParser(events=("end",))
+        decompressor = None
+        try:
+            for i, chunk in enumerate(resp.iter_content(SITEMAP_CHUNK_SIZE)):
+                # .xml.gz vem compactado no corpo (não no Content-Encoding)
+                if i == 0 and chunk[:2] == b"\x1f\x8b":
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                parser.feed(decompressor.decompress(chunk) if decompressor else chunk)
+                for _, elem in parser.read_events():
+                    entry = _sitemap_entry(elem)
+                    if entry:
+                        yield entry
+        except (ET.ParseError, zlib.error) as exc:
+            logging.warning("Sitemap %s inválido: %s", sitemap_url, exc)
+
+
+def discover_product_links_sitemap(session: requests.Session, brand_page_url: str) -> Optional[List[str]]:
+    """
+    robots.txt -> índice de sitemaps -> sitemaps de produtos. Filtra as URLs
+    com PRODUCT_URL_PATTERNS/IGNORE_URL_PATTERNS e registra o lastmod em
+    SITEMAP_LASTMOD. Retorna None quando não há sitemap utilizável (ou a
+    URL não é a loja inteira), para o chamador cair no crawl. Sitemaps não
+    passam pelo cache HTTP, então no modo offline o crawl é o único caminho.
+    """
+    if urlparse(brand_page_url).path.rstrip("/").lower() not in SITEMAP_STORE_PATHS:
+        return None
+    if RESPONSE_CACHE is not None and RESPONSE_CACHE.offline:
+        return None
 
+    base_domain = urlparse(brand_page_url).netloc
+    queue = sitemap_locations(session, brand_page_url)
+    read: Set[str] = set()
+    links = UrlFrontier()
 
-register_brand_parser(
-    BrandParser(
-        domain="alinebrasilcosmetics.com.br",
-        get_product_links=get_all_product_links_aline,
-        parse_product=parse_product_aline,
-    )
-)
+    while queue and len(read) < SITEMAP_MAX_FILES and len(links) < SITEMAP_MAX_URLS:
+        sitemap_url = queue.pop(0)
+        if sitemap_url in read:
+            continue
+        read.add(sitemap_url)
+        children: List[str] = []
+        for kind, loc, lastmod in iter_sitemap_entries(session, sitemap_url):
+            if kind == "sitemap":
+                children.append(loc)
+                continue
+            if base_domain not in urlparse(loc).netloc:
+                continue
+            if URL_CLASSIFIER.classify(loc) != URL_PRODUCT or not links.add(loc):
+                continue
+            if lastmod:
+                SITEMAP_LASTMOD[clean_url(loc)] = lastmod
+            if len(links) >= SITEMAP_MAX_URLS:
+                break
+        # Num índice, os sitemaps de produtos (product-sitemap.xml,
+        # sitemap_products_1.xml...) bastam; sem eles, lê todos
+        product_children = [c for c in children if "produ" in c.lower()]
+        queue.extend(product_children or children)
+
+    if not links:
+        return None
+    logging.info("Sitemap de %s: %d produtos em %d arquivos", base_domain, len(links), len(read))
+    return links.urls()
 
 
 # ==========================
@@ -869,44 +3226,32 @@ register_brand_parser(
 def get_all_product_links_generic(session: requests.Session, brand_page_url: str) -> List[str]:
     """
     Parser genérico que tenta coletar links de produtos de qualquer site.
-    Usa múltiplas estratégias para encontrar produtos.
+    Usa o sitemap quando a URL é a loja inteira; senão (ou sem sitemap),
+    percorre as páginas de listagem com múltiplas estratégias.
     """
-    product_links: List[str] = []
-    visited: Set[str] = set()
-    pages_to_visit: List[str] = [brand_page_url]
-    max_pages = 10  # Limitar páginas para não demorar muito
-
-    # Padrões comuns de URLs de produtos
-    product_url_patterns = [
-        r'/produto/', r'/product/', r'/produtos/', r'/products/',
-        r'/item/', r'/p/', r'/loja/', r'/shop/',
-        r'-p-\d+', r'/dp/', r'\.html$',
-    ]
+    sitemap_links = discover_product_links_sitemap(session, brand_page_url)
+    if sitemap_links:
+        return sitemap_links
 
-    # Padrões para ignorar (não são produtos)
-    ignore_patterns = [
-        r'/carrinho', r'/cart', r'/login', r'/cadastro', r'/register',
-        r'/contato', r'/contact', r'/sobre', r'/about', r'/politica',
-        r'/termos', r'/faq', r'/ajuda', r'/help', r'facebook\.com',
-        r'instagram\.com', r'twitter\.com', r'youtube\.com', r'whatsapp',
-        r'/checkout', r'/minha-conta', r'/account', r'/wishlist',
-        r'/blog/', r'/categoria/', r'/category/', r'/brand/', r'/marca/',
-    ]
+    product_links = UrlFrontier()
+    visited = UrlFrontier()
+    pages_to_visit = UrlFrontier([brand_page_url])
+    max_pages = 10  # Limitar páginas para não demorar muito
 
     page_count = 0
 
-    while pages_to_visit and page_count < max_pages:
-        page_url = pages_to_visit.pop(0)
-        if page_url in visited:
+    for page_url in pages_to_visit:
+        if page_count >= max_pages:
+            break
+        if not visited.add(page_url):
             continue
-        visited.add(page_url)
         page_count += 1
 
         html = fetch_html(session, page_url)
         if not html:
             continue
 
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_listing_soup(html)
         base_domain = urlparse(brand_page_url).netloc
 
         # Estratégia 1: Seletores comuns de e-commerce
@@ -938,47 +3283,36 @@ def get_all_product_links_generic(session: requests.Session, brand_page_url: str
         found_anchors: List[BeautifulSoup] = []
         for sel in product_selectors:
             found_anchors.extend(soup.select(sel))
+        candidates = URL_CLASSIFIER.classify_anchors(page_url, found_anchors, base_domain)
 
-        # Estratégia 2: Links com padrões de URL de produto
-        if not found_anchors:
-            for a in soup.find_all("a", href=True):
-                href = a.get("href", "")
-                href_lower = href.lower()
-
-                # Ignorar links externos ou indesejados
-                if any(re.search(pat, href_lower) for pat in ignore_patterns):
-                    continue
+        # Links de vitrine ensinam ao classificador o formato das URLs de
+        # produto deste domínio
+        for full_url, kind in candidates:
+            if kind != URL_IGNORE:
+                URL_CLASSIFIER.learn(full_url)
 
-                # Verificar se parece URL de produto
-                if any(re.search(pat, href_lower) for pat in product_url_patterns):
-                    found_anchors.append(a)
+        # Estratégia 2: Links com padrões de URL de produto (ou formato aprendido)
+        if not found_anchors:
+            candidates = [
+                (full_url, kind)
+                for full_url, kind in URL_CLASSIFIER.classify_anchors(
+                    page_url, soup.find_all("a", href=True), base_domain
+                )
+                if kind == URL_PRODUCT
+            ]
 
         # Estratégia 3: Links dentro de containers de produtos
-        if not found_anchors:
+        if not found_anchors and not candidates:
             product_containers = soup.select("div[class*='product'], div[class*='produto'], article[class*='product']")
             for container in product_containers:
-                for a in container.find_all("a", href=True):
-                    found_anchors.append(a)
-
-        # Processar links encontrados
-        for a in found_anchors:
-            href = a.get("href", "")
-            if not href:
-                continue
+                candidates.extend(
+                    URL_CLASSIFIER.classify_anchors(page_url, container.find_all("a", href=True), base_domain)
+                )
 
-            full_url = urljoin(page_url, href)
-            parsed = urlparse(full_url)
-
-            # Verificar se é do mesmo domínio
-            if base_domain not in parsed.netloc:
-                continue
-
-            # Verificar se não é link ignorado
-            if any(re.search(pat, full_url.lower()) for pat in ignore_patterns):
-                continue
-
-            if full_url not in product_links:
-                product_links.append(full_url)
+        # Processar links encontrados (externos já ficaram de fora)
+        for full_url, kind in candidates:
+            if kind != URL_IGNORE:
+                product_links.add(full_url)
 
         # Procurar paginação
         pagination_selectors = [
@@ -994,197 +3328,1037 @@ def get_all_product_links_generic(session: requests.Session, brand_page_url: str
                     next_href = next_link.get("href")
                     if next_href:
                         next_url = urljoin(page_url, next_href)
-                        if next_url not in visited and next_url not in pages_to_visit:
-                            pages_to_visit.append(next_url)
+                        if next_url not in visited and pages_to_visit.add(next_url):
                             break
             except:
                 continue
 
-        polite_sleep()
-
-    # Remover duplicatas e URLs muito curtas
-    unique_links = []
-    seen = set()
-    for link in product_links:
-        normalized = link.rstrip('/')
-        if normalized not in seen and len(normalized) > 30:
-            seen.add(normalized)
-            unique_links.append(link)
+    # Remover URLs muito curtas (duplicatas já saíram no UrlFrontier)
+    unique_links = [link for link in product_links if len(link.rstrip('/')) > 30]
 
     return unique_links[:100]  # Limitar a 100 produtos por site
 
 
 def parse_product_generic(session: requests.Session, product_url: str) -> Optional[Dict[str, object]]:
-    """
-    Parser genérico que tenta extrair dados de qualquer página de produto.
-    Usa múltiplas heurísticas para encontrar informações.
-    """
+    """Baixa a página do produto e aplica parse_product_generic_html."""
     html = fetch_html(session, product_url)
     if not html:
         return None
+    return parse_product_generic_html(html, product_url)
+
 
-    soup = BeautifulSoup(html, "html.parser")
-    full_text = soup.get_text("\n", strip=True)
-    full_text_lower = full_text.lower()
+def parse_product_generic_html(html: str, product_url: str) -> Optional[Dict[str, object]]:
+    """
+    Parser genérico que tenta extrair dados de qualquer página de produto.
+    Os campos declarados em JSON-LD/microdata/OpenGraph são usados
+    diretamente; as heurísticas só rodam para os que continuarem vazios.
+    """
+    ctx = PageContext(html, product_url)
+    soup = ctx.soup
+    full_text = ctx.full_text
+    structured = ctx.structured
 
     # === NOME DO PRODUTO ===
-    product_name = ""
+    product_name = structured.get("name", "")
     name_selectors = [
         "h1.product-title", "h1.product_title", "h1.product-name",
         "h1[itemprop='name']", ".product-name h1", ".product-title",
         "h1.entry-title", "h1.nome-produto", "h1.productName",
         "h1", "h2.product-name",
     ]
-    for sel in name_selectors:
-        tag = soup.select_one(sel)
+    if not product_name:
+        for sel in name_selectors:
+            tag = ctx.select_one(sel)
+            if tag:
+                product_name = normalize_space(tag.get_text())
+                if len(product_name) > 5:
+                    break
+
+    if not product_name:
+        title_tag = soup.find("title")
+        if title_tag:
+            product_name = normalize_space(title_tag.get_text().split("|")[0].split("-")[0])
+
+    # === MARCA ===
+    brand = structured.get("brand", "")
+    brand_selectors = [
+        "[itemprop='brand']", ".product-brand", ".brand",
+        "a[href*='/marca/']", "a[href*='/brand/']",
+        ".manufacturer", "[data-brand]",
+    ]
+    if not brand:
+        for sel in brand_selectors:
+            tag = ctx.select_one(sel)
+            if tag:
+                brand = normalize_space(tag.get_text())
+                if brand:
+                    break
+
+    # Tentar extrair marca do texto
+    if not brand:
+        match = TEXT_RULES.brand_label_any.search(full_text)
+        if match:
+            brand = match.group(1).strip()
+
+    # Extrair do domínio como fallback
+    if not brand:
+        domain = get_domain(product_url)
+        brand = domain.replace(".com.br", "").replace(".com", "").replace("www.", "").title()
+
+    # === DESCRIÇÃO ===
+    # Descrições estruturadas curtas demais (só o nome, por exemplo) não valem
+    description = structured.get("description", "")
+    if len(description) <= 50:
+        description = ""
+    desc_selectors = [
+        "[itemprop='description']", ".product-description", "#description",
+        ".description", ".descricao", "#tab-description",
+        ".woocommerce-product-details__short-description",
+        ".product-info", ".product-details", ".sobre-produto",
+    ]
+    if not description:
+        for sel in desc_selectors:
+            tag = ctx.select_one(sel)
+            if tag:
+                description = normalize_space(tag.get_text(separator=" "))
+                if len(description) > 50:
+                    break
+
+    # Fallback: primeiro parágrafo longo
+    if not description or len(description) < 50:
+        for p in soup.find_all("p"):
+            txt = normalize_space(p.get_text())
+            if len(txt) > 100 and "cookie" not in txt.lower():
+                description = txt
+                break
+
+    # === INGREDIENTES ===
+    ingredients_raw = ""
+
+    # Seletores específicos
+    ingredient_selectors = [
+        "#ingredientes", ".ingredientes", "[data-ingredientes]",
+        "#ingredients", ".ingredients", "[itemprop='ingredients']",
+        ".composicao", "#composicao", ".composition",
+    ]
+    for sel in ingredient_selectors:
+        tag = ctx.select_one(sel)
         if tag:
-            product_name = normalize_space(tag.get_text())
-            if len(product_name) > 5:
+            ingredients_raw = normalize_space(tag.get_text())
+            if ingredients_raw:
                 break
 
-    if not product_name:
-        title_tag = soup.find("title")
-        if title_tag:
-            product_name = normalize_space(title_tag.get_text().split("|")[0].split("-")[0])
+    # Buscar por labels no texto
+    if not ingredients_raw:
+        ingredients_raw = extract_section_by_label(
+            full_text,
+            ["Ingredientes:", "Ingredientes", "Composição:", "Composição",
+             "INCI:", "INCI", "Ingredients:", "Composition:"],
+            stop_markers=["Modo de usar", "Modo de uso", "Como usar",
+                         "Precauções", "Cuidados", "Informações", "Avaliações"],
+            max_chars=3000,
+            sections=ctx.sections,
+        )
+
+    ingredients_raw = ingredients_raw.replace("\n", " ").strip()
+
+    # Limpar prefixos
+    ingredients_raw = TEXT_RULES.section_prefix.sub("", ingredients_raw)
+
+    # === MODO DE USO ===
+    usage = extract_section_by_label(
+        full_text,
+        ["Modo de usar", "Modo de uso", "Como usar", "Modo de aplicação",
+         "Instruções de uso", "How to use", "Aplicação"],
+        stop_markers=["Ingredientes", "Composição", "Precauções", "Advertências"],
+        sections=ctx.sections,
+    )
+
+    # === IMAGENS, CRONOGRAMA, CABELOS FINOS E CLAIMS ===
+    return build_product_record(
+        ctx, brand, product_name, description, usage, ingredients_raw,
+        parser_name="generic", image_url=structured.get("image", ""),
+    )
+
+# Parser genérico como fallback
+GENERIC_PARSER = BrandParser(
+    domain="*",  # Wildcard para qualquer domínio
+    get_product_links=get_all_product_links_generic,
+    parse_product=parse_product_generic,
+    parse_html=parse_product_generic_html,
+    name="generic",
+)
+
+
+# ==========================
+# Adaptadores de plataforma (APIs públicas de catálogo)
+# ==========================
+
+# Trechos do HTML da página da marca que identificam a plataforma da loja
+PLATFORM_MARKERS: List[Tuple[str, Tuple[str, ...]]] = [
+    ("vtex", ("vteximg.com.br", "vtexassets.com", "vtex.render-server", "vtexcommercestable")),
+    ("shopify", ("cdn.shopify.com", "shopify.theme", ".myshopify.com")),
+    ("woocommerce", ("woocommerce", "/wp-json/wc/")),
+    ("tray", ("tray.com.br", "traycdn", "images.tcdn.com.br")),
+]
+
+PLATFORM_CACHE: Dict[str, Optional[str]] = {}
+PLATFORM_LOCK = threading.Lock()
+
+# Basta ler a página da marca até o primeiro marcador (sem cache; ver fetch_page)
+PLATFORM_MARKER_RE = re.compile(
+    b"|".join(re.escape(m.encode()) for _, markers in PLATFORM_MARKERS for m in markers),
+    re.IGNORECASE,
+)
+
+
+def detect_platform(session: requests.Session, base_url: str) -> Optional[str]:
+    """Plataforma de e-commerce do domínio (vtex, shopify, ...), uma vez por domínio."""
+    domain = get_domain(base_url)
+    if domain in PLATFORM_BY_DOMAIN:
+        return PLATFORM_BY_DOMAIN[domain]
+    with PLATFORM_LOCK:
+        if domain in PLATFORM_CACHE:
+            return PLATFORM_CACHE[domain]
+    lower = fetch_page(session, base_url, stop_at=PLATFORM_MARKER_RE).text.lower()
+    platform = next(
+        (name for name, markers in PLATFORM_MARKERS if any(m in lower for m in markers)),
+        None,
+    )
+    if platform:
+        logging.info("Domínio %s identificado como %s", domain, platform)
+    with PLATFORM_LOCK:
+        PLATFORM_CACHE[domain] = platform
+    return platform
+
+
+def fetch_json(session: requests.Session, url: str) -> Optional[object]:
+    """fetch_html para endpoints JSON (mesmo cache e limite de taxa)."""
+    text = fetch_html(session, url)
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        logging.warning("Resposta de %s não é JSON", url)
+        return None
+
+
+def catalog_product_html(
+    name: str,
+    brand: str = "",
+    sku: str = "",
+    description_html: str = "",
+    images: Iterable[str] = (),
+    categories: Iterable[str] = (),
+    sections: Iterable[Tuple[str, str]] = (),
+) -> str:
+    """
+    Monta uma página de produto mínima a partir dos campos de uma API de
+    catálogo, para que o parser genérico (dados estruturados, rótulos de
+    seção, imagens, claims) trate APIs e páginas do mesmo jeito.
+    """
+    esc = html_lib.escape
+    structured = {"@context": "https://schema.org", "@type": "Product", "name": name}
+    if brand:
+        structured["brand"] = {"@type": "Brand", "name": brand}
+    if sku:
+        structured["sku"] = sku
+    parts = [
+        "<html><head><title>", esc(name), "</title>",
+        '<script type="application/ld+json">', json.dumps(structured, ensure_ascii=False), "</script>",
+        '</head><body><nav class="breadcrumb">', esc(" > ".join(categories)), "</nav>",
+        "<h1>", esc(name), '</h1><div class="product-description">', description_html or "", "</div>",
+    ]
+    for label, value in sections:
+        parts += ["<h3>", esc(label), "</h3><div>", value, "</div>"]
+    parts.append('<div class="product-images">')
+    parts += [f'<img src="{esc(src)}">' for src in images if src]
+    parts.append("</div></body></html>")
+    return "".join(parts)
+
+
+def _paginate(fetch_batch: Callable[[int], Optional[List[Dict[str, object]]]], page_size: int) -> Iterator[Dict[str, object]]:
+    """Chama fetch_batch(0), fetch_batch(1)... até uma página curta ou CATALOG_MAX_PRODUCTS."""
+    seen = 0
+    for page in itertools.count():
+        items = fetch_batch(page)
+        if not items:
+            return
+        for item in items:
+            yield item
+            seen += 1
+            if seen >= CATALOG_MAX_PRODUCTS:
+                logging.warning("Catálogo cortado em %d produtos", CATALOG_MAX_PRODUCTS)
+                return
+        if len(items) < page_size:
+            return
+
+
+# --- VTEX: /api/catalog_system/pub/products/search ---
+
+VTEX_PAGE_SIZE = 50  # máximo aceito por _from/_to
+
+
+def get_product_pages_vtex(session: requests.Session, base_url: str) -> Iterator[Tuple[str, str]]:
+    """
+    Catálogo pela API pública do VTEX. O caminho da URL da marca (ex.:
+    /cabelos) vira o filtro de categoria/marca da busca.
+    """
+    path = urlparse(base_url).path.rstrip("/")
+    endpoint = f"{site_root(base_url)}/api/catalog_system/pub/products/search{path}"
+
+    def fetch_batch(page: int) -> Optional[List[Dict[str, object]]]:
+        start = page * VTEX_PAGE_SIZE
+        data = fetch_json(session, f"{endpoint}?_from={start}&_to={start + VTEX_PAGE_SIZE - 1}")
+        return data if isinstance(data, list) else None
+
+    for product in _paginate(fetch_batch, VTEX_PAGE_SIZE):
+        items = product.get("items") or [{}]
+        categories = [c for c in (product.get("categories") or [""])[0].split("/") if c]
+        sections = [
+            (spec, " ".join(str(v) for v in product.get(spec) or []))
+            for spec in product.get("allSpecifications") or []
+        ]
+        html = catalog_product_html(
+            name=str(product.get("productName") or ""),
+            brand=str(product.get("brand") or ""),
+            sku=str(items[0].get("itemId") or product.get("productReference") or ""),
+            description_html=str(product.get("description") or ""),
+            images=[img.get("imageUrl", "") for img in items[0].get("images") or []],
+            categories=categories,
+            sections=sections,
+        )
+        yield str(product.get("link") or ""), html
+
+
+# --- Shopify: /products.json ---
+
+SHOPIFY_PAGE_SIZE = 250
+
+
+def get_product_pages_shopify(session: requests.Session, base_url: str) -> Iterator[Tuple[str, str]]:
+    """Catálogo pelo products.json do Shopify (da coleção, se a URL for de uma)."""
+    root = site_root(base_url)
+    match = re.search(r"/collections/[^/?#]+", base_url)
+    endpoint = f"{root}{match.group(0) if match else ''}/products.json"
+
+    def fetch_batch(page: int) -> Optional[List[Dict[str, object]]]:
+        data = fetch_json(session, f"{endpoint}?limit={SHOPIFY_PAGE_SIZE}&page={page + 1}")
+        products = data.get("products") if isinstance(data, dict) else None
+        return products if isinstance(products, list) else None
+
+    for product in _paginate(fetch_batch, SHOPIFY_PAGE_SIZE):
+        variants = product.get("variants") or [{}]
+        html = catalog_product_html(
+            name=str(product.get("title") or ""),
+            brand=str(product.get("vendor") or ""),
+            sku=str(variants[0].get("sku") or ""),
+            description_html=str(product.get("body_html") or ""),
+            images=[img.get("src", "") for img in product.get("images") or []],
+            categories=[str(product.get("product_type") or "")],
+        )
+        yield f"{root}/products/{product.get('handle')}", html
+
+
+# --- WooCommerce: Store API ---
+
+WOOCOMMERCE_PAGE_SIZE = 100
+
+
+def get_product_pages_woocommerce(session: requests.Session, base_url: str) -> Iterator[Tuple[str, str]]:
+    """
+    Catálogo pela Store API do WooCommerce (sem autenticação). URLs de
+    categoria (/product-category/<slug>/ ou /categoria-produto/<slug>/)
+    filtram os produtos no servidor, pelo parâmetro category.
+    """
+    endpoint = f"{site_root(base_url)}/wp-json/wc/store/v1/products?per_page={WOOCOMMERCE_PAGE_SIZE}"
+    match = re.search(
+        r"/(?:product-category|categoria-produto)/(?:[^/?#]+/)*?([^/?#]+)/?(?:[?#]|$)", base_url
+    )
+    if match:
+        endpoint += f"&category={match.group(1)}"
+
+    def fetch_batch(page: int) -> Optional[List[Dict[str, object]]]:
+        data = fetch_json(session, f"{endpoint}&page={page + 1}")
+        return data if isinstance(data, list) else None
+
+    for product in _paginate(fetch_batch, WOOCOMMERCE_PAGE_SIZE):
+        categories = product.get("categories") or []
+        brands = product.get("brands") or [{}]
+        sections = [
+            (attr.get("name", ""), ", ".join(t.get("name", "") for t in attr.get("terms") or []))
+            for attr in product.get("attributes") or []
+        ]
+        html = catalog_product_html(
+            name=html_lib.unescape(str(product.get("name") or "")),
+            brand=str(brands[0].get("name") or ""),
+            sku=str(product.get("sku") or ""),
+            description_html=str(product.get("short_description") or "") + str(product.get("description") or ""),
+            images=[img.get("src", "") for img in product.get("images") or []],
+            categories=[c.get("name", "") for c in categories],
+            sections=sections,
+        )
+        yield str(product.get("permalink") or ""), html
+
+
+def parse_product_vtex_html(html: str, product_url: str) -> Optional[Dict[str, object]]:
+    return parse_catalog_product_html(html, product_url, "vtex")
+
+
+def parse_product_shopify_html(html: str, product_url: str) -> Optional[Dict[str, object]]:
+    return parse_catalog_product_html(html, product_url, "shopify")
+
+
+def parse_product_woocommerce_html(html: str, product_url: str) -> Optional[Dict[str, object]]:
+    return parse_catalog_product_html(html, product_url, "woocommerce")
+
+
+def parse_catalog_product_html(html: str, product_url: str, platform: str) -> Optional[Dict[str, object]]:
+    """Página montada por catalog_product_html (ou a página real, no fallback)."""
+    record = parse_product_generic_html(html, product_url)
+    if record:
+        record["_parser"] = platform
+    return record
+
+
+# Tray não tem adaptador: a API da loja exige token de acesso por loja,
+# então esses domínios seguem no crawler HTML genérico.
+PLATFORM_PARSERS: Dict[str, BrandParser] = {
+    name: BrandParser(
+        domain="*",
+        get_product_links=get_all_product_links_generic,
+        parse_product=parse_product_generic,
+        parse_html=parse_html,
+        get_product_pages=get_pages,
+        name=name,
+    )
+    for name, get_pages, parse_html in (
+        ("vtex", get_product_pages_vtex, parse_product_vtex_html),
+        ("shopify", get_product_pages_shopify, parse_product_shopify_html),
+        ("woocommerce", get_product_pages_woocommerce, parse_product_woocommerce_html),
+    )
+}
+
+
+def catalog_product_pages(
+    parser: BrandParser, session: requests.Session, base_url: str
+) -> Optional[Iterator[Tuple[str, str]]]:
+    """
+    Páginas de produto vindas da API de catálogo, ou None se o parser não
+    tem API ou ela não respondeu (aí a marca segue pelo crawler HTML).
+    """
+    if parser.get_product_pages is None:
+        return None
+    pages = parser.get_product_pages(session, base_url)
+    try:
+        first = next(pages, None)
+    except Exception as e:
+        logging.warning("API de catálogo indisponível para %s: %s", base_url, e)
+        return None
+    if first is None:
+        logging.info("API de catálogo sem produtos para %s, usando o crawler HTML", base_url)
+        return None
+    logging.info("Coletando %s pela API de catálogo", base_url)
+    return itertools.chain([first], pages)
+
+
+# ==========================
+# Modo incremental
+# ==========================
+
+# Trechos que mudam a cada requisição (scripts, estilos, comentários, espaços)
+# e não influenciam a extração. JSON-LD é mantido.
+CONTENT_HASH_NOISE_RE = re.compile(
+    r"<script\b(?![^>]*application/ld\+json)[^>]*>.*?</script>"
+    r"|<style\b[^>]*>.*?</style>"
+    r"|<!--.*?-->"
+    r"|\s+",
+    flags=re.IGNORECASE | re.DOTALL,
+)
+
+
+def content_hash(html: str) -> str:
+    """Hash do conteúdo relevante da página, ignorando ruído dinâmico."""
+    cleaned = CONTENT_HASH_NOISE_RE.sub("", html)
+    return hashlib.sha1(cleaned.encode("utf-8", "ignore")).hexdigest()
+
+
+class ProductManifest:
+    """
+    Manifesto persistente URL do produto -> hash do conteúdo -> último
+    registro extraído. Permite pular o parse de páginas inalteradas e
+    mesclar apenas os produtos novos/alterados na saída anterior.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.entries: Dict[str, Dict[str, object]] = {}
+        self.lock = threading.Lock()
+        self.unchanged = 0
+        self.changed = 0
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as exc:
+            logging.warning("Manifesto %s ilegível, ignorando: %s", self.path, exc)
+            return
+        if data.get("version") != MANIFEST_VERSION:
+            logging.info("Manifesto %s de outra versão, reprocessando tudo", self.path)
+            return
+        self.entries = data.get("products", {})
+
+    def lookup(self, url: str, digest: str) -> Optional[Dict[str, object]]:
+        """Retorna o registro anterior se o conteúdo da página não mudou."""
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry and entry.get("hash") == digest:
+                self.unchanged += 1
+                return entry["record"]
+        return None
+
+    def lookup_lastmod(self, url: str, lastmod: str) -> Optional[Dict[str, object]]:
+        """Registro anterior se o lastmod do sitemap é o mesmo da última coleta."""
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry and entry.get("lastmod") == lastmod:
+                self.unchanged += 1
+                return entry["record"]
+        return None
+
+    def touch(self, url: str, lastmod: str) -> None:
+        """
+        Atualiza o lastmod de um produto cujo conteúdo não mudou, para a
+        próxima execução pular o download por lookup_lastmod.
+        """
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is not None:
+                entry["lastmod"] = lastmod
+
+    def update(
+        self, url: str, digest: str, record: Dict[str, object], lastmod: Optional[str] = None
+    ) -> None:
+        with self.lock:
+            self.entries[url] = {
+                "hash": digest, "lastmod": lastmod, "record": record, "updated_at": time.time(),
+            }
+            self.changed += 1
+
+    def records(self) -> List[Dict[str, object]]:
+        with self.lock:
+            return [entry["record"] for entry in self.entries.values()]
+
+    def save(self) -> None:
+        """Grava o manifesto de forma atômica (arquivo temporário + rename)."""
+        tmp_path = self.path + ".tmp"
+        with self.lock:
+            data = {"version": MANIFEST_VERSION, "products": self.entries}
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, self.path)
+
+
+# ==========================
+# Saída em streaming
+# ==========================
+
+# Colunas do registro de produto, na ordem da planilha. Os claims
+# (CLAIMS_CONFIG) entram como colunas booleanas no Parquet.
+RECORD_BASE_COLUMNS: List[str] = [
+    "source_url", "brand", "product_name", "sku", "product_type", "description",
+    "function_objective", "hair_type_declared", "usage_instructions",
+    "ingredients_raw", "ingredients_list", "image_front_url", "image_back_url",
+    "ph", "target_audience", "cronograma_fase", "cronograma_scores",
+    "adequacao_cabelos_finos", "score_cabelos_finos", "_parser", "claims_list",
+]
+RECORD_FLOAT_COLUMNS = {"ph", "score_cabelos_finos"}
+
+
+class RecordSink:
+    """Destino que recebe os registros à medida que são produzidos."""
+
+    def write(self, record: Dict[str, object]) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+
+class JsonlSink(RecordSink):
+    """Grava um registro JSON por linha; cada linha vai para o SO na hora."""
+
+    def __init__(self, path: str, append: bool = False) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "a" if append else "w", encoding="utf-8")
+        # Uma linha cortada por um crash não pode grudar no próximo registro
+        if self.file.tell() > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self.file.write("\n")
+
+    def write(self, record: Dict[str, object]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def sync(self) -> None:
+        """Força os dados para o disco (fsync)."""
+        with self.lock:
+            if not self.file.closed:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+
+    def close(self) -> None:
+        self.sync()
+        with self.lock:
+            self.file.close()
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, object]]:
+    """Lê um arquivo JSON Lines registro a registro, ignorando linhas incompletas."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logging.warning("Linha inválida em %s ignorada", path)
+
+
+def parquet_schema() -> "pa.Schema":
+    """Schema tipado: texto, números e um booleano por claim."""
+    fields = []
+    for name in RECORD_BASE_COLUMNS:
+        fields.append(pa.field(name, pa.float64() if name in RECORD_FLOAT_COLUMNS else pa.string()))
+    for name in CLAIMS_CONFIG:
+        fields.append(pa.field(name, pa.bool_()))
+    return pa.schema(fields)
+
+
+class ParquetSink(RecordSink):
+    """
+    Grava registros em Parquet, um row group a cada `row_group_size`
+    registros. Cada execução cria um novo arquivo part-NNNNN dentro do
+    diretório, de modo que uma retomada não reescreve os anteriores.
+    """
+
+    def __init__(self, directory: str, row_group_size: int = PARQUET_ROW_GROUP_SIZE, append: bool = False) -> None:
+        if pa is None:
+            raise RuntimeError("Saída Parquet requer o pacote pyarrow")
+        os.makedirs(directory, exist_ok=True)
+        parts = sorted(f for f in os.listdir(directory) if f.endswith(".parquet"))
+        if not append:
+            for name in parts:
+                os.remove(os.path.join(directory, name))
+            parts = []
+        self.path = os.path.join(directory, f"part-{len(parts):05d}.parquet")
+        self.row_group_size = row_group_size
+        self.schema = parquet_schema()
+        self.buffer: List[Dict[str, object]] = []
+        self.lock = threading.Lock()
+        self.writer = pq.ParquetWriter(self.path, self.schema)
+
+    def _convert(self, record: Dict[str, object]) -> Dict[str, object]:
+        row: Dict[str, object] = {}
+        for field in self.schema:
+            value = record.get(field.name)
+            if value is None or (value == "" and field.type != pa.string()):
+                row[field.name] = None
+            elif field.type == pa.bool_():
+                row[field.name] = bool(value)
+            elif field.type == pa.float64():
+                row[field.name] = float(value)
+            else:
+                row[field.name] = str(value)
+        return row
+
+    def write(self, record: Dict[str, object]) -> None:
+        with self.lock:
+            self.buffer.append(self._convert(record))
+            if len(self.buffer) >= self.row_group_size:
+                self._write_row_group()
+
+    def _write_row_group(self) -> None:
+        if self.buffer:
+            table = pa.Table.from_pylist(self.buffer, schema=self.schema)
+            self.writer.write_table(table)
+            self.buffer = []
+
+    def flush(self) -> None:
+        with self.lock:
+            self._write_row_group()
+
+    def close(self) -> None:
+        self.flush()
+        with self.lock:
+            self.writer.close()
+
+
+def collect_columns(records: Iterable[Dict[str, object]]) -> List[str]:
+    """Colunas na ordem da primeira aparição (mesma ordem do DataFrame antigo)."""
+    columns: Dict[str, None] = {}
+    for record in records:
+        for key in record:
+            columns.setdefault(key, None)
+    return list(columns)
+
+
+def export_json(
+    records: Iterable[Dict[str, object]], json_path: str, columns: List[str]
+) -> int:
+    """
+    Exporta um array JSON para o dashboard, registro a registro. Todo
+    objeto traz todas as colunas (null quando o parser não preencheu),
+    como o to_json do DataFrame antigo.
+    """
+    count = 0
+    tmp_path = json_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for record in records:
+            if count:
+                f.write(",")
+            f.write(json.dumps({col: record.get(col) for col in columns}, ensure_ascii=False, default=str))
+            count += 1
+        f.write("]")
+    os.replace(tmp_path, json_path)
+    return count
+
+
+def export_excel(
+    records: Iterable[Dict[str, object]], excel_path: str, columns: List[str]
+) -> int:
+    """Exporta a planilha em modo write-only do openpyxl (linha a linha)."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")  # mesmo nome que o to_excel do pandas dava
+    ws.append(columns)
+    count = 0
+    for record in records:
+        ws.append([record.get(col) for col in columns])
+        count += 1
+    wb.save(excel_path)
+    return count
+
+
+def export_outputs(
+    records_factory: Callable[[], Iterable[Dict[str, object]]], excel_path: str
+) -> int:
+    """
+    Gera Excel e JSON derivados do armazenamento de registros.
+    records_factory é chamado a cada passada, para ler o diário em streaming.
+    """
+    columns = collect_columns(records_factory())
+    if not columns:
+        return 0
+    with RUN_METRICS.timer("export.excel", ""):
+        count = export_excel(records_factory(), excel_path, columns)
+    # Export to JSON for web dashboard
+    json_path = excel_path.replace(".xlsx", ".json")
+    with RUN_METRICS.timer("export.json", ""):
+        export_json(records_factory(), json_path, columns)
+    logging.info("Extração concluída. %d produtos salvos em %s e %s", count, excel_path, json_path)
+    return count
+
+
+# ==========================
+# Checkpoint e retomada
+# ==========================
+
+class RunCheckpoint:
+    """
+    Diário de registros (JSON Lines, um produto por linha, gravado assim que
+    extraído) e estado de progresso por marca. Mantém em memória apenas as
+    URLs concluídas, nunca os registros.
+    """
+
+    def __init__(self, journal_path: str, state_path: str, resume: bool = False) -> None:
+        self.journal_path = journal_path
+        self.state_path = state_path
+        self.lock = threading.Lock()
+        self.done_brands: Set[str] = set()
+        self.done_products: Set[str] = set()
 
-    # === MARCA ===
-    brand = ""
-    brand_selectors = [
-        "[itemprop='brand']", ".product-brand", ".brand",
-        "a[href*='/marca/']", "a[href*='/brand/']",
-        ".manufacturer", "[data-brand]",
-    ]
-    for sel in brand_selectors:
-        tag = soup.select_one(sel)
-        if tag:
-            brand = normalize_space(tag.get_text())
-            if brand:
-                break
+        if resume:
+            self.load()
+        elif os.path.exists(state_path):
+            os.remove(state_path)
 
-    # Tentar extrair marca do texto
-    if not brand:
-        match = re.search(r"(?:Marca|Brand)[:\s]+([^\n\r,]+)", full_text, re.IGNORECASE)
-        if match:
-            brand = match.group(1).strip()
+        self.journal = JsonlSink(journal_path, append=resume)
 
-    # Extrair do domínio como fallback
-    if not brand:
-        domain = get_domain(product_url)
-        brand = domain.replace(".com.br", "").replace(".com", "").replace("www.", "").title()
+    def load(self) -> None:
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    self.done_brands = set(json.load(f).get("done_brands", []))
+            except (OSError, ValueError) as exc:
+                logging.warning("Checkpoint %s ilegível, ignorando: %s", self.state_path, exc)
+        for record in self.iter_records():
+            self.done_products.add(canonical_url(str(record.get("source_url"))))
+        logging.info(
+            "Retomando execução: %d marcas concluídas, %d produtos no diário",
+            len(self.done_brands), len(self.done_products),
+        )
 
-    # === DESCRIÇÃO ===
-    description = ""
-    desc_selectors = [
-        "[itemprop='description']", ".product-description", "#description",
-        ".description", ".descricao", "#tab-description",
-        ".woocommerce-product-details__short-description",
-        ".product-info", ".product-details", ".sobre-produto",
-    ]
-    for sel in desc_selectors:
-        tag = soup.select_one(sel)
-        if tag:
-            description = normalize_space(tag.get_text(separator=" "))
-            if len(description) > 50:
-                break
+    def brand_done(self, base_url: str) -> bool:
+        return base_url in self.done_brands
 
-    # Fallback: primeiro parágrafo longo
-    if not description or len(description) < 50:
-        for p in soup.find_all("p"):
-            txt = normalize_space(p.get_text())
-            if len(txt) > 100 and "cookie" not in txt.lower():
-                description = txt
-                break
+    def product_done(self, product_url: str) -> bool:
+        return canonical_url(product_url) in self.done_products
 
-    # === INGREDIENTES ===
-    ingredients_raw = ""
+    def add_record(self, record: Dict[str, object]) -> None:
+        self.journal.write(record)
+        with self.lock:
+            self.done_products.add(canonical_url(str(record.get("source_url"))))
 
-    # Seletores específicos
-    ingredient_selectors = [
-        "#ingredientes", ".ingredientes", "[data-ingredientes]",
-        "#ingredients", ".ingredients", "[itemprop='ingredients']",
-        ".composicao", "#composicao", ".composition",
-    ]
-    for sel in ingredient_selectors:
-        tag = soup.select_one(sel)
-        if tag:
-            ingredients_raw = normalize_space(tag.get_text())
-            if ingredients_raw:
-                break
+    def finish_brand(self, base_url: str) -> None:
+        """Garante o diário em disco e marca a marca como concluída."""
+        self.journal.sync()
+        with self.lock:
+            self.done_brands.add(base_url)
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"done_brands": sorted(self.done_brands)}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
 
-    # Buscar por labels no texto
-    if not ingredients_raw:
-        ingredients_raw = extract_section_by_label(
-            full_text,
-            ["Ingredientes:", "Ingredientes", "Composição:", "Composição",
-             "INCI:", "INCI", "Ingredients:", "Composition:"],
-            stop_markers=["Modo de usar", "Modo de uso", "Como usar",
-                         "Precauções", "Cuidados", "Informações", "Avaliações"],
-            max_chars=3000,
-        )
+    def iter_records(self) -> Iterator[Dict[str, object]]:
+        return iter_jsonl(self.journal_path)
 
-    ingredients_raw = ingredients_raw.replace("\n", " ").strip()
+    def close(self) -> None:
+        self.journal.close()
 
-    # Limpar prefixos
-    ingredients_raw = re.sub(r'^(ingredientes|composição|inci|ingredients|composition)[:\s]*',
-                             '', ingredients_raw, flags=re.IGNORECASE)
 
-    ingredients_list = parse_ingredients_list(ingredients_raw)
+# ==========================
+# Re-score em lote (vetorizado)
+# ==========================
 
-    # === MODO DE USO ===
-    usage = extract_section_by_label(
-        full_text,
-        ["Modo de usar", "Modo de uso", "Como usar", "Modo de aplicação",
-         "Instruções de uso", "How to use", "Aplicação"],
-        stop_markers=["Ingredientes", "Composição", "Precauções", "Advertências"],
+# Quantos ingredientes do topo da lista entram nos scores
+SCORED_INGREDIENTS = 10
+
+
+def _category_matrix(ingredients: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Matriz esparsa produto x categoria no formato de listas de coordenadas:
+    para cada (produto, posição) do top 10, o índice do produto e a máscara
+    ING_* do ingrediente. Cada nome INCI distinto é classificado uma vez.
+    """
+    exploded = ingredients.fillna("").astype(str).str.split(",").explode()
+    exploded = exploded.str.strip()
+    exploded = exploded[exploded != ""]
+    position = exploded.groupby(level=0).cumcount().to_numpy()
+    keep = position < SCORED_INGREDIENTS
+    product_idx = exploded.index.to_numpy()[keep]
+    codes, uniques = pd.factorize(exploded.to_numpy()[keep])
+    unique_masks = np.fromiter((classify_ingredient(u) for u in uniques), dtype=np.int64, count=len(uniques))
+    return product_idx, position[keep], unique_masks[codes]
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    """
+    round(x, 2) do Python aplicado aos valores distintos: np.round escala por
+    100 antes de arredondar e diverge em casos como 0.225.
+    """
+    uniques, inverse = np.unique(values, return_inverse=True)
+    rounded = np.array([round(float(u), 2) for u in uniques])
+    return rounded[inverse].reshape(values.shape)
+
+
+def rescore_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Recalcula cronograma e adequação a cabelos finos de todo o catálogo a
+    partir da coluna ingredients_list, sem rede e sem reparsear páginas.
+    Reproduz classify_cronograma e score_fine_hair com operações vetoriais.
+    """
+    df = df.reset_index(drop=True).copy()
+    n = len(df)
+    product_idx, position, masks = _category_matrix(df["ingredients_list"])
+    weights = np.maximum(1.0 - position * 0.1, 0)
+
+    def weighted(bits: int) -> np.ndarray:
+        hit = (masks & bits) != 0
+        return np.bincount(product_idx, weights=weights * hit, minlength=n)
+
+    def counted(bits: int) -> np.ndarray:
+        hit = (masks & bits) != 0
+        return np.bincount(product_idx, weights=hit, minlength=n)
+
+    # --- Cronograma ---
+    raw = np.column_stack([weighted(ING_HUMECTANT), weighted(ING_NUTRITION), weighted(ING_RECONSTRUCTION)])
+    total = raw.sum(axis=1)
+    defined = total > 0
+    scores = np.zeros_like(raw)
+    scores[defined] = _round2(raw[defined] / total[defined, None])
+
+    order = np.argsort(-scores, axis=1, kind="stable")
+    rows = np.arange(n)
+    first, second = order[:, 0], order[:, 1]
+    gap = scores[rows, first] - scores[rows, second]
+    letters = np.array(["H", "N", "R"])
+    fase = np.where(
+        gap < 0.15,
+        np.char.add(np.char.add(letters[first], "+"), letters[second]),
+        letters[first],
+    ).astype(object)
+    fase[~defined] = "Indefinido"
+
+    df["cronograma_fase"] = fase
+    # Poucos trios distintos: formata cada um uma vez
+    triples, inverse = np.unique(scores, axis=0, return_inverse=True)
+    labels = np.array(
+        [str({"H": float(h), "N": float(nn), "R": float(r)}) for h, nn, r in triples],
+        dtype=object,
     )
+    df["cronograma_scores"] = labels[inverse.reshape(-1)]
+
+    # --- Cabelos finos ---
+    score = np.zeros(n)
+    score += counted(ING_OIL_LIGHT) * 0.8
+    score += counted(ING_HUMECTANT) * 0.6
+    score += counted(ING_RECONSTRUCTION) * 0.7
+    score += counted(ING_SILICONE_VOLATILE) * 0.5
+    score -= counted(ING_HEAVY) * 1.2
+
+    category = df["product_type"].fillna("").astype(str).str.lower() if "product_type" in df else pd.Series([""] * n)
+    is_mask = category.str.contains("máscara", regex=False) | category.str.contains("mascara", regex=False)
+    score -= np.where(is_mask, 0.5, 0.0)
+    score += np.where(category.str.contains("spray", regex=False), 0.5, 0.0)
+    score += np.where(category.str.contains("leave-in", regex=False), 0.2, 0.0)
+
+    df["adequacao_cabelos_finos"] = np.select([score >= 2.0, score >= 0.5], ["Sim", "Talvez"], "Não")
+    df["score_cabelos_finos"] = _round2(score)
+    return df
 
-    # === IMAGENS ===
-    image_front_url, image_back_url = extract_image_urls_generic(soup, product_url)
 
-    # === OUTROS DADOS ===
-    hair_type_declared = extract_hair_type_from_text(description or full_text)
-    ph_value = extract_ph(full_text)
-    audience = extract_audience(full_text)
-    product_type = infer_product_type_from_name_and_breadcrumbs(product_name, soup)
+def load_records_table(path: str) -> pd.DataFrame:
+    """Lê uma saída do scraper (.json, .jsonl, .xlsx ou .parquet)."""
+    if path.endswith(".jsonl"):
+        return pd.read_json(path, lines=True, dtype=False)
+    if path.endswith(".json"):
+        return pd.read_json(path, orient="records", dtype=False)
+    if path.endswith(".xlsx"):
+        return pd.read_excel(path)
+    if path.endswith(".parquet") or os.path.isdir(path):
+        return pd.read_parquet(path)
+    raise ValueError(f"Formato não suportado: {path}")
 
-    # === CRONOGRAMA E CABELOS FINOS ===
-    cronograma_info = classify_cronograma(ingredients_list)
-    fine_hair_info = score_fine_hair(ingredients_list, product_type)
 
-    # === CLAIMS ===
-    claims = detect_claims(soup, full_text + "\n" + ingredients_raw)
+def rescore_catalog(input_path: str, output_path: Optional[str] = None) -> int:
+    """
+    Re-score offline de um catálogo salvo. Sem output_path, sobrescreve a
+    entrada; .xlsx também atualiza o .json do dashboard ao lado. Um
+    diretório Parquet (--parquet) é trocado por um com uma única parte.
+    """
+    start = time.perf_counter()
+    df = rescore_dataframe(load_records_table(input_path))
+    output_path = output_path or input_path
+
+    if output_path.endswith(".xlsx"):
+        df.to_excel(output_path, index=False)
+        df.to_json(output_path.replace(".xlsx", ".json"), orient="records", force_ascii=False)
+    elif output_path.endswith(".jsonl"):
+        df.to_json(output_path, orient="records", lines=True, force_ascii=False)
+    elif output_path.endswith(".json"):
+        df.to_json(output_path, orient="records", force_ascii=False)
+    elif os.path.isdir(output_path):
+        # As partes antigas têm os scores velhos: o diretório novo é montado
+        # ao lado e só então substitui o anterior
+        directory = output_path.rstrip(os.sep)
+        tmp_dir, old_dir = directory + ".tmp", directory + ".old"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        df.to_parquet(os.path.join(tmp_dir, "part-00000.parquet"), index=False)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.replace(directory, old_dir)
+        os.replace(tmp_dir, directory)
+        shutil.rmtree(old_dir)
+    else:
+        df.to_parquet(output_path, index=False)
 
-    record: Dict[str, object] = {
-        "source_url": product_url,
-        "brand": brand,
-        "product_name": product_name,
-        "product_type": product_type,
-        "description": description,
-        "function_objective": description,
-        "hair_type_declared": hair_type_declared,
-        "usage_instructions": usage,
-        "ingredients_raw": ingredients_raw,
-        "ingredients_list": ", ".join(ingredients_list),
-        "image_front_url": image_front_url,
-        "image_back_url": image_back_url,
-        "ph": ph_value,
-        "target_audience": audience,
-        "cronograma_fase": cronograma_info["fase"],
-        "cronograma_scores": str(cronograma_info["scores"]),
-        "adequacao_cabelos_finos": fine_hair_info["adequacao_cabelos_finos"],
-        "score_cabelos_finos": fine_hair_info["score_fine"],
-        "_parser": "generic",
-    }
-    record.update(claims)
-    return record
+    logging.info(
+        "Re-score de %d produtos em %.2fs salvo em %s",
+        len(df), time.perf_counter() - start, output_path,
+    )
+    return len(df)
 
 
-# Parser genérico como fallback
-GENERIC_PARSER = BrandParser(
-    domain="*",  # Wildcard para qualquer domínio
-    get_product_links=get_all_product_links_generic,
-    parse_product=parse_product_generic,
-)
+# ==========================
+# Comparação de backends HTML
+# ==========================
+
+def compare_html_backends(
+    pages: Iterable[Tuple[str, str]],
+    backends: Optional[List[str]] = None,
+) -> Dict[str, Dict[str, object]]:
+    """
+    Roda o parser de cada página (url, html) com todos os backends e compara
+    os registros com os do primeiro backend da lista (a referência).
+    Retorna, por backend, o tempo total de parse e as diferenças por campo.
+    """
+    backends = backends or available_html_backends()
+    original = HTML_PARSER_BACKEND
+    pages = list(pages)
+    report: Dict[str, Dict[str, object]] = {
+        name: {"seconds": 0.0, "pages": 0, "diffs": []} for name in backends
+    }
+    reference: Dict[str, Optional[Dict[str, object]]] = {}
+
+    try:
+        for name in backends:
+            set_html_backend(name)
+            for url, html in pages:
+                parser = BRAND_PARSERS.get(get_domain(url), GENERIC_PARSER)
+                start = time.perf_counter()
+                try:
+                    record = parser.parse_html(html, url)
+                except Exception as exc:
+                    record = {"_error": repr(exc)}
+                report[name]["seconds"] += time.perf_counter() - start
+                report[name]["pages"] += 1
+
+                if name == backends[0]:
+                    reference[url] = record
+                    continue
+                ref = reference.get(url) or {}
+                for key in sorted(set(ref) | set(record or {})):
+                    if ref.get(key) != (record or {}).get(key):
+                        report[name]["diffs"].append((url, key, ref.get(key), (record or {}).get(key)))
+    finally:
+        set_html_backend(original)
+
+    return report
+
+
+def print_backend_comparison(report: Dict[str, Dict[str, object]], max_diffs: int = 20) -> None:
+    """Resumo legível de compare_html_backends."""
+    for name, data in report.items():
+        pages = data["pages"] or 1
+        diffs = data["diffs"]
+        changed_fields: Dict[str, int] = {}
+        for _, key, _, _ in diffs:
+            changed_fields[key] = changed_fields.get(key, 0) + 1
+        print(
+            f"{name:12s} {data['seconds'] / pages * 1000:8.1f} ms/página  "
+            f"{len(diffs)} campos diferentes"
+        )
+        for key, count in sorted(changed_fields.items(), key=lambda x: -x[1]):
+            print(f"    {key}: {count} páginas")
+        for url, key, ref, val in diffs[:max_diffs]:
+            print(f"    {url} [{key}]\n      ref: {str(ref)[:120]!r}\n      new: {str(val)[:120]!r}")
 
 
 # ==========================
@@ -1192,8 +4366,11 @@ GENERIC_PARSER = BrandParser(
 # ==========================
 
 def load_brand_urls(file_path: str) -> List[str]:
-    """Lê URLs de um arquivo de texto, ignorando linhas vazias ou comentários."""
-    urls = []
+    """
+    Lê URLs de um arquivo de texto, ignorando linhas vazias ou comentários.
+    Parâmetros de rastreamento são removidos e URLs repetidas, descartadas.
+    """
+    urls = UrlFrontier()
     try:
         with open(file_path, "r", encoding="utf-8") as f:
             for line in f:
@@ -1204,75 +4381,733 @@ def load_brand_urls(file_path: str) -> List[str]:
                 parts = line.split("\t")
                 url = parts[-1].strip()
                 if url.startswith("http"):
-                    urls.append(url)
+                    urls.add(url)
     except FileNotFoundError:
         logging.error(f"Arquivo {file_path} não encontrado.")
-    return urls
+    return urls.urls()
+
+def new_session() -> requests.Session:
+    """
+    Cria uma sessão HTTP com os headers padrão e o TunedHTTPAdapter
+    (keep-alive por host, repetições com jitter). gzip/deflate são sempre
+    aceitos; br também, se o pacote brotli estiver instalado.
+    """
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    adapter = TunedHTTPAdapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def select_parser(base_url: str, session: Optional[requests.Session] = None) -> BrandParser:
+    """
+    Escolhe o parser registrado para o domínio; senão, com uma sessão, o
+    adaptador da plataforma detectada (VTEX, Shopify, WooCommerce); por
+    fim, o parser genérico.
+    """
+    domain = get_domain(base_url)
+    parser = BRAND_PARSERS.get(domain)
+    if not parser and session is not None:
+        parser = PLATFORM_PARSERS.get(detect_platform(session, base_url) or "")
+    if not parser:
+        # Usa o parser genérico como fallback
+        logging.info("Usando parser genérico para o domínio %s", domain)
+        parser = GENERIC_PARSER
+    return parser
+
+
+def collect_product_links(
+    session: requests.Session, base_url: str, parser: Optional[BrandParser] = None
+) -> Tuple[BrandParser, List[str]]:
+    """Seleciona o parser da marca (se não informado) e coleta os links de produtos."""
+    domain = get_domain(base_url)
+    parser = parser or select_parser(base_url)
+    logging.info("Coletando links de produtos para domínio %s em %s", domain, base_url)
+    product_links = parser.get_product_links(session, base_url)
+    logging.info("Domínio %s: %d produtos encontrados", domain, len(product_links))
+    return parser, product_links
+
+
+def match_manifest(
+    manifest: Optional[ProductManifest], product_url: str, html: str
+) -> Tuple[Optional[str], Optional[Dict[str, object]]]:
+    """
+    (hash, registro anterior) da página; o registro só vem se o conteúdo
+    não mudou. Nesse caso um lastmod novo do sitemap é gravado no manifesto.
+    """
+    if not html or manifest is None:
+        return None, None
+    digest = content_hash(html)
+    record = manifest.lookup(product_url, digest)
+    lastmod = SITEMAP_LASTMOD.get(product_url)
+    if record is not None and lastmod:
+        manifest.touch(product_url, lastmod)
+    return digest, record
+
+
+def fetch_product_page(
+    session: requests.Session,
+    product_url: str,
+    manifest: Optional[ProductManifest] = None,
+) -> Tuple[str, Optional[str], Optional[Dict[str, object]]]:
+    """
+    Baixa a página de um produto. Retorna (html, hash, registro anterior):
+    o registro só vem preenchido quando o manifesto reconhece o conteúdo.
+    Se o lastmod do sitemap não mudou, nem baixa (html volta vazio).
+    """
+    lastmod = SITEMAP_LASTMOD.get(product_url)
+    if manifest is not None and lastmod:
+        record = manifest.lookup_lastmod(product_url, lastmod)
+        if record is not None:
+            return "", None, record
+    html = fetch_html(session, product_url)
+    return (html,) + match_manifest(manifest, product_url, html)
+
+
+def scrape_product(
+    parser: BrandParser,
+    session: requests.Session,
+    product_url: str,
+    manifest: Optional[ProductManifest] = None,
+    html: Optional[str] = None,
+) -> Optional[Dict[str, object]]:
+    """
+    Executa o parser de produto, registrando (sem propagar) erros.
+    Com um manifesto, páginas cujo conteúdo não mudou reaproveitam o
+    registro anterior sem passar pelo parser. html, quando informado
+    (ex.: página montada pela API de catálogo), evita o download.
+    """
+    try:
+        with RUN_METRICS.context(get_domain(product_url), parser.name):
+            if html is not None:
+                digest, record = match_manifest(manifest, product_url, html)
+            elif parser.parse_html is None:
+                return parser.parse_product(session, product_url)
+            else:
+                html, digest, record = fetch_product_page(session, product_url, manifest)
+            if not html or record is not None:
+                return record
+            with RUN_METRICS.timer("parse"):
+                record = parser.parse_html(html, product_url)
+            if record and manifest is not None:
+                manifest.update(product_url, digest, record, SITEMAP_LASTMOD.get(product_url))
+            return record
+    except Exception as e:
+        logging.error(f"Erro ao processar {product_url}: {e}")
+        return None
+
+
+@dataclass
+class ScrapeRun:
+    """Estado compartilhado por todas as marcas de uma execução."""
+    checkpoint: RunCheckpoint
+    manifest: Optional[ProductManifest] = None
+    sinks: List[RecordSink] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # Produtos já atribuídos a alguma marca nesta execução
+    products: UrlFrontier = field(default_factory=UrlFrontier)
+
+    def emit(self, record: Dict[str, object]) -> None:
+        """Entrega o registro ao diário e aos demais destinos."""
+        with self.lock:
+            self.checkpoint.add_record(record)
+            for sink in self.sinks:
+                sink.write(record)
+
+
+# Produto a raspar: (URL, HTML já obtido ou None para baixar a página)
+ProductSource = Tuple[str, Optional[str]]
+
+
+def pending_products(run: ScrapeRun, sources: List[ProductSource]) -> List[ProductSource]:
+    """
+    Remove produtos já gravados no diário (retomada) e os que outra marca
+    ou listagem já trouxe nesta execução, para baixar cada um uma vez só.
+    """
+    pending = [src for src in sources if not run.checkpoint.product_done(src[0])]
+    skipped = len(sources) - len(pending)
+    if skipped:
+        logging.info("Retomando: %d produtos já coletados foram pulados", skipped)
+    fresh = [(clean_url(url), html) for url, html in pending if run.products.add(url)]
+    if len(fresh) < len(pending):
+        logging.info("%d produtos já vistos em outra marca nesta execução", len(pending) - len(fresh))
+    return fresh
+
+
+def collect_product_sources(
+    session: requests.Session, base_url: str, run: ScrapeRun
+) -> Tuple[BrandParser, List[ProductSource]]:
+    """
+    Produtos pendentes de uma marca: pela API de catálogo da plataforma,
+    quando houver (já com o HTML montado), ou pelos links do crawler.
+    """
+    domain = get_domain(base_url)
+    with RUN_METRICS.timer("links", domain) as labels:
+        parser = select_parser(base_url, session)
+        with RUN_METRICS.context(domain, parser.name):
+            pages = catalog_product_pages(parser, session, base_url)
+            if pages is not None:
+                sources: List[ProductSource] = []
+                try:
+                    for url, html in pages:
+                        if url:
+                            sources.append((url, html))
+                except Exception as e:
+                    # Página ruim no meio do catálogo: fica com o que já veio
+                    logging.error("API de catálogo interrompida em %s após %d produtos: %s", base_url, len(sources), e)
+                logging.info("Domínio %s: %d produtos pela API", domain, len(sources))
+        if pages is None:
+            # Sem API, o adaptador da plataforma se comporta como o genérico
+            if parser.get_product_pages is not None:
+                parser = GENERIC_PARSER
+            with RUN_METRICS.context(domain, parser.name):
+                parser, product_links = collect_product_links(session, base_url, parser)
+            sources = [(url, None) for url in product_links]
+        labels["parser"] = parser.name
+    return parser, pending_products(run, sources)
+
+
+def circuit_tripped(product_url: str, remaining: int) -> bool:
+    """
+    True quando o disjuntor do domínio abriu: o resto da marca é descartado
+    e ela não é marcada como concluída (--resume tenta de novo).
+    """
+    if not CIRCUIT_BREAKER.is_open(product_url):
+        return False
+    logging.warning(
+        "Domínio %s fora do ar: %d produtos restantes descartados",
+        get_domain(product_url), remaining,
+    )
+    return True
+
+
+def listing_interrupted(base_url: str) -> bool:
+    """
+    True quando o disjuntor do domínio está aberto depois da coleta de
+    links: a listagem veio vazia ou cortada, então a marca não é marcada
+    como concluída (--resume tenta de novo).
+    """
+    if not CIRCUIT_BREAKER.is_open(base_url):
+        return False
+    logging.warning(
+        "Domínio %s fora do ar durante a listagem: marca %s fica pendente",
+        get_domain(base_url), base_url,
+    )
+    return True
+
+
+def scrape_brand(session: requests.Session, base_url: str, run: ScrapeRun) -> int:
+    """
+    Raspa todos os produtos de uma marca, uma requisição por vez.
+    Os registros vão direto para o diário; retorna quantos foram gravados.
+    """
+    if run.checkpoint.brand_done(base_url):
+        logging.info("Marca %s já concluída, pulando", base_url)
+        return 0
+
+    count = 0
+    with RUN_METRICS.timer("brand", get_domain(base_url)) as labels:
+        parser, products = collect_product_sources(session, base_url, run)
+        labels["parser"] = parser.name
+        if listing_interrupted(base_url):
+            return count
+
+        for idx, (product_url, html) in enumerate(products, start=1):
+            if html is None and circuit_tripped(product_url, len(products) - idx + 1):
+                return count
+            logging.info("(%d/%d) Scrapando produto %s", idx, len(products), product_url)
+            record = scrape_product(parser, session, product_url, run.manifest, html)
+            if record:
+                run.emit(record)
+                count += 1
+
+    run.checkpoint.finish_brand(base_url)
+    return count
+
+
+def group_urls_by_domain(brand_urls: List[str]) -> Dict[str, List[str]]:
+    """Agrupa as URLs de marcas por domínio, preservando a ordem de entrada."""
+    groups: Dict[str, List[str]] = {}
+    for url in brand_urls:
+        groups.setdefault(get_domain(url), []).append(url)
+    return groups
+
+
+async def scrape_domain_async(
+    domain: str,
+    base_urls: List[str],
+    semaphore: asyncio.Semaphore,
+    executor: ThreadPoolExecutor,
+    run: ScrapeRun,
+) -> int:
+    """
+    Raspa todas as marcas de um domínio em sequência.
+    As chamadas bloqueantes dos parsers rodam no executor; o ritmo das
+    requisições é controlado por RATE_LIMITER dentro de fetch_html.
+    """
+    loop = asyncio.get_running_loop()
+    count = 0
+
+    async with semaphore:
+        session = new_session()
+        try:
+            for base_url in base_urls:
+                if run.checkpoint.brand_done(base_url):
+                    logging.info("Marca %s já concluída, pulando", base_url)
+                    continue
+                with RUN_METRICS.timer("brand", domain) as labels:
+                    parser, products = await loop.run_in_executor(
+                        executor, collect_product_sources, session, base_url, run
+                    )
+                    labels["parser"] = parser.name
+                    completed = not listing_interrupted(base_url)
+                    if not completed:
+                        products = []
+                    for idx, (product_url, html) in enumerate(products, start=1):
+                        if html is None and circuit_tripped(product_url, len(products) - idx + 1):
+                            completed = False
+                            break
+                        logging.info(
+                            "[%s] (%d/%d) Scrapando produto %s",
+                            domain, idx, len(products), product_url,
+                        )
+                        record = await loop.run_in_executor(
+                            executor, scrape_product, parser, session, product_url, run.manifest, html
+                        )
+                        if record:
+                            run.emit(record)
+                            count += 1
+                if completed:
+                    run.checkpoint.finish_brand(base_url)
+        except Exception as e:
+            logging.error("Erro ao processar domínio %s: %s", domain, e)
+        finally:
+            session.close()
+
+    return count
+
+
+async def scrape_brands_async(
+    brand_urls: List[str],
+    run: ScrapeRun,
+    max_concurrent_domains: int = ASYNC_MAX_CONCURRENT_DOMAINS,
+) -> int:
+    """
+    Raspa vários domínios ao mesmo tempo. Dentro de cada domínio as
+    requisições continuam sequenciais e respeitam o limite do domínio.
+    """
+    groups = group_urls_by_domain(brand_urls)
+    semaphore = asyncio.Semaphore(max_concurrent_domains)
+
+    with ThreadPoolExecutor(max_workers=max_concurrent_domains) as executor:
+        tasks = [
+            scrape_domain_async(domain, urls, semaphore, executor, run)
+            for domain, urls in groups.items()
+        ]
+        results = await asyncio.gather(*tasks)
+
+    return sum(results)
+
+
+# ==========================
+# Pipeline: downloads em threads, parsing em processos
+# ==========================
+
+def parse_page_job(
+    parse_html: Callable[[str, str], Optional[Dict[str, object]]],
+    html: str,
+    product_url: str,
+    parser_name: str = "",
+) -> Tuple[Optional[Dict[str, object]], Tuple[Dict[SeriesKey, StageSeries], Dict[Tuple[str, str], int]]]:
+    """
+    Roda num processo do pool: extrai o registro de uma página já baixada.
+    Devolve também as métricas do parse, somadas no processo principal.
+    """
+    record = None
+    try:
+        with RUN_METRICS.context(get_domain(product_url), parser_name), RUN_METRICS.timer("parse"):
+            record = parse_html(html, product_url)
+    except Exception as e:
+        logging.error(f"Erro ao processar {product_url}: {e}")
+    return record, RUN_METRICS.drain()
+
+
+def init_parse_worker(
+    html_backend: str, log_level: int, text_rules: Optional[Dict[str, object]] = None
+) -> None:
+    """Replica nos processos do pool a configuração do processo principal."""
+    logging.basicConfig(level=log_level, format="%(asctime)s [%(levelname)s] %(message)s")
+    set_html_backend(html_backend)
+    set_text_rules(text_rules)
+
+
+class ParsePipeline:
+    """
+    Estágio de parsing: os fetchers entregam HTML bruto e um
+    ProcessPoolExecutor roda parse_html. No máximo queue_size páginas ficam
+    pendentes (na fila ou em parse); acima disso submit() bloqueia o
+    fetcher. Os registros voltam ao processo principal e seguem para o
+    diário/destinos em run.emit.
+    """
+
+    def __init__(self, run: ScrapeRun, workers: int = PARSE_WORKERS, queue_size: int = PARSE_QUEUE_SIZE) -> None:
+        self.run = run
+        self.slots = threading.BoundedSemaphore(queue_size)
+        # fork com as threads dos fetchers rodando pode herdar locks presos
+        # (ex.: o do logging) e travar o worker; forkserver/spawn começam limpos
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=init_parse_worker,
+            initargs=(HTML_PARSER_BACKEND, logging.getLogger().getEffectiveLevel(), TEXT_RULES.overrides),
+        )
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def submit(self, parser: BrandParser, product_url: str, html: str, digest: Optional[str]) -> Future:
+        """Enfileira uma página; o Future devolvido termina depois do emit."""
+        self.slots.acquire()
+        emitted: Future = Future()
+        try:
+            future = self.executor.submit(parse_page_job, parser.parse_html, html, product_url, parser.name)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda f: self._finish(f, product_url, digest, emitted))
+        return emitted
+
+    def _finish(self, future: Future, product_url: str, digest: Optional[str], emitted: Future) -> None:
+        self.slots.release()
+        try:
+            record, metrics = future.result()
+            RUN_METRICS.merge(metrics)
+            if record:
+                if digest is not None and self.run.manifest is not None:
+                    self.run.manifest.update(product_url, digest, record, SITEMAP_LASTMOD.get(product_url))
+                self.emit(record)
+        except Exception as e:
+            logging.error(f"Erro ao processar {product_url}: {e}")
+        finally:
+            emitted.set_result(None)
+
+    def emit(self, record: Dict[str, object]) -> None:
+        self.run.emit(record)
+        with self.lock:
+            self.count += 1
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+def fetch_domain_for_pipeline(
+    domain: str,
+    base_urls: List[str],
+    pipeline: ParsePipeline,
+) -> None:
+    """
+    Fetcher de um domínio: coleta links e baixa as páginas em sequência,
+    entregando o HTML ao pipeline. Uma marca só é marcada como concluída
+    depois que todos os seus registros foram gravados.
+    """
+    run = pipeline.run
+    session = new_session()
+    try:
+        for base_url in base_urls:
+            if run.checkpoint.brand_done(base_url):
+                logging.info("Marca %s já concluída, pulando", base_url)
+                continue
+            with RUN_METRICS.timer("brand", domain) as labels:
+                parser, products = collect_product_sources(session, base_url, run)
+                labels["parser"] = parser.name
+                pending: List[Future] = []
+                completed = not listing_interrupted(base_url)
+                if not completed:
+                    products = []
+                with RUN_METRICS.context(domain, parser.name):
+                    for idx, (product_url, html) in enumerate(products, start=1):
+                        if html is None and circuit_tripped(product_url, len(products) - idx + 1):
+                            completed = False
+                            break
+                        logging.info(
+                            "[%s] (%d/%d) Baixando produto %s",
+                            domain, idx, len(products), product_url,
+                        )
+                        if parser.parse_html is None:
+                            record = scrape_product(parser, session, product_url, run.manifest, html)
+                            if record:
+                                pipeline.emit(record)
+                            continue
+                        try:
+                            if html is None:
+                                html, digest, record = fetch_product_page(session, product_url, run.manifest)
+                            else:
+                                digest, record = match_manifest(run.manifest, product_url, html)
+                        except Exception as e:
+                            logging.error(f"Erro ao processar {product_url}: {e}")
+                            continue
+                        if record is not None:
+                            pipeline.emit(record)
+                        elif html:
+                            pending.append(pipeline.submit(parser, product_url, html, digest))
+                wait(pending)
+            if completed:
+                run.checkpoint.finish_brand(base_url)
+    except Exception as e:
+        logging.error("Erro ao processar domínio %s: %s", domain, e)
+    finally:
+        session.close()
+
+
+def scrape_brands_pipeline(
+    brand_urls: List[str],
+    run: ScrapeRun,
+    max_concurrent_domains: int = ASYNC_MAX_CONCURRENT_DOMAINS,
+    parse_workers: int = PARSE_WORKERS,
+) -> int:
+    """
+    Raspa vários domínios com downloads e parsing desacoplados: até
+    max_concurrent_domains fetchers (um por domínio) alimentam parse_workers
+    processos, então o parse de páginas pesadas não segura o próximo
+    download e usa todos os núcleos.
+    """
+    groups = group_urls_by_domain(brand_urls)
+    pipeline = ParsePipeline(run, workers=parse_workers)
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrent_domains) as fetchers:
+            list(fetchers.map(lambda item: fetch_domain_for_pipeline(item[0], item[1], pipeline), groups.items()))
+    finally:
+        pipeline.close()
+    return pipeline.count
+
+
+def incremental_records(
+    manifest: ProductManifest, checkpoint: RunCheckpoint
+) -> Iterator[Dict[str, object]]:
+    """
+    Saída do modo incremental em streaming: os registros do diário (inclusive
+    os de uma execução interrompida) e depois os do manifesto que esta
+    execução não revisitou, sem montar uma cópia mesclada em memória.
+    """
+    yield from checkpoint.iter_records()
+    for record in manifest.records():
+        if not checkpoint.product_done(str(record.get("source_url"))):
+            yield record
+
 
 def scrape_brands(
     brand_urls: List[str],
     output_excel_path: str = "produtos_capilares.xlsx",
     log_level: int = logging.INFO,
-) -> pd.DataFrame:
+    engine: str = "serial",
+    max_concurrent_domains: int = ASYNC_MAX_CONCURRENT_DOMAINS,
+    incremental: bool = False,
+    resume: bool = False,
+    parquet: bool = False,
+    parse_workers: int = PARSE_WORKERS,
+    metrics_prometheus_path: Optional[str] = None,
+    return_dataframe: bool = True,
+) -> Optional[pd.DataFrame]:
     """
     Executa o scraping para uma lista de URLs base de marcas e salva em Excel.
-    Retorna o DataFrame resultante.
+    Retorna o DataFrame resultante, lido do JSON exportado depois que a
+    coleta terminou; com return_dataframe=False (a CLI) retorna None e a
+    saída não é carregada em memória.
+
+    engine="serial" visita as marcas uma a uma; engine="async" raspa até
+    max_concurrent_domains domínios em paralelo; engine="process" faz o
+    mesmo e ainda tira o parsing dos fetchers, rodando-o em parse_workers
+    processos.
+
+    Com incremental=True, um manifesto ao lado da planilha guarda o hash de
+    cada página: produtos inalterados não são reprocessados e a saída é a
+    mescla da execução anterior com os registros novos ou alterados.
+
+    Os registros são gravados num diário (.journal.jsonl) à medida que são
+    extraídos e o progresso por marca fica em .checkpoint.json. Com
+    resume=True, marcas concluídas e produtos já gravados são pulados.
+    Com parquet=True eles também vão, em row groups, para o diretório
+    .parquet. Excel e JSON são derivados desse armazenamento no final.
+
+    Os tempos por etapa, domínio e parser (RUN_METRICS) vão para
+    .metrics.json ao lado da planilha e, com metrics_prometheus_path, para
+    um arquivo no formato textfile do Prometheus.
     """
     logging.basicConfig(
         level=log_level,
         format="%(asctime)s [%(levelname)s] %(message)s",
     )
 
-    session = requests.Session()
-    session.headers.update(DEFAULT_HEADERS)
+    checkpoint = RunCheckpoint(
+        output_excel_path.replace(".xlsx", ".journal.jsonl"),
+        output_excel_path.replace(".xlsx", ".checkpoint.json"),
+        resume=resume,
+    )
+    manifest: Optional[ProductManifest] = None
+    if incremental:
+        manifest = ProductManifest(output_excel_path.replace(".xlsx", ".manifest.json"))
+    run = ScrapeRun(checkpoint=checkpoint, manifest=manifest)
+    RUN_METRICS.reset()
+    started = time.time()
+    if parquet:
+        run.sinks.append(ParquetSink(output_excel_path.replace(".xlsx", ".parquet"), append=resume))
 
-    all_records: List[Dict[str, object]] = []
+    try:
+        if engine == "async":
+            asyncio.run(scrape_brands_async(brand_urls, run, max_concurrent_domains))
+        elif engine == "process":
+            scrape_brands_pipeline(brand_urls, run, max_concurrent_domains, parse_workers)
+        elif engine == "serial":
+            with new_session() as session:
+                for base_url in brand_urls:
+                    scrape_brand(session, base_url, run)
+        else:
+            raise ValueError(f"Engine desconhecido: {engine}")
+    except KeyboardInterrupt:
+        logging.warning("Interrompido. Use --resume para continuar de onde parou.")
+        raise
+    finally:
+        checkpoint.close()
+        for sink in run.sinks:
+            sink.close()
+        if manifest is not None:
+            manifest.save()
+
+    TRANSPORT_STATS.log_summary()
+    if RESPONSE_CACHE is not None and not RESPONSE_CACHE.offline:
+        RESPONSE_CACHE.evict()
+
+    records_factory: Callable[[], Iterable[Dict[str, object]]] = checkpoint.iter_records
+    count: Optional[int] = None
+    if manifest is not None:
+        logging.info(
+            "Modo incremental: %d produtos inalterados, %d novos ou alterados",
+            manifest.unchanged, manifest.changed,
+        )
+        if manifest.changed == 0 and os.path.exists(output_excel_path) and not resume:
+            logging.info("Nenhum produto mudou; exportações mantidas.")
+            count = len(manifest.entries)
+        else:
+            records_factory = partial(incremental_records, manifest, checkpoint)
+
+    if count is None:
+        count = export_outputs(records_factory, output_excel_path)
+        if not count:
+            logging.warning("Nenhum produto foi coletado.")
+
+    finished = time.time()
+    run_info: Dict[str, object] = {
+        "engine": engine,
+        "brands": len(brand_urls),
+        "products": count,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+        "wall_seconds": round(finished - started, 3),
+        "finished_timestamp_seconds": round(finished, 3),
+        "transport": TRANSPORT_STATS.totals(),
+    }
+    RUN_METRICS.log_summary()
+    metrics_path = output_excel_path.replace(".xlsx", ".metrics.json")
+    RUN_METRICS.write_json(metrics_path, run_info)
+    if metrics_prometheus_path:
+        RUN_METRICS.write_prometheus(metrics_prometheus_path, run_info)
+    logging.info("Métricas da execução em %s", metrics_path)
+    if not return_dataframe:
+        return None
+    json_path = output_excel_path.replace(".xlsx", ".json")
+    if not count or not os.path.exists(json_path):
+        return pd.DataFrame()
+    return load_records_table(json_path)
 
-    for base_url in brand_urls:
-        domain = get_domain(base_url)
-        parser = BRAND_PARSERS.get(domain)
 
-        if not parser:
-            # Usa o parser genérico como fallback
-            logging.info("Usando parser genérico para o domínio %s", domain)
-            parser = GENERIC_PARSER
+if __name__ == "__main__":
+    import argparse
+    import os
 
-        logging.info("Coletando links de produtos para domínio %s em %s", domain, base_url)
-        product_links = parser.get_product_links(session, base_url)
-        logging.info("Domínio %s: %d produtos encontrados", domain, len(product_links))
+    arg_parser = argparse.ArgumentParser(description="Scraper de produtos capilares")
+    # Se passar arquivo como argumento, usa ele. Senão, tenta brand_urls.txt
+    arg_parser.add_argument("urls_file", nargs="?", default="brand_urls.txt")
+    arg_parser.add_argument(
+        "--engine", choices=("serial", "async", "process"), default="serial",
+        help="serial: uma marca por vez; async: vários domínios em paralelo; "
+             "process: como async, com o parsing num pool de processos",
+    )
+    arg_parser.add_argument(
+        "--max-domains", type=int, default=ASYNC_MAX_CONCURRENT_DOMAINS,
+        help="domínios simultâneos nos engines async/process",
+    )
+    arg_parser.add_argument(
+        "--parse-workers", type=int, default=PARSE_WORKERS,
+        help="processos de parsing no engine process",
+    )
+    arg_parser.add_argument(
+        "--cache", nargs="?", const=RESPONSE_CACHE_PATH, default=None, metavar="ARQUIVO",
+        help=f"ativa o cache HTTP em disco (padrão: {RESPONSE_CACHE_PATH})",
+    )
+    arg_parser.add_argument(
+        "--cache-ttl", type=float, default=RESPONSE_CACHE_TTL_SECONDS,
+        help="segundos em que uma resposta do cache é usada sem revalidar",
+    )
+    arg_parser.add_argument(
+        "--offline", action="store_true",
+        help="não acessa a rede: só reproduz respostas do cache",
+    )
+    arg_parser.add_argument(
+        "--incremental", action="store_true",
+        help="reprocessa só produtos cujas páginas mudaram e mescla com a saída anterior",
+    )
+    arg_parser.add_argument(
+        "--resume", action="store_true",
+        help="continua uma execução interrompida, pulando marcas e produtos já coletados",
+    )
+    arg_parser.add_argument(
+        "--parquet", action="store_true",
+        help="grava também um diretório Parquet (requer pyarrow)",
+    )
+    arg_parser.add_argument(
+        "--html-backend", choices=sorted(HTML_BACKENDS), default=HTML_PARSER_BACKEND,
+        help="árvore HTML usada pelos parsers (lxml/selectolax são mais rápidos)",
+    )
+    arg_parser.add_argument(
+        "--text-rules", metavar="ARQUIVO",
+        help="JSON com regras de texto (pH, marca, público, tipo de cabelo) que substituem as padrão",
+    )
+    arg_parser.add_argument(
+        "--metrics-prometheus", metavar="ARQUIVO",
+        help="grava também as métricas da execução no formato textfile do Prometheus (.prom)",
+    )
+    arg_parser.add_argument(
+        "--compare-backends", type=int, nargs="?", const=200, default=None, metavar="N",
+        help="compara os backends HTML em até N páginas do cache e sai",
+    )
+    arg_parser.add_argument(
+        "--rescore", metavar="ARQUIVO",
+        help="recalcula cronograma/cabelos finos de uma saída salva (sem rede) e sai",
+    )
+    arg_parser.add_argument(
+        "--rescore-output", metavar="ARQUIVO",
+        help="onde gravar o re-score (padrão: sobrescreve --rescore)",
+    )
+    args = arg_parser.parse_args()
+    set_html_backend(args.html_backend)
+    if args.text_rules:
+        load_text_rules(args.text_rules)
 
-        for idx, product_url in enumerate(product_links, start=1):
-            logging.info("(%d/%d) Scrapando produto %s", idx, len(product_links), product_url)
-            try:
-                record = parser.parse_product(session, product_url)
-                if record:
-                    all_records.append(record)
-            except Exception as e:
-                logging.error(f"Erro ao processar {product_url}: {e}")
-            polite_sleep()
-
-    if not all_records:
-        logging.warning("Nenhum produto foi coletado.")
-        return pd.DataFrame()
+    if args.rescore:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+        rescore_catalog(args.rescore, args.rescore_output)
+        raise SystemExit(0)
 
-    df = pd.DataFrame(all_records)
-    df.to_excel(output_excel_path, index=False)
-    # Export to JSON for web dashboard
-    json_path = output_excel_path.replace(".xlsx", ".json")
-    df.to_json(json_path, orient="records", force_ascii=False)
-    logging.info("Extração concluída. %d produtos salvos em %s e %s", len(df), output_excel_path, json_path)
-    return df
+    if args.compare_backends is not None:
+        cache = configure_response_cache(args.cache or RESPONSE_CACHE_PATH, offline=True)
+        print_backend_comparison(compare_html_backends(cache.iter_entries(args.compare_backends)))
+        raise SystemExit(0)
 
+    urls_file = args.urls_file
 
-if __name__ == "__main__":
-    import sys
-    import os
+    if args.cache or args.offline:
+        configure_response_cache(args.cache or RESPONSE_CACHE_PATH, args.cache_ttl, args.offline)
 
-    # Se passar arquivo como argumento, usa ele. Senão, tenta brand_urls.txt
-    urls_file = "brand_urls.txt"
-    if len(sys.argv) > 1:
-        urls_file = sys.argv[1]
-    
     if os.path.exists(urls_file):
         print(f"Lendo URLs de {urls_file}...")
         brand_urls_list = load_brand_urls(urls_file)
@@ -1287,4 +5122,14 @@ if __name__ == "__main__":
     # Para teste rápido, limitar a lista se for muito grande (opcional)
     # brand_urls_list = brand_urls_list[:2] 
 
-    scrape_brands(brand_urls_list)
+    scrape_brands(
+        brand_urls_list,
+        engine=args.engine,
+        max_concurrent_domains=args.max_domains,
+        incremental=args.incremental,
+        resume=args.resume,
+        parquet=args.parquet,
+        parse_workers=args.parse_workers,
+        metrics_prometheus_path=args.metrics_prometheus,
+        return_dataframe=False,
+    )